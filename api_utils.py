@@ -2,28 +2,391 @@ import requests
 import os
 import time
 import json
-from config import TWITCH_CLIENT_ID, TWITCH_CLIENT_SECRET
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from config import (TWITCH_CLIENT_ID, TWITCH_CLIENT_SECRET, TWITCH_TOKEN_URL, IGDB_BASE_URL,
+                    IGDB_CONNECT_TIMEOUT, IGDB_READ_TIMEOUT, IGDB_RATE_LIMIT, IGDB_MAX_RETRIES,
+                    IGDB_BACKOFF, IGDB_POOL_SIZE, GAME_CACHE_TTL, GAME_CACHE_STALE_TTL, GAME_CACHE_MAXSIZE,
+                    IGDB_MAX_CONCURRENCY, IGDB_FANOUT_TIMEOUT, IGDB_BREAKER_FAILURES, IGDB_BREAKER_RESET,
+                    IGDB_BREAKER_PROBES, IGDB_LATENCY_BUDGET)
+from game_cache import GameCache
+from game_record import GameRecord
+import metrics
 
 
 client_id = TWITCH_CLIENT_ID
 client_secret = TWITCH_CLIENT_SECRET
-base_url = 'https://api.igdb.com/v4'
+base_url = IGDB_BASE_URL
+token_url = TWITCH_TOKEN_URL
+
+GAME_DETAIL_FIELDS = "name,summary,cover.url,genres.name,platforms.name,screenshots.url,aggregated_rating,aggregated_rating_count"
+IGDB_MAX_LIMIT = 500
+
+
+class TwitchTokenProvider:
+    """Process-wide cache for the Twitch app access token.
+
+    The token is reused until `leeway` seconds before its `expires_in`.
+    When many threads find the token missing at once, only one of them
+    asks Twitch for a new one; the rest wait on the lock and reuse it.
+    """
+
+    def __init__(self, url, client_id, client_secret, leeway=60, session=None, timeout=(IGDB_CONNECT_TIMEOUT, IGDB_READ_TIMEOUT)):
+        self.url = url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.leeway = leeway
+        self.session = session
+        self.timeout = timeout
+        self._token = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def _is_fresh(self):
+        return self._token is not None and time.monotonic() < self._expires_at
+
+    def get_token(self):
+        """Return a valid token, fetching a new one only when needed."""
+
+        if self._is_fresh():
+            return self._token
+
+        with self._lock:
+            # Another thread may have refreshed while we waited.
+            if not self._is_fresh():
+                self._refresh()
+            return self._token
+
+    def invalidate(self, token):
+        """Drop `token` so the next caller fetches a new one.
+
+        Only clears the cache if it still holds `token`, so a stale 401
+        can't throw away a token another thread just refreshed.
+        """
+
+        with self._lock:
+            if self._token == token:
+                self._token = None
+                self._expires_at = 0
+
+    def _refresh(self):
+        http = self.session or requests
+        resp = http.post(self.url, timeout=self.timeout,
+            params={"client_id": self.client_id, "client_secret": self.client_secret, "grant_type": 'client_credentials'})
+        resp.raise_for_status()
+
+        data = resp.json()
+        self._token = data['access_token']
+        self._expires_at = time.monotonic() + max(data.get('expires_in', 0) - self.leeway, 0)
+
+
+token_provider = TwitchTokenProvider(token_url, client_id, client_secret)
+
 
 def get_twitch_access_token():
-    resp = requests.post("https://id.twitch.tv/oauth2/token",
-        params={"client_id": client_id, "client_secret": client_secret, "grant_type": 'client_credentials'})
-    
-    token = resp.json()['access_token']
-    return token
+    return token_provider.get_token()
 
 
-def get_game_info(limit=20, offset=0, platform_id=None, genre_id=None, filters=None):
-    token = get_twitch_access_token()
-    headers = {
-        "Client-ID": client_id,
-        "Authorization": f"Bearer {token}"
-    }
-    endpoint = "https://api.igdb.com/v4/games"
+class TokenBucket:
+    """Thread-safe token bucket shared by every IGDB caller in the process.
+
+    `rate` tokens are added per second up to `capacity`; `acquire` blocks
+    until a token is available.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class IGDBError(Exception):
+    """Raised when IGDB keeps failing after all retries."""
+
+
+class CircuitOpenError(IGDBError):
+    """Raised instead of calling IGDB while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Stops calling an upstream that keeps failing, then probes it to recover.
+
+    Closed: calls go through. After `failure_threshold` consecutive
+    failures (errors, or successes slower than `latency_budget` seconds)
+    it opens and `allow()` refuses every call. After `reset_timeout`
+    seconds it is half-open: up to `probes` calls go through at once, and
+    the first result closes it again or reopens it for another
+    `reset_timeout`.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold, reset_timeout, latency_budget=0, probes=1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.latency_budget = latency_budget
+        self.probes = probes
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0
+        self._probing = 0
+        self._times_opened = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def retry_after(self):
+        """Seconds until the next probe may run (0 unless open)."""
+
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0
+            return max(self.reset_timeout - (time.monotonic() - self._opened_at), 0)
+
+    def allow(self):
+        """Whether a call may go ahead now. A True while half-open takes a probe slot."""
+
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._probing = 0
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._probing < self.probes:
+                self._probing += 1
+                return True
+            self._rejected += 1
+            return False
+
+    def record(self, ok, seconds=0.0):
+        """Report the outcome of an allowed call."""
+
+        if ok and self.latency_budget and seconds > self.latency_budget:
+            ok = False
+
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probing = max(self._probing - 1, 0)
+            if ok:
+                self._state = self.CLOSED
+                self._failures = 0
+                return
+            self._failures += 1
+            if self._state == self.HALF_OPEN or (self._state == self.CLOSED and self._failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._times_opened += 1
+
+    def stats(self):
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "open": int(state == self.OPEN),
+                "half_open": int(state == self.HALF_OPEN),
+                "consecutive_failures": self._failures,
+                "times_opened": self._times_opened,
+                "rejected": self._rejected,
+            }
+
+
+class IGDBClient:
+    """Shared IGDB client.
+
+    Wraps one pooled keep-alive `requests.Session` with connect/read
+    timeouts, the process-wide rate limiter, the cached Twitch token
+    (retried once on 401), exponential backoff on 429 and 5xx answers and
+    an optional circuit breaker that fails fast while IGDB is down.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, base_url, client_id, token_provider, session=None, rate_limiter=None,
+                 timeout=(IGDB_CONNECT_TIMEOUT, IGDB_READ_TIMEOUT), max_retries=IGDB_MAX_RETRIES,
+                 backoff=IGDB_BACKOFF, pool_size=IGDB_POOL_SIZE, breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.client_id = client_id
+        self.token_provider = token_provider
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker
+
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+
+    def url_for(self, path):
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method, path, headers=None, **kwargs):
+        """Send a request to IGDB and return the `requests.Response`.
+
+        Raises IGDBError if the request still fails after `max_retries`
+        retries on a connection error, 429 or 5xx answer, and
+        CircuitOpenError without calling IGDB while the breaker is open.
+        """
+
+        start = time.perf_counter()
+        status = "error"
+        try:
+            if self.breaker and not self.breaker.allow():
+                status = "circuit_open"
+                raise CircuitOpenError(f"IGDB circuit open, not calling {path}")
+            try:
+                response, upstream_seconds = self._send(method, path, headers, **kwargs)
+            except Exception:
+                if self.breaker:
+                    self.breaker.record(False)
+                raise
+            if self.breaker:
+                # Only IGDB's own answer time counts toward the latency budget, not our rate limiter's queue
+                self.breaker.record(True, upstream_seconds)
+            status = response.status_code
+            return response
+        finally:
+            metrics.record_igdb_call(path, time.perf_counter() - start, status)
+
+    def _send(self, method, path, headers, **kwargs):
+        """Send with retries. Returns (response, seconds the answering attempt took upstream)."""
+
+        kwargs.setdefault('timeout', self.timeout)
+        url = self.url_for(path)
+        refreshed_token = False
+        attempt = 0
+
+        while True:
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            attempt_started = time.perf_counter()
+
+            try:
+                token = self.token_provider.get_token()
+            except requests.RequestException as exc:
+                raise IGDBError("Couldn't get a Twitch access token") from exc
+            request_headers = {
+                "Client-ID": self.client_id,
+                "Authorization": f"Bearer {token}"
+            }
+            request_headers.update(headers or {})
+
+            try:
+                response = self.session.request(method, url, headers=request_headers, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                error = exc
+                response = None
+            else:
+                if response.status_code == 401 and not refreshed_token:
+                    self.token_provider.invalidate(token)
+                    refreshed_token = True
+                    continue
+                if response.status_code not in self.RETRY_STATUSES:
+                    return response, time.perf_counter() - attempt_started
+                error = IGDBError(f"IGDB answered {response.status_code} for {path}")
+
+            if attempt >= self.max_retries or (self.breaker and self.breaker.state == CircuitBreaker.OPEN):
+                # Once the breaker has opened, waiting to retry only holds this worker up
+                raise IGDBError(f"IGDB request to {path} failed after {attempt + 1} attempts") from error
+
+            time.sleep(self._retry_delay(response, attempt))
+            attempt += 1
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def _retry_delay(self, response, attempt):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return self.backoff * (2 ** attempt)
+
+
+igdb = IGDBClient(base_url, client_id, token_provider, rate_limiter=TokenBucket(IGDB_RATE_LIMIT),
+                  breaker=CircuitBreaker(IGDB_BREAKER_FAILURES, IGDB_BREAKER_RESET,
+                                         latency_budget=IGDB_LATENCY_BUDGET, probes=IGDB_BREAKER_PROBES))
+token_provider.session = igdb.session
+
+game_cache = GameCache(GAME_CACHE_TTL, GAME_CACHE_MAXSIZE, stale_ttl=GAME_CACHE_STALE_TTL)
+
+_fanout_pool = ThreadPoolExecutor(max_workers=IGDB_MAX_CONCURRENCY, thread_name_prefix="igdb-fanout")
+_fanout_local = threading.local()
+
+
+def run_parallel(calls, timeout=IGDB_FANOUT_TIMEOUT, executor=None):
+    """Run independent zero-argument callables concurrently.
+
+    At most IGDB_MAX_CONCURRENCY calls run at once across the process,
+    unless `executor` gives them a pool of their own. Results come back in
+    the order of `calls`. If a call raises, the first error (in input
+    order) is re-raised; if the calls don't all finish within `timeout`
+    seconds, IGDBError is raised, so the app answers 503 as for any other
+    IGDB outage. Unstarted calls are cancelled in both cases.
+
+    Calls made from inside a fan-out worker run inline, so nested fan-outs
+    can't exhaust the pool and deadlock.
+    """
+
+    calls = list(calls)
+    if len(calls) <= 1 or getattr(_fanout_local, 'active', False):
+        return [call() for call in calls]
+
+    timings = metrics.current_timings()
+
+    def run(call):
+        _fanout_local.active = True
+        try:
+            with metrics.bind(timings):
+                return call()
+        finally:
+            _fanout_local.active = False
+
+    futures = [(executor or _fanout_pool).submit(run, call) for call in calls]
+    deadline = time.monotonic() + timeout if timeout else None
+
+    try:
+        return [future.result(timeout=max(deadline - time.monotonic(), 0) if deadline else None)
+                for future in futures]
+    except FutureTimeoutError:
+        raise IGDBError(f"{len(calls)} parallel IGDB calls did not finish within {timeout}s") from None
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def game_list_query(limit=20, offset=0, filters=None):
+    """Build the apicalypse body for a page of games, most hyped first."""
 
     base_data = "fields name,summary,cover.url,genres.name,platforms.name,aggregated_rating,aggregated_rating_count,hypes; sort hypes desc;"
 
@@ -33,38 +396,178 @@ def get_game_info(limit=20, offset=0, platform_id=None, genre_id=None, filters=N
     else:
         data = f"{base_data} limit {limit}; offset {offset};"
 
+    return data
 
-    response = requests.post(endpoint, headers=headers, data=data)
-    response_data = response.json()
 
+def build_game_filters(platform_id=None, genre_id=None):
+    """Build the `where` clause for filtering games by platform and/or genre."""
 
-    games_info = []
-    for game in response_data:
-        game_info = {
-            "id": game.get("id"),
-            "name": game.get("name"),
-            "summary": game.get("summary"),
-            "aggregated_rating": game.get("aggregated_rating"),
-            "aggregated_rating_count": game.get("aggregated_rating_count"),
-            "cover_url": game.get("cover", {}).get("url"),
-            "genres": [genre.get("name") for genre in game.get("genres", [])],
-            "platforms": [platform.get("name") for platform in game.get("platforms", [])],
-            "hypes": game.get("hypes")
-        }
-        games_info.append(game_info)
+    filters = ""
+    if platform_id and genre_id:
+        filters += f"platforms={platform_id} & genres={genre_id};"
+    elif platform_id:
+        filters += f"platforms={platform_id};"
+    elif genre_id:
+        filters += f"genres={genre_id};"
+    return filters
 
 
-    return games_info
+def get_game_info(limit=20, offset=0, platform_id=None, genre_id=None, filters=None, min_fresh=0):
+    data = game_list_query(limit, offset, filters)
 
+    # Cached by query signature as compact records; each call gets fresh dicts to add keys to
+    games_info = game_cache.get_or_fetch(f"games:{data}", lambda: _fetch_game_info(data), min_fresh=min_fresh)
+    return [game.to_summary() for game in games_info]
 
-def get_platforms_info(limit=500):
-    token = get_twitch_access_token()
-    headers = {
-        "Client-ID": client_id,  
-        "Authorization": f"Bearer {token}" 
-    }
 
-    endpoint = "https://api.igdb.com/v4/platforms"
+def _fetch_game_info(data):
+    response = igdb.post("games", data=data)
+    return compact_games(response.json())
+
+
+def compact_games(response_data):
+    """IGDB game records as a tuple of GameRecords, the form the game cache keeps."""
+
+    return tuple(GameRecord.from_igdb(game) for game in response_data)
+
+
+def encode_cache_entry(key, value):
+    """The JSON payload the durable cache stores for a game cache entry.
+
+    Records are stored in the IGDB shape, so rows written before records
+    existed decode the same way.
+    """
+
+    kind = key.split(":", 1)[0]
+    if kind == "game":
+        return value.to_igdb() if value is not None else None
+    if kind == "games":
+        return [game.to_igdb() for game in value]
+    if kind == "page":
+        return {"games": [game.to_igdb() for game in value["games"]], "count": value["count"]}
+    if kind == "details" and value is not None:
+        return dict(value["game"].to_igdb(), release_dates=value["release_dates"])
+    return value
+
+
+def decode_cache_entry(key, payload):
+    """Inverse of `encode_cache_entry`."""
+
+    kind = key.split(":", 1)[0]
+    if kind == "game":
+        return GameRecord.from_igdb(payload) if payload is not None else None
+    if kind == "games":
+        return compact_games(payload)
+    if kind == "page":
+        return {"games": compact_games(payload["games"]), "count": payload["count"]}
+    if kind == "details" and payload is not None:
+        payload = dict(payload)
+        release_dates = payload.pop("release_dates", [])
+        return {"game": GameRecord.from_igdb(payload), "release_dates": release_dates}
+    return payload
+
+
+class MultiQuery:
+    """Several named IGDB queries sent in one POST to /multiquery.
+
+        results = (MultiQuery()
+                   .add("games", "games", "fields name; limit 20;")
+                   .add("count", "games/count", "where hypes > 0;")
+                   .execute())
+
+    `execute()` returns {name: result list}, or {name: int} for count
+    sub-queries. IGDB accepts at most 10 sub-queries per call.
+    """
+
+    MAX_QUERIES = 10
+
+    def __init__(self):
+        self.queries = []
+
+    def add(self, name, endpoint, query):
+        if len(self.queries) >= self.MAX_QUERIES:
+            raise ValueError(f"IGDB multiquery accepts at most {self.MAX_QUERIES} sub-queries")
+        if '"' in name:
+            raise ValueError("Sub-query names can't contain double quotes")
+        self.queries.append((name, endpoint, query.strip()))
+        return self
+
+    def body(self):
+        return "\n".join(f'query {endpoint} "{name}" {{ {query} }};' for name, endpoint, query in self.queries)
+
+    def execute(self, client=None):
+        response = (client or igdb).post("multiquery", data=self.body())
+        results = {}
+        for item in response.json():
+            results[item["name"]] = item["count"] if "count" in item else item.get("result", [])
+        return results
+
+
+PLATFORMS_QUERY = "fields name; where category = (1,2,3,4,5,6); limit 500;"
+GENRES_QUERY = "fields name; limit 500;"
+
+
+def get_games_page(limit=20, offset=0, filters=None, min_fresh=0):
+    """One page of hyped games plus the total count, in a single IGDB call.
+
+    Returns {"games": [...], "count": total}. Cached by query signature.
+    """
+
+    data = game_list_query(limit, offset, filters)
+
+    def fetch():
+        results = (MultiQuery()
+                   .add("games", "games", data)
+                   .add("count", "games/count", f"where {filters}" if filters else "")
+                   .execute())
+        return {"games": compact_games(results["games"]), "count": results["count"]}
+
+    page = game_cache.get_or_fetch(f"page:{data}", fetch, min_fresh=min_fresh)
+    return {"games": [game.to_summary() for game in page["games"]], "count": page["count"]}
+
+
+def get_game_details(game_id, min_fresh=0, with_games=()):
+    """A game plus its release dates, fetched together in one IGDB call.
+
+    Returns the game dict with an extra "release_dates" list. The bare game
+    record is also stored under its game:<id> cache entry. When the details
+    have to be fetched, the games in `with_games` (ids, e.g. the page's
+    similar games) ride along in the same call and are cached as game:<id>
+    too, so a following `get_games_by_ids(with_games)` needs no IGDB call.
+    """
+
+    game_id = int(game_id)
+    with_games = [int(other_id) for other_id in dict.fromkeys(with_games)][:IGDB_MAX_LIMIT]
+
+    def fetch():
+        query = (MultiQuery()
+                 .add("game", "games", f"fields {GAME_DETAIL_FIELDS}; where id = {game_id};")
+                 .add("release_dates", "release_dates", f"fields human,platform.name; where game = {game_id}; sort date asc; limit 50;"))
+        if with_games:
+            query.add("with_games", "games", f"fields {GAME_DETAIL_FIELDS}; "
+                                             f"where id = ({','.join(map(str, with_games))}); limit {len(with_games)};")
+        results = query.execute()
+        game_cache.set_many({f"game:{other['id']}": GameRecord.from_igdb(other) for other in results.get("with_games", [])})
+        if not results["game"]:
+            return None
+        game = GameRecord.from_igdb(results["game"][0])
+        game_cache.set(f"game:{game_id}", game)
+        return {"game": game, "release_dates": results["release_dates"]}
+
+    details = game_cache.get_or_fetch(f"details:{game_id}", fetch, min_fresh=min_fresh)
+    return dict(details["game"].to_igdb(), release_dates=details["release_dates"]) if details else None
+
+
+def get_catalog_info():
+    """Platforms and genres in one IGDB call: {"platforms": [...], "genres": [...]}."""
+
+    return (MultiQuery()
+            .add("platforms", "platforms", PLATFORMS_QUERY)
+            .add("genres", "genres", GENRES_QUERY)
+            .execute())
+
+
+def get_platforms_info(limit=500):
     fields = "name"  
     params = {
         "fields": fields,
@@ -72,64 +575,84 @@ def get_platforms_info(limit=500):
         "where": "category = (1,2,3,4,5,6)"
     }
 
-    response = requests.post(endpoint, headers=headers, params=params)  
+    response = igdb.post("platforms", params=params)
 
     return response
 
 def get_genres_info(limit=500):
-    token = get_twitch_access_token()
-    headers = {
-        "Client-ID": client_id,  
-        "Authorization": f"Bearer {token}" 
-    }
-
-    endpoint = "https://api.igdb.com/v4/genres"
     fields = "name"  
     params = {
         "fields": fields,
         "limit": limit,
     }
 
-    response = requests.post(endpoint, headers=headers, params=params)  
+    response = igdb.post("genres", params=params)
 
     return response
 
 def get_single_game_info(game_id):
-    token = get_twitch_access_token()
-    headers = {
-        "Client-ID": client_id,  
-        "Authorization": f"Bearer {token}" 
-    }
+    """One game's IGDB record, or None if IGDB doesn't know the id."""
+
+    game = game_cache.get_or_fetch(f"game:{int(game_id)}", lambda: _fetch_single_game_info(game_id))
+    return game.to_igdb() if game is not None else None
+
 
-    endpoint = f"https://api.igdb.com/v4/games/{game_id}"
-    fields = "name,summary,cover.url,genres.name,platforms.name, screenshots.url, aggregated_rating,aggregated_rating_count"  # Specify the fields you need
+def _fetch_single_game_info(game_id):
     params = {
-        "fields": fields,
+        "fields": GAME_DETAIL_FIELDS,
     }
 
-    response = requests.get(endpoint, headers=headers, params=params)
+    response = igdb.get(f"games/{game_id}", params=params)
     game_info = response.json()  
 
     # Ensure that game_info is a single dictionary, not a list
     if isinstance(game_info, list):
-        return game_info[0]  # Assuming the first item is the desired game
-    else:
-        return game_info
+        if not game_info:
+            return None  # unknown id
+        game_info = game_info[0]  # Assuming the first item is the desired game
+    return GameRecord.from_igdb(game_info)
+
+
+def get_games_by_ids(game_ids):
+    """Fetch many games with as few IGDB calls as possible.
+
+    Games already in `game_cache` are served from memory. The rest are
+    de-duplicated and requested `IGDB_MAX_LIMIT` at a time with
+    `where id = (...)`, the chunks running in parallel. Games come back in the order of `game_ids`; ids
+    IGDB doesn't know are left out.
+    """
+
+    game_ids = [int(game_id) for game_id in game_ids]
+    keys = [f"game:{game_id}" for game_id in dict.fromkeys(game_ids)]
+    cached = game_cache.get_many_or_fetch(keys, _fetch_games_by_keys)
+
+    # A None entry is an id get_single_game_info already found unknown
+    return [cached[f"game:{game_id}"].to_igdb() for game_id in game_ids if cached.get(f"game:{game_id}") is not None]
+
+
+def _fetch_games_by_keys(keys):
+    ids = [int(key.split(":", 1)[1]) for key in keys]
+    chunks = [ids[start:start + IGDB_MAX_LIMIT] for start in range(0, len(ids), IGDB_MAX_LIMIT)]
+
+    def fetch_chunk(chunk):
+        data = f"fields {GAME_DETAIL_FIELDS}; where id = ({','.join(map(str, chunk))}); limit {len(chunk)};"
+        return igdb.post("games", data=data).json()
+
+    games = {}
+    for results in run_parallel(lambda chunk=chunk: fetch_chunk(chunk) for chunk in chunks):
+        for game in results:
+            games[f"game:{game['id']}"] = GameRecord.from_igdb(game)
+
+    return games
 
 
 def search_games(query):
-    token = get_twitch_access_token()
     headers = {
-        "Client-ID": client_id,
-        "Authorization": f"Bearer {token}",
         "Accept": "application/json"
     }
-    endpoint = "https://api.igdb.com/v4/search"
     data = {
         "fields": "alternative_name,character,checksum,collection,company,description,game,name,platform,published_at,test_dummy,theme",
         "query": query
     }
-    response = requests.post(endpoint, headers=headers, json=data)
+    response = igdb.post("search", headers=headers, json=data)
     return response.json()
-
-
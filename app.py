@@ -1,13 +1,38 @@
 import os
+import math
+import time
+import base64
+import binascii
+import json
 import urllib.parse
 
-from flask import Flask, render_template, request, flash, redirect, session, g, jsonify, url_for, abort
+import click
+
+from flask import (Flask, render_template, request, flash, redirect, session, g, jsonify, url_for, abort, stream_with_context,
+                   send_file)
+from flask.ctx import _AppCtxGlobals
 from flask_debugtoolbar import DebugToolbarExtension
 from sqlalchemy.exc import IntegrityError
-from api_utils import get_game_info, get_genres_info, get_platforms_info, get_single_game_info
-from sqlalchemy import func
-
-from models import db, connect_db, User, Rating, List
+from sqlalchemy.orm import selectinload
+from api_utils import (get_game_info, build_game_filters, get_single_game_info, get_games_by_ids, get_games_page, get_game_details, game_cache,
+                       encode_cache_entry, decode_cache_entry, igdb, IGDBError, CircuitBreaker)
+from game_cache import SQLCacheBacking
+from catalog import catalog
+from cache_warmer import CacheWarmer
+from search_index import get_game_index
+from http_cache import init_http_cache, cache_policy, ONE_YEAR, PERSONALIZED
+from image_cache import image_cache, image_id_from_url, ImageFetchError
+from fragment_cache import FragmentCache
+from metrics import init_metrics, current_timings, REGISTRY, GaugeSet
+from config import (GAME_CACHE_DURABLE, CATALOG_REFRESH_INTERVAL, CATALOG_HTTP_MAX_AGE, API_GAMES_MAX_LIMIT,
+                    API_GAMES_PAGE_SIZE, API_TOP_MAX_LIMIT, WARM_CACHE_INTERVAL, SIMILAR_GAMES_SHOWN,
+                    FRAGMENT_CACHE_MAXSIZE)
+
+from models import (db, connect_db, User, Rating, List, GameRatingStats, GameSimilarity, LeaderboardEntry, user_cache,
+                    password_hasher)
+from leaderboard import facet_for, facets_to_add, record_rating, rebuild_leaderboards
+from recommendations import SimilarityUpdater, rebuild_similarities
+from password_hashing import HashingBusy
 from forms import UserAddForm, LoginForm, GameSearchForm, CreateListForm
 
 
@@ -15,7 +40,7 @@ CURR_USER_KEY = "curr_user"
 
 app = Flask(__name__)
 
-app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///capstone1'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'postgresql:///capstone1')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SQLALCHEMY_ECHO'] = False
 app.config['DEBUG_TB_INTERCEPT_REDIRECTS'] = False
@@ -23,20 +48,55 @@ app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', "it's a secret")
 toolbar = DebugToolbarExtension(app)
 
 connect_db(app)
+init_http_cache(app)
+init_metrics(app)
+REGISTRY.register(GaugeSet("password_hashing", "Password hashing pool figures (see /api/stats/hashing).",
+                           password_hasher.stats))
+REGISTRY.register(GaugeSet("igdb_circuit", "IGDB circuit breaker state and counts (see /api/stats/igdb).",
+                           igdb.breaker.stats))
+
+if GAME_CACHE_DURABLE:
+    game_cache.backing = SQLCacheBacking(app, encode=encode_cache_entry, decode=decode_cache_entry)
+
+if CATALOG_REFRESH_INTERVAL:
+    catalog.start_scheduler(CATALOG_REFRESH_INTERVAL)
+
+cache_warmer = CacheWarmer(app)
+if WARM_CACHE_INTERVAL:
+    cache_warmer.start_scheduler(WARM_CACHE_INTERVAL)
+
+similarity_updater = SimilarityUpdater(app)
+
+fragment_cache = FragmentCache(FRAGMENT_CACHE_MAXSIZE)
 
 ##############################################################################
 # User signup/login/logout
 
 
-@app.before_request
-def add_user_to_g():
-    """If we're logged in, add curr user to Flask global."""
+class AppGlobals(_AppCtxGlobals):
+    """Flask `g` whose `user` is only looked up when something reads it."""
+
+    @property
+    def user(self):
+        if '_user' not in self.__dict__:
+            self.__dict__['_user'] = load_current_user()
+        return self.__dict__['_user']
+
+    @user.setter
+    def user(self, value):
+        self.__dict__['_user'] = value
+
+
+app.app_ctx_globals_class = AppGlobals
+
+
+def load_current_user():
+    """If we're logged in, return curr user (from the identity cache)."""
 
     if CURR_USER_KEY in session:
-        g.user = User.query.get(session[CURR_USER_KEY])
+        return user_cache.get(session[CURR_USER_KEY])
 
-    else:
-        g.user = None
+    return None
 
 
 def do_login(user):
@@ -49,12 +109,42 @@ def do_logout():
     """Logout user."""
 
     if CURR_USER_KEY in session:
-        del session[CURR_USER_KEY]
+        user_cache.invalidate(session.pop(CURR_USER_KEY))
 
         flash("Successfully logged out.")
 
 
 
+@app.errorhandler(HashingBusy)
+def hashing_busy(error):
+    """Fail fast when the password hashing pool is saturated."""
+
+    return "Too many sign-ins right now, please try again in a moment.", 503, {"Retry-After": "1"}
+
+
+@app.errorhandler(IGDBError)
+def igdb_unavailable(error):
+    """IGDB is down (or its breaker is open) and nothing cached can stand in."""
+
+    retry_after = max(math.ceil(igdb.breaker.retry_after()), 1)
+    return ("Game data is unavailable right now, please try again in a moment.", 503,
+            {"Retry-After": str(retry_after)})
+
+
+def serving_stale_data():
+    """Whether this request used cached game data that can't be refreshed because IGDB is unavailable."""
+
+    timings = current_timings()
+    return bool(timings and timings.stale_reads) and igdb.breaker.state != CircuitBreaker.CLOSED
+
+
+@app.after_request
+def mark_stale_data(response):
+    if serving_stale_data():
+        response.headers['X-Data-Stale'] = '1'
+    return response
+
+
 @app.route('/signup', methods=["GET", "POST"])
 def signup():
     """Handle user signup.
@@ -133,38 +223,72 @@ def display_games(page_num=1):
     platform_id = request.args.get('platform')
     genre_id = request.args.get('genre')
 
-    games = get_game_info(limit=20, offset=offset, platform_id=platform_id, genre_id=genre_id)
+    # The page of games and the total count come back from one IGDB multiquery
+    games_page = get_games_page(limit=20, offset=offset)
+    games = games_page['games']
+    has_next = offset + len(games) < games_page['count']
     user = g.user if g.user else None
 
-    # Calculate average ratings
-    avg_ratings = db.session.query(Rating.game_id, func.avg(Rating.rating).label('avg_rating')).group_by(Rating.game_id).all()
+    # Look up average ratings for just the games on this page
+    avg_ratings = GameRatingStats.averages_for(game['id'] for game in games)
 
-    for game in games:
-        game_id = game['id']
-        try:
-            game['avg_rating'] = round(next(rating[1] for rating in avg_ratings if rating[0] == game_id), 2)
-        except StopIteration:
-            game['avg_rating'] = "Not yet available"
-
-    return render_template('index.html', games=games, page=page_num, user=user, form=form)
+    return render_template('index.html', games=games, avg_ratings=avg_ratings, page=page_num, has_next=has_next,
+                           user=user, form=form)
 
  
 
+PROFILE_RATINGS_PER_PAGE = 20
+
+
+def load_profile(user_id, page=1, per_page=PROFILE_RATINGS_PER_PAGE):
+    """Load everything the profile page shows in a fixed number of queries.
+
+    One query for the user plus one for their lists (selectinload), a
+    count and a page query for their ratings, and one batched (usually
+    cached) IGDB lookup for the rated games' names. Returns None if the
+    user doesn't exist.
+    """
+
+    user = db.session.execute(
+        db.select(User).options(selectinload(User.lists)).where(User.id == user_id)
+    ).scalar_one_or_none()
+    if user is None:
+        return None
+
+    ratings = db.paginate(
+        db.select(Rating).where(Rating.user_id == user_id).order_by(Rating.rating.desc(), Rating.game_id),
+        page=page, per_page=per_page, error_out=False,
+    )
+    rated_games = {game['id']: game for game in get_games_by_ids(rating.game_id for rating in ratings.items)}
+
+    return dict(user=user, ratings=ratings, rated_games=rated_games)
+
+
 @app.route('/users/profile/<int:user_id>')
 def show_profile(user_id):
-    user = User.query.get_or_404(user_id)
-    return render_template('/users/profile.html', user=user)
+    page = request.args.get('page', 1, type=int)
+    profile = load_profile(user_id, page=max(page, 1))
+    if profile is None:
+        abort(404)
+
+    return render_template('/users/profile.html', **profile)
 
 @app.route('/games/<int:game_id>')
 def show_game_details(game_id):
-    game = get_single_game_info(game_id) 
+    # Precomputed neighbours: one index scan, read first so they can join the details multiquery
+    similar_ids = GameSimilarity.similar_to(game_id, limit=SIMILAR_GAMES_SHOWN)
+    game = get_game_details(game_id, with_games=similar_ids)  # game, release dates and neighbours in one IGDB call
+    if game is None:
+        abort(404)
+    similar_games = get_games_by_ids(similar_ids)  # cached by the call above unless the details were already cached
     user = g.user
-    
+
     existing_rating = None
     if user:
         existing_rating = Rating.query.filter_by(user_id=user.id, game_id=game_id).first()
 
-    return render_template('game_detail.html', game=game, user=user, existing_rating=existing_rating)
+    return render_template('game_detail.html', game=game, user=user, existing_rating=existing_rating,
+                           similar_games=similar_games)
 
 
 ##########################################################################################
@@ -181,18 +305,23 @@ def rate_game(game_id):
     rating = int(request.form.get('rating'))
     user_id = g.user.id
 
-    existing_rating = Rating.query.filter_by(user_id=user_id, game_id=game_id).first()
+    # Any IGDB lookup for the leaderboards happens before the rating rows are locked
+    facets = facets_to_add(game_id)
 
-    if existing_rating:
-        existing_rating.rating = rating
+    # One INSERT ... ON CONFLICT; its trigger adjusts game_rating_stats in the same statement
+    old_rating = Rating.upsert(user_id, game_id, rating)
+    record_rating(game_id, facets)
+    fragment_cache.invalidate(game_id)
+
+    if old_rating is not None:
         flash("Rating updated!", "success")
     else:
-        new_rating = Rating(user_id=user_id, game_id=game_id, rating=rating)
-        db.session.add(new_rating)
         flash("Rating submitted!", "success")
 
     db.session.commit()
-    return redirect(url_for('show_game_details', game_id=game_id, existing_rating=existing_rating))
+    if old_rating != rating:
+        similarity_updater.mark(game_id)
+    return redirect(url_for('show_game_details', game_id=game_id))
 
 ##########################################################################################
 #Lists
@@ -207,20 +336,18 @@ def create_list():
 
     form = CreateListForm()
 
-    all_games = get_game_info(limit=500)  
-    game_choices = [(game['id'], game['name']) for game in all_games]
-
-    # Update the form field's choices
-    form.game_select.choices = game_choices 
+    # Choices (and so validation of the selected ids) come from the in-memory name index
+    form.game_select.choices = get_game_index().choices()
 
     if form.validate_on_submit():
-        games = request.form.getlist('game_select')  # Extract selected game IDs
+        games = form.game_select.data  # Selected game IDs, checked against the index
         
         if games:
             name = form.name.data
             user_id = g.user.id
-            new_list = List(user_id=user_id, title=name, games=games)
+            new_list = List(user_id=user_id, title=name)
             db.session.add(new_list)
+            new_list.set_games(games)
             db.session.commit()
 
             flash("List created successfully.", 'success')
@@ -243,9 +370,8 @@ def display_list(list_id):
     if list is None:
         abort(404)
 
-    # Calculate average ratings
-    avg_ratings = db.session.query(Rating.game_id, func.avg(Rating.rating).label('avg_rating')).group_by(Rating.game_id).all()
-    game_data = [get_single_game_info(game_id) for game_id in list.games]
+    game_data = get_games_by_ids(list.games)
+    avg_ratings = GameRatingStats.averages_for(game['id'] for game in game_data)
 
 
     return render_template('list_detail.html', user=user, list=list, avg_ratings=avg_ratings, games=game_data)
@@ -262,23 +388,22 @@ def edit_list(list_id):
     list = List.query.get_or_404(list_id)  # Retrieve the list object from the database
     form = CreateListForm(obj=list)  # Set the form object using the list object
 
-    all_games = get_game_info(limit=500)  
-    game_choices = [(game['id'], game['name']) for game in all_games]
-    form.game_select.choices = game_choices 
+    # Make sure games already on the list are valid choices, then validate against the index
+    game_index = get_game_index()
+    game_index.add_games(get_games_by_ids(game_id for game_id in list.games if game_id not in game_index))
+    form.game_select.choices = game_index.choices()
 
-    # Convert game IDs to integers
-    list_games = [int(game_id) for game_id in list.games]
-
-    # Set the data for the game_select field in the form
-    form.game_select.data = list_games
-    form.name.data = list.title
+    if request.method == 'GET':
+        # Prefill with the list as it is; on POST the submitted values are what gets validated
+        form.game_select.data = list.games
+        form.name.data = list.title
 
     if form.validate_on_submit():
-        games = request.form.getlist('game_select')  
-        
+        games = form.game_select.data  # only ids that are valid choices get past validation
+
         if games:
             list.title = form.name.data  # Update the list object with new data from the form
-            list.games = games
+            list.set_games(games)
             db.session.commit()
 
             flash("List updated successfully.", 'success')
@@ -306,61 +431,300 @@ def delete_list(list_id):
 
 
 
+##########################################################################################
+#Images
+
+
+def cover_url(game, size):
+    """Proxied URL of a game's cover (IGDB record or summary), or the placeholder."""
+
+    image_id = image_id_from_url(game.get('cover_url') or (game.get('cover') or {}).get('url'))
+    if not image_id:
+        return url_for('static', filename='images/alt_cover_img.jpg')
+    # v names the exact image, so the URL changes whenever the cover does
+    return url_for('game_cover', game_id=game['id'], size=size, v=image_id)
+
+
+def screenshot_url(game, index, size):
+    image_id = image_id_from_url(game['screenshots'][index].get('url'))
+    return url_for('game_screenshot', game_id=game['id'], index=index, size=size, v=image_id)
+
+
+def send_image(image_id, size):
+    try:
+        path = image_cache.path_for(image_id, size)
+    except ValueError:
+        abort(404)
+    except ImageFetchError:
+        abort(502)
+    return send_file(path, mimetype='image/jpeg', conditional=True, etag=True)
+
+
+def send_versioned_image(image_id, size, endpoint, **values):
+    """Send `image_id` if the request's `v` names it, else redirect to the URL that does.
+
+    Only a response for the exact image is cached as immutable: a request
+    without `v`, or with one the game no longer uses (a page rendered
+    before the cover changed, or a made-up id), is sent to the current
+    URL, and the redirect itself is not cached.
+    """
+
+    if not image_id:
+        abort(404)
+    if request.args.get('v') != image_id:
+        return redirect(url_for(endpoint, size=size, v=image_id, **values))
+    return send_image(image_id, size)
+
+
+@app.route('/img/<int:game_id>/<size>')
+@cache_policy(max_age=ONE_YEAR, public=True, immutable=True)
+def game_cover(game_id, size):
+    """A game's cover resized to `size`, from the local image cache."""
+
+    game = get_single_game_info(game_id)
+    if game is None:
+        abort(404)
+    image_id = image_id_from_url((game.get('cover') or {}).get('url'))
+    return send_versioned_image(image_id, size, 'game_cover', game_id=game_id)
+
+
+@app.route('/img/<int:game_id>/screenshots/<int:index>/<size>')
+@cache_policy(max_age=ONE_YEAR, public=True, immutable=True)
+def game_screenshot(game_id, index, size):
+    game = get_single_game_info(game_id)
+    if game is None:
+        abort(404)
+    screenshots = game.get('screenshots') or []
+    if index >= len(screenshots):
+        abort(404)
+    image_id = image_id_from_url(screenshots[index].get('url'))
+    return send_versioned_image(image_id, size, 'game_screenshot', game_id=game_id, index=index)
+
+
+##########################################################################################
+#Game cards
+
+
+def card_names(items):
+    # Summaries list genre/platform names, full IGDB records list {id, name} objects
+    return tuple(item['name'] if isinstance(item, dict) else item for item in items or ())
+
+
+def game_card(game, avg_rating):
+    """The rendered card for `game` (IGDB record or summary), from the fragment cache.
+
+    The card is keyed by everything it shows, so new metadata or a new
+    average rating renders it again.
+    """
+
+    card = {
+        'id': game['id'],
+        'name': game.get('name'),
+        'cover_url': game.get('cover_url') or (game.get('cover') or {}).get('url'),
+        'genres': card_names(game.get('genres')),
+        'platforms': card_names(game.get('platforms')),
+        'aggregated_rating': game.get('aggregated_rating'),
+        'aggregated_rating_count': game.get('aggregated_rating_count'),
+        'avg_rating': avg_rating,
+    }
+    return fragment_cache.get_or_render('_game_card.html', game['id'], tuple(card.values()),
+                                        lambda: render_template('_game_card.html', game=card))
+
+
 ##########################################################################################
 #API endpoints
 
+def catalog_response(name):
+    """Serve a catalog section from memory with its precomputed strong ETag."""
+
+    section = catalog.section(name)
+    response = app.response_class(section.body, mimetype='application/json')
+    response.set_etag(section.etag)
+    return response
+
 @app.route('/api/platforms')
+@cache_policy(max_age=CATALOG_HTTP_MAX_AGE, public=True, etag=True)
 def get_platforms():
-  response = get_platforms_info()
-  return jsonify(response.json()) 
+    return catalog_response('platforms')
 
 @app.route('/api/genres') 
+@cache_policy(max_age=CATALOG_HTTP_MAX_AGE, public=True, etag=True)
 def get_genres():
-  response = get_genres_info()
-  return jsonify(response.json()) 
+    return catalog_response('genres')
 
-@app.route("/api/games")
-def get_games():
-    platform_id_str = request.args.get('platform')
-    genre_id_str = request.args.get('genre')
-    
-    if platform_id_str:
-        platform_id = int(platform_id_str)  # Convert to integer 
-    else:
-        platform_id = None  # Set to None if not provided
-    if genre_id_str:
-        genre_id = int(genre_id_str)  # Convert to integer 
-    else:
-        genre_id = None  # Set to None if not provided
+GAME_FIELDS = ('id', 'name', 'summary', 'aggregated_rating', 'aggregated_rating_count',
+               'cover_url', 'genres', 'platforms', 'hypes', 'avg_rating')
 
-    # Build the query for IGDB based on platform_id and genre_id 
-    filters = ""
-    if platform_id and genre_id:
-        filters += f"platforms={platform_id} & genres={genre_id};"
-    elif platform_id:
-        filters += f"platforms={platform_id};"
-    elif genre_id:
-        filters += f"genres={genre_id};"
 
-    # Call helper functions to fetch data
-    games_info = get_game_info(platform_id=platform_id, genre_id=genre_id, filters=filters)  
+def encode_cursor(offset):
+    return base64.urlsafe_b64encode(f"o:{offset}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    kind, _, offset = base64.urlsafe_b64decode(cursor.encode()).decode().partition(':')
+    if kind != 'o' or not offset.isdigit():
+        raise ValueError(cursor)
+    return int(offset)
+
+
+def encode_keyset_cursor(score, game_id):
+    return base64.urlsafe_b64encode(f"k:{score!r}:{game_id}".encode()).decode()
+
+
+def decode_keyset_cursor(cursor):
+    kind, _, position = base64.urlsafe_b64decode(cursor.encode()).decode().partition(':')
+    score, _, game_id = position.rpartition(':')
+    if kind != 'k' or not game_id.isdigit():
+        raise ValueError(cursor)
+    return float(score), int(game_id)
+
+
+def add_avg_ratings(games):
+    """Attach community averages to a batch of games with one aggregate lookup."""
+
+    avg_ratings = GameRatingStats.averages_for(game['id'] for game in games)
+    for game in games:
+        avg_rating = avg_ratings.get(game['id'])
+        game['avg_rating'] = round(avg_rating, 2) if avg_rating is not None else None
+    return games
+
 
-    if not games_info: 
+@app.route("/api/games")
+@cache_policy(max_age=5 * 60, public=True, etag=True)
+def get_games():
+    """Games as a JSON array, most hyped first.
+
+    Query params: platform, genre, limit (max API_GAMES_MAX_LIMIT),
+    offset or cursor (from the X-Next-Cursor header), and fields (a
+    comma-separated projection of GAME_FIELDS). Answers that fit in one
+    upstream page of API_GAMES_PAGE_SIZE are sent whole and cached
+    publicly. Longer ones are streamed out as pages arrive, so memory per
+    request stays bounded whatever the limit; they aren't cached, since a
+    page that fails after the headers went out can only cut the array short.
+    """
+
+    platform_id = request.args.get('platform', type=int)
+    genre_id = request.args.get('genre', type=int)
+    limit = max(1, min(request.args.get('limit', 20, type=int), API_GAMES_MAX_LIMIT))
+
+    try:
+        cursor = request.args.get('cursor')
+        offset = decode_cursor(cursor) if cursor else max(request.args.get('offset', 0, type=int), 0)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    fields = [field for field in request.args.get('fields', '').split(',') if field]
+    unknown = set(fields) - set(GAME_FIELDS)
+    if unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(sorted(unknown))}"}), 400
+    fields = fields or list(GAME_FIELDS)
+
+    filters = build_game_filters(platform_id, genre_id)
+
+    def fetch_page(page_offset):
+        page_limit = min(API_GAMES_PAGE_SIZE, offset + limit - page_offset)
+        games = get_game_info(limit=page_limit, offset=page_offset, filters=filters)
+        if 'avg_rating' in fields:
+            add_avg_ratings(games)
+        return [{field: game.get(field) for field in fields} for game in games], page_limit
+
+    first_page, first_limit = fetch_page(offset)
+    if not first_page and offset == 0:
       return jsonify({'error': 'No games found matching your filters'}), 404
 
-    return jsonify(games_info)
+    if len(first_page) < first_limit or first_limit >= limit:
+        response = app.response_class(json.dumps(first_page), mimetype='application/json')
+        response.headers['X-Next-Cursor'] = encode_cursor(offset + limit)
+        return response
+
+    def generate():
+        yield '['
+        page, page_limit, page_offset = first_page, first_limit, offset
+        separator = ''
+        while True:
+            for game in page:
+                yield separator + json.dumps(game)
+                separator = ','
+            page_offset += page_limit
+            if len(page) < page_limit or page_offset >= offset + limit:
+                break
+            try:
+                page, page_limit = fetch_page(page_offset)
+            except IGDBError:
+                # The 200 is already sent; end with valid JSON rather than a cut-off body
+                app.logger.warning("/api/games stream ended early at offset %d", page_offset, exc_info=True)
+                break
+        yield ']'
+
+    response = app.response_class(stream_with_context(generate()), mimetype='application/json')
+    response.headers['X-Next-Cursor'] = encode_cursor(offset + limit)
+    response.cache_policy = PERSONALIZED
+    return response
+
+
+@app.route('/api/top')
+@cache_policy(max_age=60, public=True, etag=True)
+def top_rated_games():
+    """Community top-rated games, best Bayesian score first.
+
+    Query params: platform or genre (one leaderboard at a time), limit
+    (max API_TOP_MAX_LIMIT) and cursor (from the X-Next-Cursor header).
+    Each page is one index seek, however deep it is.
+    """
 
+    platform_id = request.args.get('platform', type=int)
+    genre_id = request.args.get('genre', type=int)
+    if platform_id and genre_id:
+        return jsonify({'error': 'Filter by platform or genre, not both'}), 400
+    limit = max(1, min(request.args.get('limit', 20, type=int), API_TOP_MAX_LIMIT))
+
+    try:
+        cursor = request.args.get('cursor')
+        after = decode_keyset_cursor(cursor) if cursor else None
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    entries = LeaderboardEntry.page(facet_for(platform_id, genre_id), limit, after=after)
+    games = {game['id']: game for game in get_games_by_ids(entry.game_id for entry in entries)}
+
+    response = jsonify([
+        {
+            'id': entry.game_id,
+            'name': games.get(entry.game_id, {}).get('name'),
+            'cover_url': games.get(entry.game_id, {}).get('cover', {}).get('url'),
+            'score': round(entry.score, 3),
+            'rating_count': entry.rating_count,
+        }
+        for entry in entries
+    ])
+    if len(entries) == limit:
+        response.headers['X-Next-Cursor'] = encode_keyset_cursor(entries[-1].score, entries[-1].game_id)
+    return response
+
+
+@app.route('/api/stats/hashing')
+def hashing_stats():
+    """Password hashing pool latency and queue depth."""
+    return jsonify(password_hasher.stats())
+
+@app.route('/api/stats/igdb')
+def igdb_stats():
+    """IGDB circuit breaker state: closed, open or half_open, with failure counts."""
+    return jsonify(igdb.breaker.stats())
 
 @app.route('/api/search')
-def search_games():
+@cache_policy(max_age=60, public=True, etag=True)
+def search_game_names():
+    """Typeahead: ranked game name matches from the in-memory index."""
     query = request.args.get('query', '')  
-    search_results = search_games(query)   
+    limit = min(request.args.get('limit', 10, type=int), 50)
+    search_results = get_game_index().search(query, limit=limit)
     return jsonify(search_results)
 
 @app.route('/api/games/all')
+@cache_policy(max_age=60 * 60, public=True, etag=True)
 def get_all_games():
-    games_info = get_game_info(limit=500)  # Fetch enough games for the dropdown
-    games_list = [{'id': game['id'], 'name': game['name']} for game in games_info]
+    games_list = [{'id': game_id, 'name': name} for game_id, name in get_game_index().choices()]
     return jsonify(games_list)
 
 
@@ -373,27 +737,106 @@ def init_db():
         db.create_all()
         print("DB initialized.")
 
-@app.context_processor
-def utility_processor():
-    # Return a dictionary with the function as a value
-    return dict(get_single_game_info=get_single_game_info)
+@app.cli.command("warm-cache")
+@click.option("--pages", type=int, help="Leading pages of each listing to fetch.")
+@click.option("--force", is_flag=True, help="Refetch entries even if they are still fresh.")
+def warm_cache(pages, force):
+    """Prefetch hot game pages and popular game details into the cache.
 
+    This runs in its own process, so only the durable games_cache table
+    carries what it fetches over to the web workers.
+    """
+    if game_cache.backing is None:
+        raise click.ClickException("warm-cache would only fill this process's memory. Set GAME_CACHE_DURABLE=1 "
+                                   "so the web workers read the warmed entries from the games_cache table, or set "
+                                   "WARM_CACHE_INTERVAL to warm each worker in-process.")
+    with app.app_context():
+        db.create_all()
+        if pages is not None:
+            cache_warmer.pages = pages
+        start = time.monotonic()
+        warmed = cache_warmer.warm(min_fresh=float('inf') if force else 0)
+        print(f"Warmed {warmed['pages']} pages and {warmed['games']} games in {time.monotonic() - start:.1f}s "
+              f"({warmed['failed']} failed).")
+
+@app.cli.command("rebuild-rating-stats")
+def rebuild_rating_stats():
+    """Install the ratings stats trigger and recompute game_rating_stats from the ratings table."""
+    with app.app_context():
+        db.create_all()
+        GameRatingStats.install_trigger()
+        GameRatingStats.rebuild()
+        db.session.commit()
+        print("Rating stats rebuilt.")
+
+@app.cli.command("build-similar-games")
+def build_similar_games():
+    """Recompute every game's "players who rated this also liked" neighbours."""
+    with app.app_context():
+        db.create_all()
+        # ratings predates ix_ratings_game_id, which create_all won't add to an existing table
+        db.session.execute(db.text("CREATE INDEX IF NOT EXISTS ix_ratings_game_id ON ratings (game_id)"))
+        written = rebuild_similarities()
+        db.session.commit()
+        print(f"Stored {written} similar-game pairs.")
+
+@app.cli.command("rebuild-leaderboards")
+def rebuild_leaderboards_command():
+    """Recompute the top-rated leaderboards from game_rating_stats."""
+    with app.app_context():
+        db.create_all()
+        written = rebuild_leaderboards()
+        db.session.commit()
+        print(f"Stored {written} leaderboard entries.")
+
+@app.cli.command("import-ratings")
+@click.argument("csv_file", type=click.File("r"))
+def import_ratings(csv_file):
+    """Bulk-load ratings from a user_id,game_id,rating CSV ('-' for stdin)."""
+    with app.app_context():
+        written = Rating.copy_from_csv(csv_file)
+        GameRatingStats.rebuild()
+        db.session.commit()
+        print(f"Imported {written} ratings. Run rebuild-leaderboards and build-similar-games to rank them.")
+
+@app.cli.command("export-ratings")
+@click.argument("csv_file", type=click.File("w"))
+def export_ratings(csv_file):
+    """Write every rating to a user_id,game_id,rating CSV ('-' for stdout)."""
+    with app.app_context():
+        Rating.copy_to_csv(csv_file)
 
-##############################################################################
-# Turn off all caching in Flask
-#   (useful for dev; in production, this kind of stuff is typically
-#   handled elsewhere)
-#
-# https://stackoverflow.com/questions/34066804/disabling-caching-in-flask
-
-@app.after_request
-def add_header(req):
-    """Add non-caching headers on every request."""
-
-    req.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    req.headers["Pragma"] = "no-cache"
-    req.headers["Expires"] = "0"
-    req.headers['Cache-Control'] = 'public, max-age=0'
-    return req
-
+@app.cli.command("backfill-list-items")
+def backfill_list_items():
+    """Move list game ids from the lists.games JSON column into list_items."""
+    with app.app_context():
+        db.create_all()
+        if db.engine.dialect.name == 'postgresql':
+            # New lists no longer write the JSON column
+            db.session.execute(db.text("ALTER TABLE lists ALTER COLUMN games DROP NOT NULL"))
+        backfilled = List.backfill_items()
+        db.session.commit()
+        print(f"Backfilled {backfilled} lists.")
+
+@app.cli.command("refresh-catalog")
+def refresh_catalog():
+    """Reload platforms and genres from IGDB.
+
+    The web workers pick the new snapshot up from the durable games_cache
+    table at their next age-based reload (CATALOG_MAX_AGE).
+    """
+    if game_cache.backing is None:
+        raise click.ClickException("refresh-catalog would only update this process's memory. Set "
+                                   "GAME_CACHE_DURABLE=1 so the web workers read the new catalog from the "
+                                   "games_cache table, or set CATALOG_REFRESH_INTERVAL to refresh each worker in-process.")
+    with app.app_context():
+        db.create_all()
+        catalog.refresh()
+        print(f"Catalog refreshed: {len(catalog.platform_names())} platforms, {len(catalog.genre_names())} genres.")
 
+@app.context_processor
+def utility_processor():
+    # Return a dictionary with the function as a value
+    return dict(get_single_game_info=get_single_game_info, get_games_by_ids=get_games_by_ids,
+                cover_url=cover_url, screenshot_url=screenshot_url, game_card=game_card,
+                serving_stale_data=serving_stale_data)
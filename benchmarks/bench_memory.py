@@ -0,0 +1,89 @@
+"""Memory taken by cached game metadata, per layout.
+
+Generates games with `tests.fake_igdb.make_games`, decodes them from JSON
+the way `requests` does (so every game has its own copies of the genre and
+platform names, as real IGDB answers do) and measures, with tracemalloc,
+what it costs to keep them in each form the game cache has used:
+
+    igdb     the IGDB record dicts (game:<id> entries before GameRecord)
+    summary  the flat card dicts (listing entries before GameRecord)
+    record   GameRecord, with interned genre and platform ids
+
+    python -m benchmarks.bench_memory --games 100000
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from game_record import GameRecord  # noqa: E402
+from tests.fake_igdb import make_games  # noqa: E402
+
+
+def summarize(game):
+    """The card dict the listings cached before GameRecord."""
+
+    return {
+        "id": game.get("id"),
+        "name": game.get("name"),
+        "summary": game.get("summary"),
+        "aggregated_rating": game.get("aggregated_rating"),
+        "aggregated_rating_count": game.get("aggregated_rating_count"),
+        "cover_url": game.get("cover", {}).get("url"),
+        "genres": [genre.get("name") for genre in game.get("genres", [])],
+        "platforms": [platform.get("name") for platform in game.get("platforms", [])],
+        "hypes": game.get("hypes"),
+    }
+
+
+LAYOUTS = {
+    "igdb": lambda games: games,
+    "summary": lambda games: [summarize(game) for game in games],
+    "record": lambda games: [GameRecord.from_igdb(game) for game in games],
+}
+
+
+def measure(payload, build):
+    """Bytes still allocated once `build` has turned the decoded `payload` into its cached form."""
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    cached = build(json.loads(payload))
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del cached
+    return used
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--layouts", default=",".join(LAYOUTS))
+    args = parser.parse_args(argv)
+
+    payload = json.dumps(make_games(args.games, seed=args.seed))
+    print(f"{args.games} games, {len(payload) / args.games:.0f} bytes of JSON each\n")
+    print(f"{'layout':<10}{'MiB':>10}{'bytes/game':>12}")
+
+    results = {}
+    for name in args.layouts.split(","):
+        used = measure(payload, LAYOUTS[name])
+        results[name] = used
+        print(f"{name:<10}{used / 2 ** 20:>10.1f}{used / args.games:>12.0f}")
+
+    if "igdb" in results and "record" in results:
+        print(f"\nGameRecord takes {results['record'] / results['igdb']:.0%} of the IGDB dicts' memory")
+    return results
+
+
+if __name__ == "__main__":
+    main()
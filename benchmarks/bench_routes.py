@@ -0,0 +1,264 @@
+"""End-to-end load test for the main routes, against the fake IGDB server.
+
+Starts `tests.fake_igdb.FakeIGDBServer` with thousands of generated games,
+seeds a Postgres database with users, ratings and lists, serves the app
+with a threaded WSGI server and drives each route at a set of concurrency
+levels. For every route and level it reports p50/p95/p99 latency,
+throughput, error count and IGDB calls per request, and saves the results
+to benchmarks/results/<timestamp>-<commit>.json.
+
+    python -m benchmarks.bench_routes --concurrency 1,8,32 --requests 200
+    python -m benchmarks.bench_routes --compare benchmarks/results/<earlier>.json
+
+The database named by --database-url is dropped and recreated.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+sys.path.insert(0, ROOT)
+
+from tests.fake_igdb import FakeIGDBServer, make_games, load_games  # noqa: E402
+
+ROUTES = ["home", "game_detail", "list", "profile", "api_games", "api_platforms", "api_genres", "api_search"]
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL", "postgresql:///bench_capstone1"))
+    parser.add_argument("--games", type=int, default=5000, help="games served by the fake IGDB")
+    parser.add_argument("--fixture", help="JSON file of games to serve instead of generated ones")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--ratings-per-user", type=int, default=30)
+    parser.add_argument("--lists-per-user", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every IGDB answer")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=0, help="fake IGDB requests per second before 429 (0 = off)")
+    parser.add_argument("--igdb-rate-limit", type=float, default=None,
+                        help="override the app's IGDB_RATE_LIMIT (requests per second)")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route and concurrency level")
+    parser.add_argument("--routes", default=",".join(ROUTES))
+    parser.add_argument("--cold", action="store_true", help="clear the game cache before every route and level")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="where to write the JSON results")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    return parser.parse_args(argv)
+
+
+def start_fake_igdb(args):
+    games = load_games(args.fixture) if args.fixture else make_games(args.games, args.seed)
+    server = FakeIGDBServer(games, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                            rate_limit=args.rate_limit or None, seed=args.seed).start()
+
+    # config.py reads these at import time, so they must be set before the app is imported
+    os.environ["IGDB_BASE_URL"] = server.base_url
+    os.environ["TWITCH_TOKEN_URL"] = server.token_url
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("BCRYPT_LOG_ROUNDS", "4")
+    if args.igdb_rate_limit is not None:
+        os.environ["IGDB_RATE_LIMIT"] = str(args.igdb_rate_limit)
+    return server
+
+
+def seed_database(app, games, args):
+    """Create users with ratings and lists; return the ids the routes pick from."""
+
+    from models import db, User, List, Rating, GameRatingStats
+
+    rng = random.Random(args.seed)
+    game_ids = [game["id"] for game in games]
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        users = [User.signup(username=f"bench{i}", password="password", profile_image_url="")
+                 for i in range(args.users)]
+        db.session.flush()
+
+        lists = []
+        for user in users:
+            for game_id in rng.sample(game_ids, min(args.ratings_per_user, len(game_ids))):
+                db.session.add(Rating(user_id=user.id, game_id=game_id, rating=rng.randint(1, 5)))
+            for n in range(args.lists_per_user):
+                user_list = List(user_id=user.id, title=f"{user.username} list {n}")
+                db.session.add(user_list)
+                lists.append((user_list, rng.sample(game_ids, rng.randint(5, 25))))
+        db.session.flush()
+
+        for user_list, list_games in lists:
+            user_list.set_games(list_games)
+        db.session.commit()
+        GameRatingStats.rebuild()
+        db.session.commit()
+
+        return {
+            "users": [user.id for user in users],
+            "lists": [user_list.id for user_list, _ in lists],
+            "games": game_ids,
+            "words": sorted({word for game in games for word in game["name"].split()[:2]}),
+        }
+
+
+def route_paths(name, ids, rng):
+    """Return a function producing the next path to request for route `name`."""
+
+    pages = max(len(ids["games"]) // 20, 1)
+    return {
+        "home": lambda: f"/?page={rng.randint(1, min(pages, 50))}",
+        "game_detail": lambda: f"/games/{rng.choice(ids['games'])}",
+        "list": lambda: f"/list/{rng.choice(ids['lists'])}",
+        "profile": lambda: f"/users/profile/{rng.choice(ids['users'])}",
+        "api_games": lambda: f"/api/games?limit=50&offset={rng.randint(0, 20) * 50}",
+        "api_platforms": lambda: "/api/platforms",
+        "api_genres": lambda: "/api/genres",
+        "api_search": lambda: f"/api/search?query={rng.choice(ids['words'])[:rng.randint(2, 5)]}",
+    }[name]
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+
+def run_route(base_url, next_path, concurrency, total):
+    """Issue `total` requests from `concurrency` threads; return latencies and errors."""
+
+    local = threading.local()
+    paths = [next_path() for _ in range(total)]
+
+    def fetch(path):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = local.session.get(base_url + path, timeout=60)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(fetch, paths))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency, _ in outcomes]
+    return {
+        "requests": total,
+        "errors": sum(1 for _, ok in outcomes if not ok),
+        "elapsed": round(elapsed, 3),
+        "throughput": round(total / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    print(f"\nCompared with {baseline['revision']} ({baseline['started_at']}):")
+    print(f"{'route':<15}{'conc':>5}{'p50 ms':>18}{'p95 ms':>18}{'req/s':>18}")
+    for key, current in results["routes"].items():
+        before = baseline["routes"].get(key)
+        if before is None:
+            continue
+        route, level = key.rsplit("@", 1)
+
+        def change(field):
+            old, new = before[field], current[field]
+            delta = f"{(new - old) / old * 100:+.0f}%" if old else "n/a"
+            return f"{new:>9} ({delta:>5})"
+
+        print(f"{route:<15}{level:>5}{change('p50_ms'):>18}{change('p95_ms'):>18}{change('throughput'):>18}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    levels = [int(level) for level in args.concurrency.split(",")]
+    routes = [route for route in args.routes.split(",") if route]
+
+    fake = start_fake_igdb(args)
+
+    from app import app
+    from api_utils import game_cache
+
+    app.config["DEBUG_TB_ENABLED"] = False
+    ids = seed_database(app, fake.games, args)
+
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    results = {
+        "revision": git_revision(),
+        "started_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "routes": {},
+    }
+
+    rng = random.Random(args.seed)
+    print(f"{'route':<15}{'conc':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'errors':>8}{'igdb/req':>10}")
+    try:
+        for route in routes:
+            next_path = route_paths(route, ids, rng)
+            for level in levels:
+                if args.cold:
+                    game_cache.clear()
+                fake.reset_calls()
+
+                stats = run_route(base_url, next_path, level, args.requests)
+                upstream = fake.call_counts()
+                stats["igdb_calls"] = upstream
+                stats["igdb_calls_per_request"] = round(sum(upstream.values()) / args.requests, 3)
+                results["routes"][f"{route}@{level}"] = stats
+
+                print(f"{route:<15}{level:>5}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}"
+                      f"{stats['throughput']:>10}{stats['errors']:>8}{stats['igdb_calls_per_request']:>10}")
+    finally:
+        server.shutdown()
+        fake.stop()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{results['started_at'].replace(':', '')}-{results['revision']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Prefetch the game data the busiest pages need.
+
+After a deploy the game cache is empty, so the first visitors to the
+homepage, the filtered listings and popular game pages would all wait on
+IGDB. `CacheWarmer.warm()` fetches those entries up front: the first
+WARM_CACHE_PAGES pages overall and for the most common platforms and
+genres, plus the details of the most-rated and most-listed games. Calls go
+through `run_parallel` on the warmer's own WARM_CACHE_CONCURRENCY threads,
+so a warm-up never takes the fan-out workers live requests wait on; it
+still shares the IGDB rate limit with them.
+
+Run it once with `flask warm-cache`, or set WARM_CACHE_INTERVAL to keep
+the entries refreshed in the background before they expire.
+"""
+
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from api_utils import build_game_filters, get_game_details, get_game_info, get_games_page, run_parallel
+from catalog import catalog
+from config import WARM_CACHE_CONCURRENCY, WARM_CACHE_FILTERS, WARM_CACHE_GAMES, WARM_CACHE_PAGES
+from models import GameRatingStats, ListItem
+
+# The homepage and the filtered infinite scroll both load 20 games at a time
+PAGE_SIZE = 20
+
+
+class CacheWarmer:
+    """Fetches hot pages and game details into the game cache."""
+
+    def __init__(self, app, pages=WARM_CACHE_PAGES, filters=WARM_CACHE_FILTERS, games=WARM_CACHE_GAMES,
+                 concurrency=WARM_CACHE_CONCURRENCY):
+        self.app = app
+        self.pages = pages
+        self.filters = filters
+        self.games = games
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="cache-warmer")
+        self._scheduler = None
+
+    def warm(self, min_fresh=0):
+        """Fetch every hot entry that is missing, stale or going stale within `min_fresh` seconds.
+
+        Needs an app context (popular games come from the database).
+        Returns counts of warmed pages and games, and of failed fetches.
+        """
+
+        offsets = [page * PAGE_SIZE for page in range(self.pages)]
+        summary = {"pages": 0, "games": 0, "failed": 0}
+
+        # The overall pages come first: the popular filters are read off them
+        home_pages = self._run(summary, "pages", [
+            lambda offset=offset: get_games_page(limit=PAGE_SIZE, offset=offset, min_fresh=min_fresh)
+            for offset in offsets
+        ])
+
+        calls = [
+            lambda filters=filters, offset=offset: get_game_info(limit=PAGE_SIZE, offset=offset, filters=filters,
+                                                                 min_fresh=min_fresh)
+            for filters in self.popular_filters(page["games"] for page in home_pages if page)
+            for offset in offsets
+        ]
+        self._run(summary, "pages", calls)
+
+        self._run(summary, "games", [
+            lambda game_id=game_id: get_game_details(game_id, min_fresh=min_fresh)
+            for game_id in self.popular_game_ids()
+        ])
+
+        return summary
+
+    def popular_filters(self, pages):
+        """`where` clauses for the platforms and genres most common among `pages` of games."""
+
+        platforms = Counter()
+        genres = Counter()
+        for games in pages:
+            for game in games:
+                platforms.update(game.get("platforms") or [])
+                genres.update(game.get("genres") or [])
+
+        platform_ids = {name: platform_id for platform_id, name in catalog.platform_names().items()}
+        genre_ids = {name: genre_id for genre_id, name in catalog.genre_names().items()}
+
+        by_platform = [build_game_filters(platform_id=platform_ids[name])
+                       for name, _ in platforms.most_common() if name in platform_ids]
+        by_genre = [build_game_filters(genre_id=genre_ids[name])
+                    for name, _ in genres.most_common() if name in genre_ids]
+        return by_platform[:self.filters] + by_genre[:self.filters]
+
+    def popular_game_ids(self):
+        """Ids of the most-rated and most-listed games, most-rated first, without repeats."""
+
+        game_ids = [game_id for game_id, _ in GameRatingStats.most_rated(self.games)]
+        game_ids += [game_id for game_id, _ in ListItem.most_listed(self.games)]
+        return list(dict.fromkeys(game_ids))
+
+    def start_scheduler(self, interval):
+        """Warm now, then every `interval` seconds, on a daemon thread."""
+
+        if self._scheduler is not None:
+            return
+
+        def run():
+            while True:
+                try:
+                    with self.app.app_context():
+                        # Refetch whatever would go stale before the run after next
+                        self.warm(min_fresh=2 * interval)
+                except Exception:
+                    self.app.logger.exception("Cache warm-up failed")
+                time.sleep(interval)
+
+        self._scheduler = threading.Thread(target=run, name="cache-warmer", daemon=True)
+        self._scheduler.start()
+
+    def _run(self, summary, kind, calls):
+        """Run `calls` in parallel; count successes under `kind` and failures under "failed"."""
+
+        def guarded(call):
+            try:
+                return True, call()
+            except Exception:
+                return False, None
+
+        results = run_parallel([lambda call=call: guarded(call) for call in calls], timeout=None,
+                               executor=self._executor)
+        summary[kind] += sum(1 for ok, _ in results if ok)
+        summary["failed"] += sum(1 for ok, _ in results if not ok)
+        return [value for ok, value in results if ok]
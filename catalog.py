@@ -0,0 +1,134 @@
+"""Platform and genre catalog.
+
+IGDB's platform and genre lists change maybe once a month, so they are
+loaded once (lazily, on first use), kept in memory with a precomputed
+JSON body and ETag, and refreshed when older than CATALOG_MAX_AGE, by the
+optional background scheduler, or with `flask refresh-catalog`.
+
+Snapshots are also written to the game cache. With its durable backing
+(GAME_CACHE_DURABLE=1) that is how a snapshot fetched by one process, such
+as `flask refresh-catalog`, reaches the others: an age-based reload takes
+a snapshot from the durable table if one younger than CATALOG_MAX_AGE is
+there, and only goes to IGDB otherwise.
+"""
+
+import hashlib
+import json
+import threading
+import time
+
+from api_utils import get_catalog_info, game_cache
+from config import CATALOG_MAX_AGE
+from game_record import GENRES, PLATFORMS
+
+CATALOG_CACHE_KEY = "catalog:platforms+genres"
+
+
+class CatalogSection:
+    """One immutable snapshot of a catalog list (platforms or genres)."""
+
+    def __init__(self, items):
+        self.items = items
+        self.names = {item["id"]: item["name"] for item in items}
+        self.body = json.dumps(items, separators=(",", ":")).encode()
+        self.etag = hashlib.sha1(self.body).hexdigest()
+
+
+class Catalog:
+    """In-memory platforms/genres served from a snapshot."""
+
+    def __init__(self, max_age=CATALOG_MAX_AGE):
+        self.max_age = max_age
+        self._sections = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+        self._scheduler = None
+
+    def section(self, name):
+        """Return the CatalogSection for 'platforms' or 'genres'."""
+
+        if self._sections is None or time.monotonic() - self._loaded_at > self.max_age:
+            with self._lock:
+                if self._sections is None:
+                    self._load(force=False)
+                elif time.monotonic() - self._loaded_at > self.max_age:
+                    try:
+                        self._load(force=True, shared_first=True)
+                    except Exception:
+                        # Keep serving the old snapshot; try again after another max_age.
+                        self._loaded_at = time.monotonic()
+
+        return self._sections[name]
+
+    def platform_names(self):
+        """Return {platform_id: name}."""
+        return self.section("platforms").names
+
+    def genre_names(self):
+        """Return {genre_id: name}."""
+        return self.section("genres").names
+
+    def refresh(self):
+        """Fetch a new snapshot from IGDB now."""
+
+        with self._lock:
+            self._load(force=True)
+
+    def start_scheduler(self, interval):
+        """Refresh the catalog every `interval` seconds on a daemon thread."""
+
+        if self._scheduler is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.refresh()
+                except Exception:
+                    pass
+
+        self._scheduler = threading.Thread(target=run, name="catalog-refresh", daemon=True)
+        self._scheduler.start()
+
+    def _load(self, force, shared_first=False):
+        """Build the snapshot from the game cache, or from IGDB if `force`.
+
+        With `shared_first`, a snapshot another process stored in the
+        durable cache less than `max_age` ago is used instead of IGDB.
+        """
+
+        age = 0
+        cached = None if force else game_cache.get(CATALOG_CACHE_KEY)
+        shared = self._shared_snapshot() if shared_first else None
+        if cached is not None:
+            data = cached[0]
+        elif shared is not None:
+            data, fetched_at = shared
+            age = max(time.time() - fetched_at, 0)
+        else:
+            data = get_catalog_info()
+            game_cache.set(CATALOG_CACHE_KEY, data)
+
+        self._sections = {name: CatalogSection(items) for name, items in data.items()}
+        # Cached game records refer to genres and platforms by id; share the names
+        GENRES.update(self._sections["genres"].names)
+        PLATFORMS.update(self._sections["platforms"].names)
+        self._loaded_at = time.monotonic() - age
+
+    def _shared_snapshot(self):
+        """(data, fetched_at) of a durable snapshot younger than `max_age`, or None.
+
+        Read from the table itself: this process's in-memory copy of the
+        entry is the old snapshot being replaced.
+        """
+
+        if game_cache.backing is None:
+            return None
+        entry = game_cache.backing.load(CATALOG_CACHE_KEY)
+        if entry is None or time.time() - entry[1] >= self.max_age:
+            return None
+        return entry
+
+
+catalog = Catalog()
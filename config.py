@@ -1,2 +1,82 @@
+import os
+
 TWITCH_CLIENT_ID="34g3gfz0smemtutprdhibuhj1ahrbi"
-TWITCH_CLIENT_SECRET="fjsaaf67x3m5h65je6fb6chg8jty46"
\ No newline at end of file
+TWITCH_CLIENT_SECRET="fjsaaf67x3m5h65je6fb6chg8jty46"
+
+# IGDB / Twitch endpoints (override to point at a local fake server)
+TWITCH_TOKEN_URL = os.environ.get('TWITCH_TOKEN_URL', "https://id.twitch.tv/oauth2/token")
+IGDB_BASE_URL = os.environ.get('IGDB_BASE_URL', "https://api.igdb.com/v4")
+
+# IGDB HTTP client
+IGDB_CONNECT_TIMEOUT = float(os.environ.get('IGDB_CONNECT_TIMEOUT', 3.05))
+IGDB_READ_TIMEOUT = float(os.environ.get('IGDB_READ_TIMEOUT', 10))
+IGDB_RATE_LIMIT = float(os.environ.get('IGDB_RATE_LIMIT', 4))  # requests per second
+IGDB_MAX_RETRIES = int(os.environ.get('IGDB_MAX_RETRIES', 3))
+IGDB_BACKOFF = float(os.environ.get('IGDB_BACKOFF', 0.5))  # seconds, doubled per retry
+IGDB_POOL_SIZE = int(os.environ.get('IGDB_POOL_SIZE', 10))
+IGDB_MAX_CONCURRENCY = int(os.environ.get('IGDB_MAX_CONCURRENCY', 4))  # parallel IGDB lookups per process
+IGDB_FANOUT_TIMEOUT = float(os.environ.get('IGDB_FANOUT_TIMEOUT', 15))  # seconds to wait for a parallel batch
+
+# IGDB circuit breaker
+IGDB_BREAKER_FAILURES = int(os.environ.get('IGDB_BREAKER_FAILURES', 5))  # consecutive failed or over-budget calls that open the breaker
+IGDB_BREAKER_RESET = float(os.environ.get('IGDB_BREAKER_RESET', 30))  # seconds the breaker stays open before probing IGDB again
+IGDB_BREAKER_PROBES = int(os.environ.get('IGDB_BREAKER_PROBES', 1))  # calls let through at once while probing
+IGDB_LATENCY_BUDGET = float(os.environ.get('IGDB_LATENCY_BUDGET', 5))  # seconds for the answering upstream attempt (rate-limit waits and earlier retries excluded); slower calls count as failures, 0 = off
+
+# Game metadata cache
+GAME_CACHE_TTL = int(os.environ.get('GAME_CACHE_TTL', 6 * 60 * 60))  # seconds an entry is fresh
+GAME_CACHE_STALE_TTL = int(os.environ.get('GAME_CACHE_STALE_TTL', 7 * 24 * 60 * 60))  # seconds a stale entry may still be served
+GAME_CACHE_MAXSIZE = int(os.environ.get('GAME_CACHE_MAXSIZE', 10000))  # entries kept in memory
+GAME_CACHE_DURABLE = os.environ.get('GAME_CACHE_DURABLE', '0') == '1'  # also keep entries in the games_cache table
+
+# Platform/genre catalog
+CATALOG_MAX_AGE = int(os.environ.get('CATALOG_MAX_AGE', 24 * 60 * 60))  # seconds before a lazy reload
+CATALOG_REFRESH_INTERVAL = int(os.environ.get('CATALOG_REFRESH_INTERVAL', 0))  # background refresh period, 0 = off
+CATALOG_HTTP_MAX_AGE = int(os.environ.get('CATALOG_HTTP_MAX_AGE', 60 * 60))  # Cache-Control max-age for /api/platforms and /api/genres
+
+# Game name search index
+SEARCH_INDEX_SIZE = int(os.environ.get('SEARCH_INDEX_SIZE', 500))  # games indexed (IGDB returns at most 500 per query)
+SEARCH_INDEX_MAX_AGE = int(os.environ.get('SEARCH_INDEX_MAX_AGE', 60 * 60))  # seconds before the index is rebuilt
+
+# /api/games
+API_GAMES_MAX_LIMIT = int(os.environ.get('API_GAMES_MAX_LIMIT', 500))  # most games one request may ask for
+API_GAMES_PAGE_SIZE = int(os.environ.get('API_GAMES_PAGE_SIZE', 50))  # games fetched (and streamed) per upstream call
+
+# Current-user cache
+USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 30))  # seconds a logged-in user's row is reused
+
+# Password hashing
+BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))  # bcrypt cost; older hashes are upgraded at login
+HASH_POOL_SIZE = int(os.environ.get('HASH_POOL_SIZE', 2))  # bcrypt worker threads per process
+HASH_QUEUE_LIMIT = int(os.environ.get('HASH_QUEUE_LIMIT', 8))  # hashes allowed to wait before answering 503
+HASH_TIMEOUT = float(os.environ.get('HASH_TIMEOUT', 10))  # seconds a request waits for its hash
+
+# Instrumentation
+SLOW_REQUEST_THRESHOLD = float(os.environ.get('SLOW_REQUEST_THRESHOLD', 1.0))  # seconds before a request is logged with its phase breakdown, 0 = off
+
+# Cache warm-up (flask warm-cache and the optional scheduler)
+WARM_CACHE_PAGES = int(os.environ.get('WARM_CACHE_PAGES', 5))  # leading pages of each game listing to prefetch
+WARM_CACHE_FILTERS = int(os.environ.get('WARM_CACHE_FILTERS', 5))  # most common platforms and genres (each) to prefetch pages for
+WARM_CACHE_GAMES = int(os.environ.get('WARM_CACHE_GAMES', 50))  # most-rated and most-listed games (each) to prefetch details for
+WARM_CACHE_INTERVAL = int(os.environ.get('WARM_CACHE_INTERVAL', 0))  # background refresh period, 0 = off
+WARM_CACHE_CONCURRENCY = int(os.environ.get('WARM_CACHE_CONCURRENCY', 2))  # warm-up fetches run at once, on the warmer's own threads
+
+# Similar games
+SIMILAR_GAMES_K = int(os.environ.get('SIMILAR_GAMES_K', 20))  # neighbours stored per game
+SIMILAR_GAMES_SHOWN = int(os.environ.get('SIMILAR_GAMES_SHOWN', 6))  # neighbours shown on the game page
+SIMILAR_GAMES_MIN_SUPPORT = int(os.environ.get('SIMILAR_GAMES_MIN_SUPPORT', 2))  # users who must have rated both games
+SIMILAR_GAMES_BLOCK = int(os.environ.get('SIMILAR_GAMES_BLOCK', 512))  # games scored per batch in a full rebuild
+SIMILAR_GAMES_UPDATE_DELAY = float(os.environ.get('SIMILAR_GAMES_UPDATE_DELAY', 5))  # seconds new ratings are batched before neighbours update
+
+# Top-rated leaderboard
+LEADERBOARD_PRIOR_MEAN = float(os.environ.get('LEADERBOARD_PRIOR_MEAN', 3.0))  # rating a game is assumed to have before anyone rates it (ratings are 1-5)
+LEADERBOARD_PRIOR_WEIGHT = float(os.environ.get('LEADERBOARD_PRIOR_WEIGHT', 5))  # how many ratings that assumption is worth
+API_TOP_MAX_LIMIT = int(os.environ.get('API_TOP_MAX_LIMIT', 100))  # most entries one /api/top page may hold
+
+# Image proxy
+IGDB_IMAGE_URL = os.environ.get('IGDB_IMAGE_URL', "https://images.igdb.com/igdb/image/upload")
+IMAGE_CACHE_DIR = os.environ.get('IMAGE_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'images'))
+IMAGE_QUALITY = int(os.environ.get('IMAGE_QUALITY', 82))  # JPEG quality of resized variants
+
+# Rendered game-card fragments
+FRAGMENT_CACHE_MAXSIZE = int(os.environ.get('FRAGMENT_CACHE_MAXSIZE', 5000))  # rendered cards kept in memory
@@ -0,0 +1,66 @@
+"""In-process cache of rendered per-game HTML fragments.
+
+The homepage and list pages render the same game card for a game on every
+request, so Jinja work grows with the number of games shown. Cards are
+cached here under (template, game id) together with a version: the data
+the card shows, i.e. the game's IGDB metadata and its rating aggregate. A
+lookup whose version differs from the cached one renders again, so a card
+is never older than the data the view just loaded. `invalidate()` drops a
+game's fragments outright when one of its ratings changes.
+"""
+
+import threading
+from collections import OrderedDict
+
+from markupsafe import Markup
+
+import metrics
+
+
+class FragmentCache:
+    """Size-bounded LRU of rendered fragments, each tagged with a version."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._templates = set()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, template, game_id, version, render):
+        """Return the fragment for `game_id` at `version`, calling `render()` if it isn't cached.
+
+        `render()` returns the fragment's HTML; it is cached as Markup so
+        the page template includes it without escaping.
+        """
+
+        key = (template, game_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                metrics.record_fragment_lookup(template, "hit")
+                return entry[1]
+
+        metrics.record_fragment_lookup(template, "miss")
+        html = Markup(render())
+        with self._lock:
+            self._templates.add(template)
+            self._entries[key] = (version, html)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return html
+
+    def invalidate(self, game_id):
+        """Drop every fragment cached for `game_id`."""
+
+        with self._lock:
+            for template in self._templates:
+                self._entries.pop((template, game_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,240 @@
+"""In-process cache for IGDB game metadata.
+
+Entries live in a size-bounded LRU for `ttl` seconds. After that they are
+stale: still served for up to `stale_ttl` more seconds while a single
+background refresh fetches a new copy. If fetching fails (IGDB is down, or
+its circuit breaker is open), whatever copy is still held is served
+however old it is. An optional durable backing (the `games_cache` table)
+keeps entries across restarts and workers.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from sqlalchemy.dialects import postgresql
+
+import metrics
+
+
+class GameCache:
+    """LRU + TTL cache with stale-while-revalidate."""
+
+    def __init__(self, ttl, maxsize, stale_ttl=0, backing=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.stale_ttl = stale_ttl
+        self.backing = backing
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, key, fresh_for=0):
+        """Return (value, is_fresh) for `key`, or None if unknown or too old.
+
+        With `fresh_for`, values that go stale within that many seconds
+        already count as stale.
+        """
+
+        return self.get_many([key], fresh_for).get(key)
+
+    def get_many(self, keys, fresh_for=0):
+        """Like `get` for many keys: {key: (value, is_fresh)} for the keys found.
+
+        Keys not in memory are loaded from the backing in one query.
+        """
+
+        now = time.time()
+        entries = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    entries[key] = entry
+
+        unloaded = [key for key in keys if key not in entries]
+        if unloaded and self.backing is not None:
+            for key, entry in self.backing.load_many(unloaded).items():
+                self._remember(key, entry)
+                entries[key] = entry
+
+        found = {}
+        for key in keys:
+            entry = entries.get(key)
+            if entry is None:
+                metrics.record_cache_lookup("miss")
+                continue
+            value, fetched_at = entry
+            age = now - fetched_at
+            if age < self.ttl - fresh_for:
+                metrics.record_cache_lookup("fresh")
+                found[key] = value, True
+            elif age < self.ttl + self.stale_ttl:
+                metrics.record_cache_lookup("stale")
+                found[key] = value, False
+            else:
+                metrics.record_cache_lookup("miss")
+        return found
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def set_many(self, values):
+        """Cache every {key: value} pair; the backing stores them in one transaction."""
+
+        if not values:
+            return
+        fetched_at = time.time()
+        for key, value in values.items():
+            self._remember(key, (value, fetched_at))
+        if self.backing is not None:
+            self.backing.store_many(values, fetched_at)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_or_fetch(self, key, fetch, min_fresh=0):
+        """Return the cached value for `key`, calling `fetch()` on a miss.
+
+        Stale values are returned as-is while `fetch()` runs once in the
+        background to replace them. With `min_fresh`, values that would go
+        stale within that many seconds are refetched right away instead
+        (the cache warmer uses this to refresh ahead of expiry).
+
+        If `fetch()` raises, an expired copy still in memory is returned
+        instead; with `min_fresh` the error is raised.
+        """
+
+        cached = self.get(key, fresh_for=min_fresh)
+        if cached is not None and (cached[1] or not min_fresh):
+            value, is_fresh = cached
+            if not is_fresh:
+                self.refresh_in_background([key], lambda: {key: fetch()})
+            return value
+
+        try:
+            value = fetch()
+        except Exception:
+            held = None if min_fresh else self._held(key)
+            if held is None:
+                raise
+            metrics.record_cache_lookup("fallback")
+            return held[0]
+        self.set(key, value)
+        return value
+
+    def get_many_or_fetch(self, keys, fetch_many):
+        """Like `get_or_fetch` for many keys at once.
+
+        `fetch_many(missing_keys)` must return a {key: value} dict; keys it
+        leaves out are treated as not found. Returns {key: value}.
+        """
+
+        cached = self.get_many(keys)
+        found = {key: value for key, (value, _) in cached.items()}
+        missing = [key for key in keys if key not in cached]
+        stale = [key for key, (_, is_fresh) in cached.items() if not is_fresh]
+
+        if stale:
+            self.refresh_in_background(stale, lambda: fetch_many(stale))
+
+        if missing:
+            try:
+                fetched = fetch_many(missing)
+            except Exception:
+                # Only answer from expired copies if every missing key has one
+                held = {key: self._held(key) for key in missing}
+                if any(entry is None for entry in held.values()):
+                    raise
+                fetched = {key: entry[0] for key, entry in held.items()}
+                for _ in fetched:
+                    metrics.record_cache_lookup("fallback")
+            else:
+                self.set_many(fetched)
+            found.update(fetched)
+
+        return found
+
+    def refresh_in_background(self, keys, fetch_many):
+        """Run `fetch_many()` on a thread unless these keys are already refreshing."""
+
+        with self._lock:
+            keys = [key for key in keys if key not in self._refreshing]
+            if not keys:
+                return
+            self._refreshing.update(keys)
+
+        def refresh():
+            try:
+                self.set_many(fetch_many())
+            except Exception:
+                # Keep serving the stale copy; the next read will try again.
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.difference_update(keys)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def _held(self, key):
+        """The (value, fetched_at) entry still in memory for `key`, however old, or None."""
+
+        with self._lock:
+            return self._entries.get(key)
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+class SQLCacheBacking:
+    """Durable cache backing stored in the `games_cache` table.
+
+    `encode(key, value)` and `decode(key, payload)` convert between cached
+    values and the JSON stored in the table; by default values are stored
+    as they are.
+    """
+
+    def __init__(self, app, encode=None, decode=None):
+        self.app = app
+        self.encode = encode or (lambda key, value: value)
+        self.decode = decode or (lambda key, payload: payload)
+
+    def load(self, key):
+        return self.load_many([key]).get(key)
+
+    def load_many(self, keys):
+        """{key: (value, fetched_at)} for the `keys` in the table, in one query."""
+
+        from models import GameCacheEntry
+
+        with self.app.app_context():
+            rows = GameCacheEntry.query.filter(GameCacheEntry.key.in_(list(keys))).all()
+            return {row.key: (self.decode(row.key, row.payload), row.fetched_at.replace(tzinfo=timezone.utc).timestamp())
+                    for row in rows}
+
+    def store(self, key, value, fetched_at):
+        self.store_many({key: value}, fetched_at)
+
+    def store_many(self, values, fetched_at):
+        """Upsert every {key: value} pair in one statement and one commit."""
+
+        from models import db, GameCacheEntry
+
+        fetched_at = datetime.fromtimestamp(fetched_at, timezone.utc).replace(tzinfo=None)
+        with self.app.app_context():
+            insert = postgresql.insert(GameCacheEntry).values([
+                {"key": key, "payload": self.encode(key, value), "fetched_at": fetched_at}
+                for key, value in values.items()
+            ])
+            db.session.execute(insert.on_conflict_do_update(
+                index_elements=[GameCacheEntry.key],
+                set_={"payload": insert.excluded.payload, "fetched_at": insert.excluded.fetched_at},
+            ))
+            db.session.commit()
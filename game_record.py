@@ -0,0 +1,157 @@
+"""Compact in-memory form of cached IGDB game metadata.
+
+IGDB answers with one dict per game, holding a list of {id, name} dicts for
+its genres and its platforms; kept as-is, thousands of cached games repeat
+the same few dozen names over and over. A `GameRecord` keeps one game in
+`__slots__` with its genres and platforms as tuples of IGDB ids; the names
+live once per process in the GENRES and PLATFORMS tables, which the
+catalog also fills in. The views still get plain dicts, from
+`to_summary()` (the flat card shape of the game listings) or `to_igdb()`
+(the IGDB record shape of `get_games_by_ids`).
+"""
+
+import sys
+import threading
+
+
+class NameTable:
+    """Process-wide IGDB id -> name map for one kind of object (genres or platforms)."""
+
+    def __init__(self):
+        self._names = {}
+        self._ids = {}
+        self._stand_ins = 0
+        self._lock = threading.Lock()
+
+    def id_for(self, item):
+        """Remember an {id, name} object and return its id.
+
+        A bare name (the summary shape) gets the id already known for it,
+        or a negative stand-in id that `to_igdb()` passes through.
+        """
+
+        if isinstance(item, dict):
+            item_id, name = item["id"], item.get("name")
+            if name is not None and self._names.get(item_id) != name:
+                self.add(item_id, name)
+            return item_id
+
+        item_id = self._ids.get(item)
+        if item_id is None:
+            with self._lock:
+                item_id = self._ids.get(item)
+                if item_id is None:
+                    self._stand_ins -= 1
+                    item_id = self._stand_ins
+                    name = sys.intern(item)
+                    self._names[item_id] = name
+                    self._ids[name] = item_id
+        return item_id
+
+    def add(self, item_id, name):
+        with self._lock:
+            name = sys.intern(name)
+            self._names[item_id] = name
+            # A real id replaces a stand-in given to the bare name earlier
+            if self._ids.get(name, -1) < 0:
+                self._ids[name] = item_id
+
+    def update(self, names):
+        """Add every {id: name} pair in `names` (a catalog section)."""
+
+        for item_id, name in names.items():
+            self.add(item_id, name)
+
+    def name(self, item_id):
+        return self._names.get(item_id)
+
+
+GENRES = NameTable()
+PLATFORMS = NameTable()
+
+# Most games share a handful of genre and platform combinations; keep one tuple of each
+_ID_TUPLES = {}
+
+
+def _shared(ids):
+    ids = tuple(ids)
+    return _ID_TUPLES.setdefault(ids, ids)
+
+
+class GameRecord:
+    """One cached game: scalars in slots, genres and platforms as id tuples."""
+
+    __slots__ = ("id", "name", "summary", "cover_url", "genre_ids", "platform_ids", "screenshot_urls",
+                 "aggregated_rating", "aggregated_rating_count", "hypes")
+
+    def __init__(self, id, name=None, summary=None, cover_url=None, genre_ids=(), platform_ids=(),
+                 screenshot_urls=(), aggregated_rating=None, aggregated_rating_count=None, hypes=None):
+        self.id = id
+        self.name = name
+        self.summary = summary
+        self.cover_url = cover_url
+        self.genre_ids = genre_ids
+        self.platform_ids = platform_ids
+        self.screenshot_urls = screenshot_urls
+        self.aggregated_rating = aggregated_rating
+        self.aggregated_rating_count = aggregated_rating_count
+        self.hypes = hypes
+
+    @classmethod
+    def from_igdb(cls, game):
+        """Build a record from an IGDB game dict (or a summary from `to_summary()`)."""
+
+        return cls(
+            id=game["id"],
+            name=game.get("name"),
+            summary=game.get("summary"),
+            cover_url=(game.get("cover") or {}).get("url") or game.get("cover_url"),
+            genre_ids=_shared(GENRES.id_for(genre) for genre in game.get("genres") or ()),
+            platform_ids=_shared(PLATFORMS.id_for(platform) for platform in game.get("platforms") or ()),
+            screenshot_urls=tuple(screenshot.get("url") for screenshot in game.get("screenshots") or ()),
+            aggregated_rating=game.get("aggregated_rating"),
+            aggregated_rating_count=game.get("aggregated_rating_count"),
+            hypes=game.get("hypes"),
+        )
+
+    def to_summary(self):
+        """The flat card shape: genre and platform names, `cover_url`."""
+
+        return {
+            "id": self.id,
+            "name": self.name,
+            "summary": self.summary,
+            "aggregated_rating": self.aggregated_rating,
+            "aggregated_rating_count": self.aggregated_rating_count,
+            "cover_url": self.cover_url,
+            "genres": [GENRES.name(genre_id) for genre_id in self.genre_ids],
+            "platforms": [PLATFORMS.name(platform_id) for platform_id in self.platform_ids],
+            "hypes": self.hypes,
+        }
+
+    def to_igdb(self):
+        """The IGDB record shape. Like IGDB, fields the game doesn't have are left out."""
+
+        game = {"id": self.id}
+        for field in ("name", "summary", "aggregated_rating", "aggregated_rating_count", "hypes"):
+            value = getattr(self, field)
+            if value is not None:
+                game[field] = value
+        if self.cover_url is not None:
+            game["cover"] = {"url": self.cover_url}
+        if self.genre_ids:
+            game["genres"] = [{"id": genre_id, "name": GENRES.name(genre_id)} for genre_id in self.genre_ids]
+        if self.platform_ids:
+            game["platforms"] = [{"id": platform_id, "name": PLATFORMS.name(platform_id)}
+                                 for platform_id in self.platform_ids]
+        if self.screenshot_urls:
+            game["screenshots"] = [{"url": url} for url in self.screenshot_urls]
+        return game
+
+    def __eq__(self, other):
+        if not isinstance(other, GameRecord):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __repr__(self):
+        return f"<GameRecord {self.id} {self.name!r}>"
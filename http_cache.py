@@ -0,0 +1,109 @@
+"""Per-route HTTP caching policy.
+
+Decorate a view with `@cache_policy(...)` to say how browsers and CDNs may
+cache it; `init_http_cache(app)` installs the after_request hook that
+applies the policy, adds ETags and answers conditional GETs with 304.
+Views without a policy are treated as personalized: private, no-store.
+A view can override its policy for one response by setting
+`response.cache_policy`.
+
+Static files requested through `url_for('static', ...)` get a `v=` content
+hash in their URL, so they can be cached for a year as immutable.
+"""
+
+import hashlib
+import os
+
+from flask import request
+
+ONE_YEAR = 365 * 24 * 60 * 60
+
+
+class CachePolicy:
+    """How one endpoint's responses may be cached."""
+
+    def __init__(self, max_age=0, public=False, no_store=False, etag=False, vary=(), immutable=False):
+        self.max_age = max_age
+        self.public = public
+        self.no_store = no_store
+        self.etag = etag
+        self.vary = tuple(vary)
+        self.immutable = immutable
+
+    def apply(self, response):
+        cache_control = response.cache_control
+
+        if self.no_store or response.status_code not in (200, 304):
+            cache_control.no_store = True
+            cache_control.private = True
+            response.headers["Pragma"] = "no-cache"
+            response.headers["Expires"] = "0"
+            return response
+
+        # send_file marks files no-cache unless given a max_age; the policy decides instead
+        cache_control.no_cache = None
+        cache_control.public = self.public or None
+        cache_control.private = (not self.public) or None
+        cache_control.max_age = self.max_age
+        if self.immutable:
+            cache_control.immutable = True
+        for header in self.vary:
+            response.vary.add(header)
+
+        if self.etag and request.method in ("GET", "HEAD") and not response.is_streamed:
+            if response.get_etag() == (None, None):
+                response.add_etag()
+            response.make_conditional(request)
+
+        return response
+
+
+PERSONALIZED = CachePolicy(no_store=True)
+STATIC = CachePolicy(max_age=24 * 60 * 60, public=True, etag=True)
+STATIC_VERSIONED = CachePolicy(max_age=ONE_YEAR, public=True, etag=True, immutable=True)
+
+
+def cache_policy(**kwargs):
+    """Attach a CachePolicy to a view function."""
+
+    policy = CachePolicy(**kwargs)
+
+    def decorator(view):
+        view.cache_policy = policy
+        return view
+
+    return decorator
+
+
+def init_http_cache(app, default=PERSONALIZED):
+    """Apply each endpoint's CachePolicy and version static URLs."""
+
+    static_versions = {}
+
+    def static_version(filename):
+        if filename not in static_versions:
+            try:
+                with open(os.path.join(app.static_folder, filename), "rb") as f:
+                    static_versions[filename] = hashlib.sha1(f.read()).hexdigest()[:12]
+            except OSError:
+                static_versions[filename] = None
+        return static_versions[filename]
+
+    @app.url_defaults
+    def add_static_version(endpoint, values):
+        if endpoint == "static" and "v" not in values:
+            version = static_version(values.get("filename", ""))
+            if version:
+                values["v"] = version
+
+    @app.after_request
+    def apply_cache_policy(response):
+        if getattr(response, "cache_policy", None) is not None:
+            policy = response.cache_policy
+        elif request.endpoint == "static":
+            policy = STATIC_VERSIONED if request.args.get("v") else STATIC
+        else:
+            view = app.view_functions.get(request.endpoint)
+            policy = getattr(view, "cache_policy", default)
+
+        return policy.apply(response)
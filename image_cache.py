@@ -0,0 +1,170 @@
+"""Local cache of resized IGDB cover and screenshot images.
+
+`/img/...` URLs are answered from disk. Each IGDB image is downloaded once,
+at full size, and resized with Pillow into the named IMAGE_SIZES as they
+are asked for. Files are stored under the SHA-256 of their contents, with
+small pointer files mapping (image_id, size) to them, so identical images
+are stored once and a file never changes once written; the routes can
+therefore be served as immutable.
+
+When several requests want the same image at once, one of them downloads
+and resizes it while the others wait for its result.
+"""
+
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+
+import requests
+from PIL import Image
+
+from config import IGDB_IMAGE_URL, IMAGE_CACHE_DIR, IMAGE_QUALITY, IGDB_CONNECT_TIMEOUT, IGDB_READ_TIMEOUT
+
+# Bounding boxes (width, height); images keep their aspect ratio inside them
+IMAGE_SIZES = {
+    "thumb": (90, 128),
+    "card": (264, 374),
+    "cover": (528, 748),
+    "screenshot": (569, 320),
+    "screenshot_big": (889, 500),
+}
+
+IMAGE_ID_PATTERN = re.compile(r"[a-z0-9_]+")
+
+
+def image_id_from_url(url):
+    """The IGDB image id in an image URL ('//images.igdb.com/.../t_thumb/co1abc.jpg' -> 'co1abc')."""
+
+    if not url:
+        return None
+    image_id = url.rsplit("/", 1)[-1].rsplit(".", 1)[0]
+    return image_id if IMAGE_ID_PATTERN.fullmatch(image_id) else None
+
+
+class ImageFetchError(Exception):
+    """Raised when an image can't be downloaded from IGDB."""
+
+
+class ImageCache:
+    """Content-addressed on-disk store of resized IGDB images."""
+
+    def __init__(self, directory=IMAGE_CACHE_DIR, source_url=IGDB_IMAGE_URL, session=None,
+                 timeout=(IGDB_CONNECT_TIMEOUT, IGDB_READ_TIMEOUT), quality=IMAGE_QUALITY):
+        self.directory = directory
+        self.source_url = source_url.rstrip("/")
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.quality = quality
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, image_id, size):
+        """Return the path of `image_id` resized to `size`, creating it if needed.
+
+        Raises ValueError for an unknown size or malformed id, and
+        ImageFetchError if IGDB can't supply the image.
+        """
+
+        if size not in IMAGE_SIZES or not IMAGE_ID_PATTERN.fullmatch(image_id or ""):
+            raise ValueError(f"Unknown image {image_id!r} at size {size!r}")
+
+        return self._lookup(image_id, size) or self._once(("variant", image_id, size),
+                                                          lambda: self._make_variant(image_id, size))
+
+    def _make_variant(self, image_id, size):
+        stored = self._lookup(image_id, size)
+        if stored:
+            return stored
+
+        original = self._read(self._once(("original", image_id), lambda: self._fetch_original(image_id)))
+        image = Image.open(io.BytesIO(original))
+        image.thumbnail(IMAGE_SIZES[size])
+        out = io.BytesIO()
+        image.convert("RGB").save(out, "JPEG", quality=self.quality, optimize=True, progressive=True)
+        return self._store(image_id, size, out.getvalue())
+
+    def _fetch_original(self, image_id):
+        stored = self._lookup(image_id, "original")
+        if stored:
+            return stored
+
+        try:
+            response = self.session.get(f"{self.source_url}/t_1080p/{image_id}.jpg", timeout=self.timeout)
+        except (requests.ConnectionError, requests.Timeout) as exc:
+            raise ImageFetchError(f"Couldn't download image {image_id}") from exc
+        if response.status_code != 200:
+            raise ImageFetchError(f"IGDB answered {response.status_code} for image {image_id}")
+        return self._store(image_id, "original", response.content)
+
+    def _once(self, key, work):
+        """Run `work()` for `key` unless another thread already is; share its result."""
+
+        with self._lock:
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = {"done": threading.Event()}
+
+        if not leader:
+            flight["done"].wait()
+            if "error" in flight:
+                raise flight["error"]
+            return flight["result"]
+
+        try:
+            flight["result"] = work()
+            return flight["result"]
+        except Exception as exc:
+            flight["error"] = exc
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            flight["done"].set()
+
+    def _pointer(self, image_id, size):
+        return os.path.join(self.directory, "index", f"{image_id}-{size}")
+
+    def _lookup(self, image_id, size):
+        try:
+            with open(self._pointer(image_id, size)) as f:
+                path = os.path.join(self.directory, f.read().strip())
+        except OSError:
+            return None
+        return path if os.path.exists(path) else None
+
+    def _store(self, image_id, size, data):
+        digest = hashlib.sha256(data).hexdigest()
+        name = os.path.join("files", digest[:2], f"{digest}.jpg")
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            self._write(path, data)
+        self._write(self._pointer(image_id, size), name.encode())
+        return path
+
+    @staticmethod
+    def _write(path, data):
+        # Write to a uniquely named temp file, then rename, so readers never see
+        # a partial file and concurrent writers (threads or forked workers) never share one
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.chmod(temp, 0o644)
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+    @staticmethod
+    def _read(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+
+image_cache = ImageCache()
@@ -0,0 +1,78 @@
+"""Top-rated leaderboards from community ratings.
+
+Games are ranked by a Bayesian average, (sum + C*m) / (count + C): a game
+with a handful of 5s doesn't outrank one with hundreds of 4s, because its
+average is pulled toward the prior mean m (LEADERBOARD_PRIOR_MEAN) with
+the weight of C ratings (LEADERBOARD_PRIOR_WEIGHT). With a fixed prior a
+game's score depends only on its own totals, so each rating write updates
+just that game's rows.
+
+Every rated game has one `leaderboard_entries` row per leaderboard it is
+on: 'all', plus 'platform:<id>' and 'genre:<id>' from its cached IGDB
+metadata. The (facet, score, game_id) index serves any page with one
+keyset seek.
+"""
+
+from api_utils import IGDBError, get_games_by_ids
+from models import db, GameRatingStats, LeaderboardEntry
+
+GLOBAL = 'all'
+
+
+def facet_for(platform_id=None, genre_id=None):
+    if platform_id:
+        return f"platform:{int(platform_id)}"
+    if genre_id:
+        return f"genre:{int(genre_id)}"
+    return GLOBAL
+
+
+def facets_for(game):
+    """Every leaderboard `game` (an IGDB game record, or None) belongs on."""
+
+    facets = [GLOBAL]
+    if game:
+        facets += [f"platform:{platform['id']}" for platform in game.get('platforms', [])]
+        facets += [f"genre:{genre['id']}" for genre in game.get('genres', [])]
+    return facets
+
+
+def facets_to_add(game_id):
+    """The leaderboards to enter `game_id` on, or None if it is already listed.
+
+    A game that isn't listed yet has its platforms and genres looked up
+    (usually cached); if IGDB is down it goes on the global board only,
+    until `flask rebuild-leaderboards`. Call this before `Rating.upsert`,
+    so a slow IGDB call doesn't hold the rating row locks.
+    """
+
+    if LeaderboardEntry.is_listed(game_id):
+        return None
+
+    try:
+        games = get_games_by_ids([game_id])
+    except IGDBError:
+        games = []
+    return facets_for(games[0] if games else None)
+
+
+def record_rating(game_id, facets=None):
+    """Bring the game's leaderboard rows in step with its rating totals.
+
+    Call in the same transaction as `Rating.upsert`, with the facets from
+    `facets_to_add()`. Never calls IGDB.
+    """
+
+    if LeaderboardEntry.rescore(game_id):
+        return
+    LeaderboardEntry.add(game_id, facets or [GLOBAL])
+
+
+def rebuild_leaderboards():
+    """Recompute every leaderboard from game_rating_stats. Returns rows written."""
+
+    game_ids = db.session.execute(
+        db.select(GameRatingStats.game_id).where(GameRatingStats.rating_count > 0)
+    ).scalars().all()
+    games = get_games_by_ids(game_ids)
+    return LeaderboardEntry.replace_all({game['id']: facets_for(game) for game in games})
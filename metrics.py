@@ -0,0 +1,317 @@
+"""Request instrumentation and Prometheus metrics.
+
+`init_metrics(app)` times every request and, within it, each IGDB call,
+each SQL statement (through SQLAlchemy engine events) and each template
+render. The figures go into the in-process counters and histograms below,
+served in the Prometheus text format on `/metrics`. Requests slower than
+SLOW_REQUEST_THRESHOLD are logged with a per-phase breakdown.
+
+IGDB calls made on fan-out threads are charged to the request that started
+them (see `api_utils.run_parallel`), so a request's IGDB time is the sum
+of its calls and can exceed its wall time.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import SLOW_REQUEST_THRESHOLD
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels[name]) for name in self.labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Histogram:
+    """Cumulative bucket histogram, optionally split by labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels):
+        counts, _ = self._values.get(tuple(str(labels[name]) for name in self.labels), ([0], 0))
+        return counts[-1]
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        for key, (counts, total) in sorted(values.items()):
+            for bound, count in zip(self.buckets, counts):
+                labels = _format_labels(self.labels, key, [("le", _format_value(bound))])
+                yield f"{self.name}_bucket{labels} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labels, key)} {counts[-1]}"
+
+
+class GaugeSet:
+    """Gauges read from a callback returning {name: number} at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, prefix, help, read):
+        self.name = prefix
+        self.help = help
+        self.read = read
+
+    def samples(self):
+        for key, value in sorted(self.read().items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield f"# HELP {self.name}_{key} {self.help}"
+                yield f"# TYPE {self.name}_{key} gauge"
+                yield f"{self.name}_{key} {_format_value(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            if not isinstance(metric, GaugeSet):
+                lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+http_requests = REGISTRY.register(Counter(
+    "http_requests_total", "Requests handled, by endpoint, method and status.", ["endpoint", "method", "status"]))
+http_request_duration = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time to build each response, by endpoint.", ["endpoint"]))
+igdb_calls_per_request = REGISTRY.register(Histogram(
+    "http_request_igdb_calls", "IGDB calls made while handling one request.", ["endpoint"], buckets=COUNT_BUCKETS))
+sql_queries_per_request = REGISTRY.register(Histogram(
+    "http_request_sql_queries", "SQL statements run while handling one request.", ["endpoint"], buckets=COUNT_BUCKETS))
+igdb_requests = REGISTRY.register(Counter(
+    "igdb_requests_total", "IGDB calls, by endpoint and final status.", ["endpoint", "status"]))
+igdb_request_duration = REGISTRY.register(Histogram(
+    "igdb_request_duration_seconds", "IGDB call time including retries, by endpoint.", ["endpoint"]))
+sql_query_duration = REGISTRY.register(Histogram(
+    "sql_query_duration_seconds", "SQL statement time, by operation.", ["operation"]))
+template_render_duration = REGISTRY.register(Histogram(
+    "template_render_duration_seconds", "Jinja render time, by template.", ["template"]))
+cache_lookups = REGISTRY.register(Counter(
+    "game_cache_lookups_total",
+    "Game cache lookups, by result (fresh, stale, miss, or fallback: expired but served because fetching failed).",
+    ["result"]))
+fragment_lookups = REGISTRY.register(Counter(
+    "fragment_cache_lookups_total", "Rendered fragment lookups, by template and result (hit or miss).",
+    ["template", "result"]))
+
+
+class RequestTimings:
+    """Per-phase time and call counts for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.igdb_time = 0.0
+        self.igdb_calls = 0
+        self.sql_time = 0.0
+        self.sql_queries = 0
+        self.render_time = 0.0
+        self.stale_reads = 0
+        self._lock = threading.Lock()
+
+    def add(self, phase, seconds):
+        with self._lock:
+            if phase == "igdb":
+                self.igdb_time += seconds
+                self.igdb_calls += 1
+            elif phase == "sql":
+                self.sql_time += seconds
+                self.sql_queries += 1
+            else:
+                self.render_time += seconds
+
+    def count_stale_read(self):
+        with self._lock:
+            self.stale_reads += 1
+
+
+_local = threading.local()
+
+
+def current_timings():
+    """The RequestTimings for the request running on this thread, if any."""
+    return getattr(_local, "timings", None)
+
+
+@contextmanager
+def bind(timings):
+    """Charge work done on this thread to `timings` (used by fan-out workers)."""
+
+    previous = current_timings()
+    _local.timings = timings
+    try:
+        yield
+    finally:
+        _local.timings = previous
+
+
+def _charge(phase, seconds):
+    timings = current_timings()
+    if timings is not None:
+        timings.add(phase, seconds)
+
+
+def record_igdb_call(path, seconds, status):
+    endpoint = path.strip("/").split("/")[0]
+    igdb_requests.inc(endpoint=endpoint, status=status)
+    igdb_request_duration.observe(seconds, endpoint=endpoint)
+    _charge("igdb", seconds)
+
+
+def record_cache_lookup(result):
+    cache_lookups.inc(result=result)
+    timings = current_timings()
+    if timings is not None and result in ("stale", "fallback"):
+        timings.count_stale_read()
+
+
+def record_fragment_lookup(template, result):
+    fragment_lookups.inc(template=template, result=result)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info["query_started"].pop()
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    sql_query_duration.observe(seconds, operation=operation)
+    _charge("sql", seconds)
+
+
+def _before_render(app, template, context, **extra):
+    _local.render_started = getattr(_local, "render_started", []) + [time.perf_counter()]
+
+
+def _after_render(app, template, context, **extra):
+    started = getattr(_local, "render_started", None)
+    if not started:
+        return
+    seconds = time.perf_counter() - started.pop()
+    template_render_duration.observe(seconds, template=template.name)
+    # Only the outermost render counts toward the request; includes are inside it
+    if not started:
+        _charge("render", seconds)
+
+
+def init_metrics(app, slow_threshold=SLOW_REQUEST_THRESHOLD):
+    """Install the timing hooks on `app` and serve the registry on /metrics."""
+
+    if not getattr(init_metrics, "_engine_hooks", False):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        init_metrics._engine_hooks = True
+
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    @app.before_request
+    def start_timings():
+        _local.timings = RequestTimings()
+        _local.render_started = []
+
+    @app.after_request
+    def record_request(response):
+        timings = current_timings()
+        if timings is None:
+            return response
+        _local.timings = None
+
+        # Streamed responses are measured up to the first byte
+        total = time.perf_counter() - timings.started
+        endpoint = request.endpoint or "unknown"
+        http_requests.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        http_request_duration.observe(total, endpoint=endpoint)
+        igdb_calls_per_request.observe(timings.igdb_calls, endpoint=endpoint)
+        sql_queries_per_request.observe(timings.sql_queries, endpoint=endpoint)
+
+        if slow_threshold and total >= slow_threshold:
+            other = max(total - timings.igdb_time - timings.sql_time - timings.render_time, 0)
+            app.logger.warning(
+                "Slow request %s %s -> %s: %.0fms total (igdb %.0fms in %d calls, sql %.0fms in %d queries, "
+                "render %.0fms, other %.0fms)",
+                request.method, request.full_path.rstrip("?"), response.status_code, total * 1000,
+                timings.igdb_time * 1000, timings.igdb_calls, timings.sql_time * 1000, timings.sql_queries,
+                timings.render_time * 1000, other * 1000,
+            )
+        return response
+
+    @app.teardown_request
+    def clear_timings(error=None):
+        _local.timings = None
+
+    @app.route("/metrics")
+    def metrics():
+        """Prometheus scrape endpoint."""
+        return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
@@ -1,11 +1,22 @@
 """SQLAlchemy models for Capstone 1."""
 
+import threading
+import time
+
 from flask_bcrypt import Bcrypt
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import make_transient_to_detached
 from datetime import datetime
 
+from config import (USER_CACHE_TTL, BCRYPT_LOG_ROUNDS, HASH_POOL_SIZE, HASH_QUEUE_LIMIT, HASH_TIMEOUT,
+                    LEADERBOARD_PRIOR_MEAN, LEADERBOARD_PRIOR_WEIGHT)
+from password_hashing import PasswordHasher, HashingBusy
+
 bcrypt = Bcrypt()
 db = SQLAlchemy()
+password_hasher = PasswordHasher(bcrypt, BCRYPT_LOG_ROUNDS, HASH_POOL_SIZE, HASH_QUEUE_LIMIT, HASH_TIMEOUT)
 
 
 
@@ -37,7 +48,7 @@ class User(db.Model):
         Hashes password and adds user to system.
         """
 
-        hashed_pwd = bcrypt.generate_password_hash(password).decode('UTF-8')
+        hashed_pwd = password_hasher.hash(password)
 
         user = User(
             username=username,
@@ -57,18 +68,73 @@ class User(db.Model):
         and, if it finds such a user, returns that user object.
 
         If can't find matching user (or if password is wrong), returns False.
+
+        A hash made with an outdated bcrypt cost is transparently replaced
+        with one at the configured cost, when the hashing pool has room; a
+        busy pool leaves it for the next login rather than failing this one.
         """
 
         user = cls.query.filter_by(username=username).first()
 
         if user:
-            is_auth = bcrypt.check_password_hash(user.password, password)
+            is_auth = password_hasher.check(user.password, password)
             if is_auth:
+                if password_hasher.needs_rehash(user.password):
+                    try:
+                        user.password = password_hasher.hash(password)
+                        db.session.commit()
+                    except HashingBusy:
+                        pass
                 return user
 
         return False
 
 
+class UserIdentityCache:
+    """Short-lived per-process cache of users' column values by id.
+
+    `get` hands back a User attached to the current session without a
+    SELECT. Entries expire after `ttl` seconds and are dropped at once
+    when the user is updated or deleted in this process.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[1] > time.monotonic():
+            user = User(**entry[0])
+            make_transient_to_detached(user)
+            return db.session.merge(user, load=False)
+
+        user = db.session.get(User, user_id)
+        if user is not None:
+            values = {column.key: getattr(user, column.key) for column in User.__table__.columns}
+            with self._lock:
+                self._entries[user_id] = (values, time.monotonic() + self.ttl)
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserIdentityCache(USER_CACHE_TTL)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def invalidate_cached_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
+
+
 class Rating(db.Model):
     """Ratings of game by user"""
 
@@ -80,6 +146,361 @@ class Rating(db.Model):
 
     rating = db.Column(db.Integer, nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_ratings_game_id', 'game_id'),
+    )
+
+    @classmethod
+    def upsert(cls, user_id, game_id, rating):
+        """Insert or update a rating with one INSERT ... ON CONFLICT statement.
+
+        The ratings_apply_stats trigger adjusts game_rating_stats within
+        that statement, from the row as it stands under its lock, so
+        concurrent writes can't lose or double a delta.
+
+        Returns the previous rating, or None if this is the user's first
+        rating of the game. It is read from the statement's snapshot, so
+        when two requests race on a first rating both may see None; the
+        stats don't depend on it.
+        """
+
+        previous = db.select(cls.rating).filter_by(user_id=user_id, game_id=game_id).scalar_subquery()
+        insert = postgresql.insert(cls).values(user_id=user_id, game_id=game_id, rating=rating)
+        return db.session.execute(
+            insert.on_conflict_do_update(index_elements=['user_id', 'game_id'], set_={'rating': insert.excluded.rating})
+            .returning(previous)
+        ).scalar()
+
+    @classmethod
+    def copy_from_csv(cls, csv_file):
+        """Bulk-load user_id,game_id,rating CSV rows (with header) via COPY.
+
+        Rows are staged in a temp table, then merged into `ratings` with
+        one INSERT ... ON CONFLICT (the last duplicate wins). Returns the
+        number of ratings written; the ratings trigger updates
+        game_rating_stats as they are written.
+        """
+
+        connection = db.session.connection().connection
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE TEMP TABLE ratings_import (user_id integer, game_id integer, rating integer) ON COMMIT DROP")
+            cursor.copy_expert("COPY ratings_import FROM STDIN WITH (FORMAT csv, HEADER true)", csv_file)
+            cursor.execute("""
+                INSERT INTO ratings (user_id, game_id, rating)
+                SELECT DISTINCT ON (user_id, game_id) user_id, game_id, rating
+                FROM (SELECT *, ctid FROM ratings_import) staged
+                ORDER BY user_id, game_id, ctid DESC
+                ON CONFLICT (user_id, game_id) DO UPDATE SET rating = EXCLUDED.rating
+            """)
+            return cursor.rowcount
+
+    @classmethod
+    def copy_to_csv(cls, csv_file):
+        """Stream every rating out as user_id,game_id,rating CSV via COPY."""
+
+        connection = db.session.connection().connection
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                "COPY (SELECT user_id, game_id, rating FROM ratings ORDER BY user_id, game_id) "
+                "TO STDOUT WITH (FORMAT csv, HEADER true)",
+                csv_file,
+            )
+
+class GameRatingStats(db.Model):
+    """Running rating totals per game, kept in step with `ratings`"""
+
+    __tablename__ = 'game_rating_stats'
+
+    game_id = db.Column(db.Integer, primary_key=True)
+
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+
+    avg_rating = db.Column(db.Float)
+
+    @classmethod
+    def averages_for(cls, game_ids):
+        """Return {game_id: avg_rating} for the rated games among `game_ids`."""
+
+        game_ids = {int(game_id) for game_id in game_ids}
+        if not game_ids:
+            return {}
+
+        rows = db.session.query(cls.game_id, cls.avg_rating).filter(cls.game_id.in_(game_ids)).all()
+        return {game_id: avg_rating for game_id, avg_rating in rows}
+
+    @classmethod
+    def most_rated(cls, limit=10):
+        """[(game_id, rating_count)] for the games with the most ratings."""
+
+        return (db.session.query(cls.game_id, cls.rating_count)
+                .order_by(cls.rating_count.desc(), cls.game_id)
+                .limit(limit)
+                .all())
+
+    @classmethod
+    def install_trigger(cls):
+        """Create (or replace) the trigger that keeps these totals in step with `ratings`.
+
+        `db.create_all()` adds it along with a new ratings table; existing
+        databases get it from `flask rebuild-rating-stats`.
+        """
+
+        for statement in RATING_STATS_TRIGGER:
+            db.session.execute(db.text(statement))
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute every game's totals from the `ratings` table."""
+
+        db.session.execute(db.delete(cls))
+        db.session.execute(
+            db.insert(cls).from_select(
+                ['game_id', 'rating_sum', 'rating_count', 'avg_rating'],
+                db.select(
+                    Rating.game_id,
+                    db.func.sum(Rating.rating),
+                    db.func.count(),
+                    db.func.avg(Rating.rating),
+                ).group_by(Rating.game_id)
+            )
+        )
+
+
+# Applies every rating insert, change and delete (user deletions cascade here
+# too) to game_rating_stats in the statement that makes it.
+RATING_STATS_TRIGGER = (
+    """
+    CREATE OR REPLACE FUNCTION ratings_apply_stats() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP <> 'INSERT' THEN
+            UPDATE game_rating_stats
+            SET rating_sum = rating_sum - OLD.rating,
+                rating_count = rating_count - 1,
+                avg_rating = (rating_sum - OLD.rating)::float / NULLIF(rating_count - 1, 0)
+            WHERE game_id = OLD.game_id;
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            INSERT INTO game_rating_stats (game_id, rating_sum, rating_count, avg_rating)
+            VALUES (NEW.game_id, NEW.rating, 1, NEW.rating)
+            ON CONFLICT (game_id) DO UPDATE
+            SET rating_sum = game_rating_stats.rating_sum + EXCLUDED.rating_sum,
+                rating_count = game_rating_stats.rating_count + 1,
+                avg_rating = (game_rating_stats.rating_sum + EXCLUDED.rating_sum)::float
+                             / (game_rating_stats.rating_count + 1);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS ratings_apply_stats ON ratings",
+    """
+    CREATE TRIGGER ratings_apply_stats
+    AFTER INSERT OR DELETE OR UPDATE OF rating, game_id ON ratings
+    FOR EACH ROW EXECUTE FUNCTION ratings_apply_stats()
+    """,
+)
+
+
+@event.listens_for(Rating.__table__, 'after_create')
+def install_rating_stats_trigger(table, connection, **kw):
+    for statement in RATING_STATS_TRIGGER:
+        connection.exec_driver_sql(statement)
+
+
+class GameSimilarity(db.Model):
+    """Precomputed "players who rated this also liked" neighbour of a game"""
+
+    __tablename__ = 'game_similarities'
+
+    game_id = db.Column(db.Integer, primary_key=True)
+
+    similar_game_id = db.Column(db.Integer, primary_key=True)
+
+    score = db.Column(db.REAL, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_game_similarities_game_id_score', 'game_id', db.desc('score')),
+    )
+
+    TRIM_SQL = db.text("""
+        DELETE FROM game_similarities gs
+        USING (
+            SELECT game_id, similar_game_id,
+                   row_number() OVER (PARTITION BY game_id ORDER BY score DESC, similar_game_id) AS rank
+            FROM game_similarities WHERE game_id = ANY(:game_ids)
+        ) ranked
+        WHERE gs.game_id = ranked.game_id AND gs.similar_game_id = ranked.similar_game_id AND ranked.rank > :keep
+    """)
+
+    @classmethod
+    def similar_to(cls, game_id, limit=6):
+        """Ids of the games most similar to `game_id`, best first (one index scan)."""
+
+        return db.session.execute(
+            db.select(cls.similar_game_id).where(cls.game_id == game_id).order_by(cls.score.desc()).limit(limit)
+        ).scalars().all()
+
+    @classmethod
+    def replace_all(cls, rows):
+        """Swap the whole table for `rows` of {game_id, similar_game_id, score}."""
+
+        db.session.execute(db.delete(cls))
+        if rows:
+            db.session.execute(db.insert(cls), rows)
+
+    @classmethod
+    def replace_for(cls, game_ids, rows, reverse_rows, keep):
+        """Replace the neighbours of `game_ids` and their place in other games' lists.
+
+        `rows` are the new neighbour lists of `game_ids`; `reverse_rows`
+        put `game_ids` into other games' lists, which are then trimmed back
+        to the best `keep`.
+        """
+
+        game_ids = list(game_ids)
+        db.session.execute(db.delete(cls).where(cls.game_id.in_(game_ids)))
+        db.session.execute(db.delete(cls).where(cls.similar_game_id.in_(game_ids)))
+        if rows or reverse_rows:
+            db.session.execute(db.insert(cls), rows + reverse_rows)
+
+        others = list({row['game_id'] for row in reverse_rows})
+        if others:
+            db.session.execute(cls.TRIM_SQL, {'game_ids': others, 'keep': keep})
+
+
+class LeaderboardEntry(db.Model):
+    """A rated game's Bayesian score on one leaderboard ('all', 'platform:<id>' or 'genre:<id>')"""
+
+    __tablename__ = 'leaderboard_entries'
+
+    facet = db.Column(db.String(30), primary_key=True)
+
+    game_id = db.Column(db.Integer, primary_key=True)
+
+    score = db.Column(db.Float, nullable=False)
+
+    rating_count = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_leaderboard_entries_facet_score', 'facet', 'score', 'game_id'),
+        db.Index('ix_leaderboard_entries_game_id', 'game_id'),
+    )
+
+    @staticmethod
+    def bayes_score(rating_sum, rating_count):
+        """(sum + C*m) / (count + C): the average pulled toward the prior mean m with weight C."""
+
+        return (rating_sum + LEADERBOARD_PRIOR_WEIGHT * LEADERBOARD_PRIOR_MEAN) / (rating_count + LEADERBOARD_PRIOR_WEIGHT)
+
+    @classmethod
+    def rescore(cls, game_id):
+        """Copy the game's current totals into all its entries. Returns the number of entries updated."""
+
+        return db.session.execute(
+            db.update(cls)
+            .where(cls.game_id == game_id, GameRatingStats.game_id == cls.game_id)
+            .values(
+                score=cls.bayes_score(GameRatingStats.rating_sum, GameRatingStats.rating_count),
+                rating_count=GameRatingStats.rating_count,
+            )
+        ).rowcount
+
+    @classmethod
+    def is_listed(cls, game_id):
+        """Whether the game is on any leaderboard yet."""
+
+        return db.session.execute(db.select(cls.game_id).where(cls.game_id == game_id).limit(1)).first() is not None
+
+    @classmethod
+    def add(cls, game_id, facets):
+        """Enter a game on the given leaderboards with its current totals."""
+
+        # Read the row itself: the identity map may predate Rating.upsert's raw SQL
+        stats = db.session.execute(
+            db.select(GameRatingStats.rating_sum, GameRatingStats.rating_count).where(GameRatingStats.game_id == game_id)
+        ).one_or_none()
+        if stats is None:
+            return
+        score = cls.bayes_score(stats.rating_sum, stats.rating_count)
+        # Two first ratings of a game can both get here; the second one just rescores
+        insert = postgresql.insert(cls).values([
+            {'facet': facet, 'game_id': game_id, 'score': score, 'rating_count': stats.rating_count}
+            for facet in facets
+        ])
+        db.session.execute(insert.on_conflict_do_update(
+            index_elements=[cls.facet, cls.game_id],
+            set_={'score': insert.excluded.score, 'rating_count': insert.excluded.rating_count},
+        ))
+
+    @classmethod
+    def page(cls, facet, limit, after=None):
+        """Up to `limit` entries of one leaderboard, best first.
+
+        `after` is the (score, game_id) of the last entry of the previous
+        page; the index seek makes every page cost the same.
+        """
+
+        query = db.select(cls).where(cls.facet == facet)
+        if after is not None:
+            query = query.where(db.tuple_(cls.score, cls.game_id) < db.tuple_(*after))
+        return db.session.execute(
+            query.order_by(cls.score.desc(), cls.game_id.desc()).limit(limit)
+        ).scalars().all()
+
+    @classmethod
+    def replace_all(cls, facets_by_game):
+        """Rebuild every leaderboard from game_rating_stats and {game_id: [facet, ...]}."""
+
+        db.session.execute(db.delete(cls))
+        totals = db.session.execute(
+            db.select(GameRatingStats.game_id, GameRatingStats.rating_sum, GameRatingStats.rating_count)
+            .where(GameRatingStats.rating_count > 0)
+        ).all()
+        rows = [
+            {'facet': facet, 'game_id': game_id, 'rating_count': rating_count,
+             'score': cls.bayes_score(rating_sum, rating_count)}
+            for game_id, rating_sum, rating_count in totals
+            for facet in facets_by_game.get(game_id, ['all'])
+        ]
+        if rows:
+            db.session.execute(db.insert(cls), rows)
+        return len(rows)
+
+
+class ListItem(db.Model):
+    """One game on a user's list"""
+
+    __tablename__ = 'list_items'
+
+    list_id = db.Column(db.Integer, db.ForeignKey('lists.id', ondelete="cascade"), primary_key=True)
+
+    game_id = db.Column(db.Integer, primary_key=True)
+
+    position = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_list_items_game_id', 'game_id'),
+    )
+
+    @classmethod
+    def lists_containing(cls, game_id):
+        """Lists that include `game_id`, via the game_id index."""
+
+        return List.query.join(cls, cls.list_id == List.id).filter(cls.game_id == game_id).all()
+
+    @classmethod
+    def most_listed(cls, limit=10):
+        """[(game_id, list_count)] for the games on the most lists."""
+
+        return (db.session.query(cls.game_id, db.func.count().label('list_count'))
+                .group_by(cls.game_id)
+                .order_by(db.desc('list_count'), cls.game_id)
+                .limit(limit)
+                .all())
+
+
 class List(db.Model):
     """Lists of games by user"""
 
@@ -91,7 +512,78 @@ class List(db.Model):
 
     title = db.Column(db.String(80), nullable=False)
     
-    games = db.Column(db.JSON, nullable=False)  # Store game data as JSON
+    # Old JSON copy of the game ids. Existing databases still have it NOT NULL,
+    # and lists that `flask backfill-list-items` hasn't copied yet are only
+    # here; `set_games` empties it the first time it writes a list's items.
+    legacy_games = db.Column('games', db.JSON, default=list)
+
+    items = db.relationship('ListItem', order_by=ListItem.position, cascade='all, delete-orphan', passive_deletes=True)
+
+    @property
+    def games(self):
+        """Game ids on the list, in order.
+
+        Falls back to the legacy JSON column for lists not backfilled yet.
+        """
+        if self.items:
+            return [item.game_id for item in self.items]
+        return list(dict.fromkeys(int(game_id) for game_id in self.legacy_games or ()))
+
+    def set_games(self, game_ids):
+        """Replace the list's games, touching only rows that changed.
+
+        Removed games are deleted and new ones inserted in bulk; games
+        that stay only get their position updated if it moved.
+        """
+
+        game_ids = list(dict.fromkeys(int(game_id) for game_id in game_ids))
+        if self.id is None:
+            db.session.flush()
+
+        current = dict(db.session.query(ListItem.game_id, ListItem.position).filter_by(list_id=self.id).all())
+        wanted = {game_id: position for position, game_id in enumerate(game_ids)}
+
+        removed = [game_id for game_id in current if game_id not in wanted]
+        added = [{'list_id': self.id, 'game_id': game_id, 'position': position}
+                 for game_id, position in wanted.items() if game_id not in current]
+        moved = [{'list_id': self.id, 'game_id': game_id, 'position': position}
+                 for game_id, position in wanted.items() if game_id in current and current[game_id] != position]
+
+        if removed:
+            db.session.execute(db.delete(ListItem).where(ListItem.list_id == self.id, ListItem.game_id.in_(removed)))
+        if added:
+            db.session.execute(db.insert(ListItem), added)
+        if moved:
+            # Bulk UPDATE by primary key, one executemany
+            db.session.execute(db.update(ListItem), moved)
+
+        if self.legacy_games:
+            # The items are the list now; don't let `games` fall back to the old copy
+            self.legacy_games = []
+        db.session.expire(self, ['items'])
+
+    @classmethod
+    def backfill_items(cls):
+        """Copy game ids from the legacy JSON column into list_items.
+
+        Lists that already have items are skipped, so this is safe to rerun.
+        Returns the number of lists backfilled.
+        """
+
+        done = {list_id for (list_id,) in db.session.query(ListItem.list_id).distinct()}
+        rows = []
+        backfilled = 0
+        for list_id, legacy_games in db.session.query(cls.id, cls.legacy_games).filter(cls.legacy_games.isnot(None)):
+            if list_id in done or not legacy_games:
+                continue
+            game_ids = dict.fromkeys(int(game_id) for game_id in legacy_games)
+            rows.extend({'list_id': list_id, 'game_id': game_id, 'position': position}
+                        for position, game_id in enumerate(game_ids))
+            backfilled += 1
+
+        if rows:
+            db.session.execute(db.insert(ListItem), rows)
+        return backfilled
 
     
 class Review(db.Model):
@@ -110,6 +602,18 @@ class Review(db.Model):
     timestamp = db.Column( db.DateTime, nullable=False, default=datetime.utcnow(),)
 
 
+class GameCacheEntry(db.Model):
+    """Durable copy of cached IGDB game metadata"""
+
+    __tablename__ = 'games_cache'
+
+    key = db.Column(db.Text, primary_key=True)
+
+    payload = db.Column(db.JSON, nullable=False)
+
+    fetched_at = db.Column(db.DateTime, nullable=False)
+
+
 def connect_db(app):
     """Connect this database to provided Flask app.
 
@@ -0,0 +1,108 @@
+"""Password hashing on a dedicated, size-bounded worker pool.
+
+bcrypt is deliberately slow, so running it on the request thread lets a
+burst of logins tie up every web worker. `PasswordHasher` runs it on its
+own small thread pool instead and rejects new work with `HashingBusy`
+(turned into a 503 by the app) once `max_workers + max_queue` hashes are
+already in flight. A caller that waits more than `timeout` seconds for
+its hash gets `HashingBusy` too.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool is saturated."""
+
+
+class PasswordHasher:
+    """bcrypt hash/check on a bounded executor, with latency stats."""
+
+    def __init__(self, bcrypt, rounds, max_workers, max_queue, timeout):
+        self.bcrypt = bcrypt
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._latencies = deque(maxlen=1000)
+
+    def hash(self, password):
+        """Return a UTF-8 bcrypt hash of `password` at the configured cost."""
+
+        return self._run(lambda: self.bcrypt.generate_password_hash(password, self.rounds).decode('UTF-8'))
+
+    def check(self, pw_hash, password):
+        return self._run(lambda: self.bcrypt.check_password_hash(pw_hash, password))
+
+    def needs_rehash(self, pw_hash):
+        """True if `pw_hash` was made with a different cost than configured."""
+
+        try:
+            return int(pw_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def stats(self):
+        """Queue depth, throughput and latency figures for capacity planning."""
+
+        with self._lock:
+            latencies = sorted(self._latencies)
+            in_flight = self._in_flight
+            completed = self._completed
+            rejected = self._rejected
+            timed_out = self._timed_out
+
+        def percentile(p):
+            return latencies[min(int(len(latencies) * p), len(latencies) - 1)] if latencies else None
+
+        return {
+            "rounds": self.rounds,
+            "workers": self.max_workers,
+            "queue_limit": self.max_queue,
+            "in_flight": in_flight,
+            "queue_depth": max(in_flight - self.max_workers, 0),
+            "completed": completed,
+            "rejected": rejected,
+            "timed_out": timed_out,
+            "latency_p50": percentile(0.5),
+            "latency_p95": percentile(0.95),
+        }
+
+    def _run(self, work):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise HashingBusy()
+
+        with self._lock:
+            self._in_flight += 1
+
+        def timed():
+            start = time.perf_counter()
+            try:
+                return work()
+            finally:
+                # Released when the hash finishes, even if the caller timed out
+                with self._lock:
+                    self._latencies.append(time.perf_counter() - start)
+                    self._in_flight -= 1
+                    self._completed += 1
+                self._slots.release()
+
+        try:
+            return self._executor.submit(timed).result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # The hash keeps its slot until it finishes; the caller just stops waiting
+            with self._lock:
+                self._timed_out += 1
+            raise HashingBusy() from None
@@ -0,0 +1,180 @@
+"""Item-item "players who rated this also liked" recommendations.
+
+Ratings form a sparse users x games matrix. Two games are similar when the
+same players rated them alike: the cosine of their rating columns, counted
+only when at least SIMILAR_GAMES_MIN_SUPPORT players rated both. The top
+SIMILAR_GAMES_K neighbours of every game are precomputed into the
+`game_similarities` table, so the game page reads them with one index scan.
+
+`rebuild_similarities()` (`flask build-similar-games`) scores every game
+in blocks. New ratings go through `SimilarityUpdater`, which batches the
+rated games and rescores only them: a rating changes only its own game's
+column, so the pairs involving that game are the only ones that move. A
+game that drops out of another game's top list is not replaced by its
+next-best neighbour until the next full rebuild.
+"""
+
+import threading
+import time
+
+import numpy as np
+from scipy import sparse
+
+from config import (SIMILAR_GAMES_K, SIMILAR_GAMES_MIN_SUPPORT, SIMILAR_GAMES_BLOCK,
+                    SIMILAR_GAMES_UPDATE_DELAY)
+from models import db, Rating, GameSimilarity
+
+
+def ratings_matrix(rows):
+    """Build a users x games CSC matrix from (user_id, game_id, rating) rows.
+
+    Returns (matrix, game_ids), where game_ids[j] is the game in column j.
+    """
+
+    if not rows:
+        return sparse.csc_matrix((0, 0)), np.array([], dtype=np.int64)
+
+    data = np.array(rows, dtype=np.int64)
+    _, user_index = np.unique(data[:, 0], return_inverse=True)
+    game_ids, game_index = np.unique(data[:, 1], return_inverse=True)
+    matrix = sparse.csc_matrix(
+        (data[:, 2].astype(np.float64), (user_index, game_index)),
+        shape=(user_index.max() + 1, len(game_ids)),
+    )
+    return matrix, game_ids
+
+
+def column_norms(matrix):
+    return np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+
+
+def cosine_scores(matrix, columns, norms, min_support=SIMILAR_GAMES_MIN_SUPPORT):
+    """Dense len(columns) x games cosine scores of `columns` against every column.
+
+    Pairs rated by fewer than `min_support` common users, and each game
+    against itself, score 0.
+    """
+
+    block = matrix[:, columns]
+    dots = (block.T @ matrix).toarray()
+    rated = (matrix != 0).astype(np.float32)
+    support = (rated[:, columns].T @ rated).toarray()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = dots / np.outer(norms[columns], norms)
+    scores[~np.isfinite(scores) | (support < min_support)] = 0
+    scores[np.arange(len(columns)), columns] = 0
+    return scores
+
+
+def top_k(scores, k):
+    """Per row, the (column, score) pairs of the `k` best positive scores, best first."""
+
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return [[] for _ in range(scores.shape[0])]
+
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    neighbours = []
+    for row, columns in zip(scores, best):
+        columns = columns[np.argsort(-row[columns], kind="stable")]
+        neighbours.append([(column, row[column]) for column in columns if row[column] > 0])
+    return neighbours
+
+
+def rebuild_similarities(k=SIMILAR_GAMES_K, block=SIMILAR_GAMES_BLOCK):
+    """Recompute every game's neighbours from the `ratings` table. Returns rows written."""
+
+    matrix, game_ids = ratings_matrix(db.session.execute(db.select(Rating.user_id, Rating.game_id, Rating.rating)).all())
+    norms = column_norms(matrix)
+
+    rows = []
+    for start in range(0, len(game_ids), block):
+        columns = np.arange(start, min(start + block, len(game_ids)))
+        for column, neighbours in zip(columns, top_k(cosine_scores(matrix, columns, norms), k)):
+            rows.extend({'game_id': int(game_ids[column]), 'similar_game_id': int(game_ids[other]), 'score': float(score)}
+                        for other, score in neighbours)
+
+    GameSimilarity.replace_all(rows)
+    return len(rows)
+
+
+def update_similarities(game_ids, k=SIMILAR_GAMES_K):
+    """Rescore `game_ids` against every game that shares a rater with them."""
+
+    game_ids = sorted({int(game_id) for game_id in game_ids})
+    raters = db.select(Rating.user_id).where(Rating.game_id.in_(game_ids))
+    matrix, columns_game_ids = ratings_matrix(db.session.execute(
+        db.select(Rating.user_id, Rating.game_id, Rating.rating).where(Rating.user_id.in_(raters))
+    ).all())
+
+    # The matrix only holds the raters of `game_ids`; norms need every rating of each game
+    full_norms = dict(db.session.execute(
+        db.select(Rating.game_id, db.func.sqrt(db.func.sum(Rating.rating * Rating.rating)))
+        .where(Rating.game_id.in_([int(game_id) for game_id in columns_game_ids]))
+        .group_by(Rating.game_id)
+    ).all())
+    norms = np.array([full_norms.get(int(game_id), 0) for game_id in columns_game_ids], dtype=np.float64)
+
+    position = {int(game_id): column for column, game_id in enumerate(columns_game_ids)}
+    targets = np.array([position[game_id] for game_id in game_ids if game_id in position], dtype=np.int64)
+
+    rows, reverse_rows = [], []
+    if len(targets):
+        scores = cosine_scores(matrix, targets, norms)
+        for target, row, neighbours in zip(targets, scores, top_k(scores, k)):
+            game_id = int(columns_game_ids[target])
+            rows.extend({'game_id': game_id, 'similar_game_id': int(columns_game_ids[other]), 'score': float(score)}
+                        for other, score in neighbours)
+            reverse_rows.extend({'game_id': int(columns_game_ids[other]), 'similar_game_id': game_id, 'score': float(row[other])}
+                                for other in np.flatnonzero(row > 0) if int(columns_game_ids[other]) not in game_ids)
+
+    GameSimilarity.replace_for(game_ids, rows, reverse_rows, keep=k)
+
+
+class SimilarityUpdater:
+    """Batches newly rated games and updates their neighbours on a daemon thread."""
+
+    def __init__(self, app, delay=SIMILAR_GAMES_UPDATE_DELAY):
+        self.app = app
+        self.delay = delay
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def mark(self, game_id):
+        """Queue `game_id` for rescoring; with no delay, rescore it now."""
+
+        if not self.delay:
+            update_similarities([game_id])
+            db.session.commit()
+            return
+
+        with self._lock:
+            self._pending.add(int(game_id))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="similar-games", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def flush(self):
+        """Rescore every queued game now. Needs an app context."""
+
+        with self._lock:
+            game_ids, self._pending = self._pending, set()
+        if game_ids:
+            update_similarities(game_ids)
+            db.session.commit()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            # Let a burst of ratings collect into one batch
+            time.sleep(self.delay)
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception:
+                self.app.logger.exception("Updating similar games failed")
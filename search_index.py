@@ -0,0 +1,167 @@
+"""In-process game name index for typeahead search and list forms.
+
+Names are indexed two ways: a sorted list of word prefixes (binary search)
+for as-you-type matches, and character trigrams for typo-tolerant
+fallback matches. The index is built from the cached `get_game_info`
+pages, so building it costs at most one IGDB call per cache TTL.
+"""
+
+import bisect
+import re
+import threading
+import time
+import unicodedata
+
+from api_utils import get_game_info
+from config import SEARCH_INDEX_SIZE, SEARCH_INDEX_MAX_AGE
+
+
+def normalize(text):
+    """Lowercase, strip accents and collapse punctuation to spaces."""
+
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Snapshot:
+    """One immutable generation of the index; readers use whichever one they picked up."""
+
+    __slots__ = ("names", "normalized", "prefixes", "trigrams", "built_at")
+
+    def __init__(self, names, normalized, prefixes, trigrams, built_at):
+        self.names = names
+        self.normalized = normalized
+        self.prefixes = prefixes
+        self.trigrams = trigrams
+        self.built_at = built_at
+
+    def with_games(self, games, built_at):
+        """A new snapshot holding this one's games plus `games` ((id, name) pairs)."""
+
+        names = dict(self.names)
+        normalized = dict(self.normalized)
+        prefixes = list(self.prefixes)
+        grams = {gram: set(ids) for gram, ids in self.trigrams.items()}
+        added = []
+        for game_id, name in games:
+            if game_id in names or not name:
+                continue
+            names[game_id] = name
+            normalized[game_id] = normalize(name)
+            # The full name and every word suffix ("zelda breath", "breath ...")
+            # so a query can match from the start of any word.
+            words = normalized[game_id].split()
+            added.extend((" ".join(words[i:]), game_id) for i in range(len(words)))
+            for gram in trigrams(normalized[game_id]):
+                grams.setdefault(gram, set()).add(game_id)
+        prefixes.extend(added)
+        prefixes.sort()
+        return _Snapshot(names, normalized, prefixes, grams, built_at)
+
+
+_EMPTY = _Snapshot({}, {}, [], {}, 0)
+
+
+class GameNameIndex:
+    """Prefix + trigram index over (game_id, name) pairs.
+
+    The index data lives in one `_Snapshot` that is never changed once
+    published: writers build a new one and swap the reference, and every
+    read works from a single snapshot, so a search running during a
+    rebuild sees either the old index or the new one, never a mix.
+    """
+
+    def __init__(self):
+        self._snapshot = _EMPTY
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._snapshot.names)
+
+    def __contains__(self, game_id):
+        return int(game_id) in self._snapshot.names
+
+    def name(self, game_id):
+        return self._snapshot.names.get(int(game_id))
+
+    def choices(self):
+        """(id, name) pairs sorted by name, for SelectMultipleField.choices."""
+
+        snapshot = self._snapshot
+        return sorted(snapshot.names.items(), key=lambda item: snapshot.normalized[item[0]])
+
+    def add(self, game_id, name):
+        """Index one game (no-op if it is already indexed)."""
+
+        self.add_games([{"id": game_id, "name": name}])
+
+    def add_games(self, games):
+        games = [(int(game["id"]), game.get("name")) for game in games]
+        if all(game_id in self._snapshot.names or not name for game_id, name in games):
+            return
+
+        with self._lock:
+            self._snapshot = self._snapshot.with_games(games, self._snapshot.built_at)
+
+    def rebuild(self, games):
+        """Replace the index contents with `games` (dicts with id and name)."""
+
+        fresh = _EMPTY.with_games(((int(game["id"]), game.get("name")) for game in games), time.monotonic())
+        with self._lock:
+            self._snapshot = fresh
+
+    def search(self, query, limit=10):
+        """Return up to `limit` {id, name} matches, best first.
+
+        Ranking: exact name, then names starting with the query, then
+        names with a word starting with the query, then trigram overlap.
+        """
+
+        query = normalize(query)
+        if not query:
+            return []
+
+        snapshot = self._snapshot
+        scores = {}
+        start = bisect.bisect_left(snapshot.prefixes, (query, -1))
+        for key, game_id in snapshot.prefixes[start:]:
+            if not key.startswith(query):
+                break
+            full = snapshot.normalized[game_id]
+            score = 3 if full == query else 2 if key == full else 1
+            scores[game_id] = max(scores.get(game_id, 0), score)
+
+        if len(scores) < limit:
+            query_grams = trigrams(query)
+            overlap = {}
+            for gram in query_grams:
+                for game_id in snapshot.trigrams.get(gram, ()):
+                    overlap[game_id] = overlap.get(game_id, 0) + 1
+            for game_id, shared in overlap.items():
+                similarity = shared / len(query_grams)
+                if game_id not in scores and similarity >= 0.5:
+                    scores[game_id] = similarity
+
+        ranked = sorted(scores, key=lambda game_id: (-scores[game_id], snapshot.normalized[game_id]))
+        return [{"id": game_id, "name": snapshot.names[game_id]} for game_id in ranked[:limit]]
+
+    def is_stale(self, max_age):
+        built_at = self._snapshot.built_at
+        return not built_at or time.monotonic() - built_at > max_age
+
+
+game_index = GameNameIndex()
+
+
+def get_game_index():
+    """Return the shared index, (re)building it from cached IGDB data when stale."""
+
+    if game_index.is_stale(SEARCH_INDEX_MAX_AGE):
+        game_index.rebuild(get_game_info(limit=SEARCH_INDEX_SIZE))
+    return game_index
@@ -32,32 +32,23 @@ $(document).ready(function () {
             });
     }
 
-    // Function to fetch and populate games based on selected platform and genre
-    function fetchAndPopulateGames(filters) {
-        $('#gameList').html('<p>Loading games...</p>');
-
-        let apiUrl = '/api/games';
-        if (filters) {
-            apiUrl += `?${filters}`;
+    // Proxied, resized cover (see /img/<game_id>/<size>); v names the exact IGDB image
+    function coverSrc(game, size) {
+        const match = /\/([a-z0-9_]+)\.jpg$/.exec(game.cover_url || '');
+        if (!match) {
+            return '/static/images/alt_cover_img.jpg';
         }
+        return `/img/${game.id}/${size}?v=${match[1]}`;
+    }
 
-        fetch(apiUrl)
-            .then((response) => response.json())
-            .then((games) => {
-                $('#gameList').empty(); // Clear the existing content
-                if (games.length === 0) {
-                    // Handle no results
-                    $('#gameList').html('<p>No games found matching your filters.</p>');
-                    return;
-                }
-                games.forEach((game) => {
-                    // Create HTML for game card
-                    const cardHtml = `
+    // Build the HTML for one game card
+    function gameCardHtml(game) {
+        return `
                     <div class="col-md-3">
                     <div class="card" style="width: 18rem;">
-                      <img src="${game.cover_url || '/static/images/alt_cover_img.jpg'}" class="card-img-top" alt="${
-                        game.name
-                    }">
+                      <img src="${coverSrc(game, 'card')}" class="card-img-top" alt="${
+                          game.name
+                      }">
                       <div class="card-body">
                         <h5 class="card-title">${game.name}</h5>
                       </div>
@@ -79,15 +70,99 @@ $(document).ready(function () {
                     </div>
                   </div>
                 `;
-                    $('#gameList').append(cardHtml);
+    }
+
+    // Filters and cursor for the infinite scroll of filtered results
+    let currentFilters = null;
+    let nextCursor = null;
+    let loadingMore = false;
+
+    // Function to fetch and populate games based on selected platform and genre
+    function fetchAndPopulateGames(filters, cursor) {
+        if (!cursor) {
+            $('#gameList').html('<p>Loading games...</p>');
+            $('.pagination').hide();
+        }
+        loadingMore = true;
+
+        const params = new URLSearchParams(filters || '');
+        if (cursor) {
+            params.set('cursor', cursor);
+        }
+        const apiUrl = `/api/games?${params.toString()}`;
+
+        fetch(apiUrl)
+            .then((response) => {
+                nextCursor = response.headers.get('X-Next-Cursor');
+                return response.json();
+            })
+            .then((games) => {
+                if (!cursor) {
+                    $('#gameList').empty(); // Clear the existing content
+                }
+                if (!Array.isArray(games) || games.length === 0) {
+                    nextCursor = null;
+                    if (!cursor) {
+                        // Handle no results
+                        $('#gameList').html('<p>No games found matching your filters.</p>');
+                    }
+                    return;
+                }
+                games.forEach((game) => {
+                    $('#gameList').append(gameCardHtml(game));
                 });
             })
             .catch((error) => {
                 console.error('Error fetching games:', error);
                 $('#gameList').html('<p class="error-message">Error fetching games. Please try again.</p>');
+            })
+            .finally(() => {
+                loadingMore = false;
             });
     }
 
+    // Load the next page of filtered results when scrolled near the bottom
+    $(window).on('scroll', function () {
+        if (currentFilters === null || !nextCursor || loadingMore) {
+            return;
+        }
+        if ($(window).scrollTop() + $(window).height() > $(document).height() - 400) {
+            fetchAndPopulateGames(currentFilters, nextCursor);
+        }
+    });
+
+    // Typeahead for the list forms: select matching games in #game-select
+    let searchTimer = null;
+    $('#game-search').on('input', function () {
+        const query = $(this).val().trim();
+        clearTimeout(searchTimer);
+        if (!query) {
+            $('#game-search-results').empty();
+            return;
+        }
+        searchTimer = setTimeout(() => {
+            fetch(`/api/search?query=${encodeURIComponent(query)}`)
+                .then((response) => response.json())
+                .then((games) => {
+                    $('#game-search-results').empty();
+                    games.forEach((game) => {
+                        const item = $('<li class="list-group-item list-group-item-action"></li>').text(game.name);
+                        item.on('click', () => {
+                            let option = $(`#game-select option[value="${game.id}"]`);
+                            if (!option.length) {
+                                option = $('<option></option>').val(game.id).text(game.name);
+                                $('#game-select').append(option);
+                            }
+                            option.prop('selected', true);
+                            $('#game-search').val('');
+                            $('#game-search-results').empty();
+                        });
+                        $('#game-search-results').append(item);
+                    });
+                });
+        }, 150);
+    });
+
     // Event listeners for filters
     $('#filterForm').on('submit', function (event) {
         event.preventDefault();
@@ -106,6 +181,7 @@ $(document).ready(function () {
             queryString += `genre=${genreId}`;
         }
 
+        currentFilters = queryString;
         fetchAndPopulateGames(queryString);
     });
 });
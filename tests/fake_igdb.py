@@ -0,0 +1,378 @@
+"""Local stand-in for the Twitch token endpoint and the IGDB API.
+
+Start it with `FakeIGDBServer().start()` and point an `IGDBClient` (or the
+IGDB_BASE_URL / TWITCH_TOKEN_URL / IGDB_IMAGE_URL settings) at
+`server.base_url`, `server.token_url` and `server.image_url`. It can add
+latency, random 5xx errors and IGDB's per-second rate limit, and can be
+seeded with thousands of generated (or fixture-file) games, so it also
+backs the benchmarks.
+
+Run it standalone with:
+
+    python -m tests.fake_igdb --port 9000 --games 5000 --latency 0.08
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+GENRES = ["Adventure", "Arcade", "Fighting", "Indie", "Platform", "Puzzle", "Racing",
+          "Role-playing (RPG)", "Shooter", "Simulator", "Sport", "Strategy"]
+PLATFORMS = ["PC (Microsoft Windows)", "PlayStation 4", "PlayStation 5", "Xbox One",
+             "Xbox Series X|S", "Nintendo Switch", "Mac", "Linux", "iOS", "Android"]
+TITLE_WORDS = ["Legend", "Shadow", "Star", "Dragon", "Knight", "Quest", "Chronicles", "Tactics",
+               "Hollow", "Crystal", "Iron", "Neon", "Forgotten", "Eternal", "Sky", "Ocean",
+               "Rogue", "Empire", "Pixel", "Storm", "Galaxy", "Dungeon", "Racer", "Soul"]
+
+
+def make_game(game_id):
+    """Build a game record shaped like an IGDB `games` result."""
+
+    return {
+        "id": game_id,
+        "name": f"Game {game_id}",
+        "summary": f"Summary of game {game_id}",
+        "cover": {"id": game_id, "url": f"//images.igdb.test/igdb/image/upload/t_thumb/co{game_id}.jpg"},
+        "genres": [{"id": 1 + game_id % 5, "name": f"Genre {1 + game_id % 5}"}],
+        "platforms": [{"id": 1 + game_id % 3, "name": f"Platform {1 + game_id % 3}"}],
+        "screenshots": [{"id": game_id, "url": f"//images.igdb.test/igdb/image/upload/t_thumb/sc{game_id}.jpg"}],
+        "aggregated_rating": 70 + game_id % 30,
+        "aggregated_rating_count": game_id % 10,
+        "hypes": 1000 - game_id,
+    }
+
+
+def make_games(count, seed=0):
+    """Generate `count` varied, deterministic games for load testing."""
+
+    rng = random.Random(seed)
+    games = []
+    for game_id in range(1, count + 1):
+        name = " ".join(rng.sample(TITLE_WORDS, rng.randint(2, 3)))
+        genre_ids = sorted(rng.sample(range(1, len(GENRES) + 1), rng.randint(1, 3)))
+        platform_ids = sorted(rng.sample(range(1, len(PLATFORMS) + 1), rng.randint(1, 4)))
+        games.append({
+            "id": game_id,
+            "name": f"{name} {game_id}",
+            "summary": f"{name} is a game about {rng.choice(TITLE_WORDS).lower()}s. " * rng.randint(1, 6),
+            "cover": {"id": game_id, "url": f"//images.igdb.test/igdb/image/upload/t_thumb/co{game_id}.jpg"},
+            "genres": [{"id": i, "name": GENRES[i - 1]} for i in genre_ids],
+            "platforms": [{"id": i, "name": PLATFORMS[i - 1]} for i in platform_ids],
+            "screenshots": [{"id": game_id * 10 + i, "url": f"//images.igdb.test/igdb/image/upload/t_thumb/sc{game_id}_{i}.jpg"}
+                            for i in range(rng.randint(0, 5))],
+            "aggregated_rating": round(rng.uniform(40, 98), 2) if rng.random() < 0.7 else None,
+            "aggregated_rating_count": rng.randint(1, 60),
+            "hypes": rng.randint(0, 5000),
+        })
+    return games
+
+
+def load_games(path):
+    """Load games from a JSON fixture file (a list of IGDB game records)."""
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def parse_query(body):
+    """Pull `where id = (...)`, platform/genre filters, `limit` and `offset` out of an apicalypse body."""
+
+    query = {"ids": None, "limit": 10, "offset": 0, "platform": None, "genre": None,
+             "sort_hypes": "sort hypes desc" in body}
+    platform = re.search(r"platforms\s*=\s*(\d+)", body)
+    if platform:
+        query["platform"] = int(platform.group(1))
+    genre = re.search(r"genres\s*=\s*(\d+)", body)
+    if genre:
+        query["genre"] = int(genre.group(1))
+
+    ids = re.search(r"where\s+id\s*=\s*\(?([\d,\s]*)\)?", body)
+    if ids:
+        query["ids"] = [int(i) for i in ids.group(1).split(",") if i.strip()]
+    limit = re.search(r"limit\s+(\d+)", body)
+    if limit:
+        query["limit"] = int(limit.group(1))
+    offset = re.search(r"offset\s+(\d+)", body)
+    if offset:
+        query["offset"] = int(offset.group(1))
+
+    return query
+
+
+class FakeIGDBServer:
+    """Threaded HTTP server that answers like Twitch + IGDB.
+
+    `calls` records (method, path, body) for every request. Push status
+    codes onto `scripted_statuses` to make the next requests fail.
+    `latency` (+ up to `jitter`) seconds are added to every IGDB answer,
+    `error_rate` of them fail with 500, and more than `rate_limit`
+    requests in one second get 429, like IGDB.
+    """
+
+    def __init__(self, games=None, host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, rate_limit=None, seed=0):
+        self.games = games if games is not None else [make_game(i) for i in range(1, 101)]
+        self.games_by_id = {game["id"]: game for game in self.games}
+        self.games_by_hype = sorted(self.games, key=lambda game: -(game.get("hypes") or 0))
+        self.genres = self._collect("genres")
+        self.platforms = self._collect("platforms")
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self._rng = random.Random(seed)
+        self._window = (0, 0)
+        self.calls = []
+        self.token_requests = 0
+        self.scripted_statuses = []
+        self.valid_token = "fake-token"
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url(self):
+        return f"{self.url}/v4"
+
+    @property
+    def token_url(self):
+        return f"{self.url}/oauth2/token"
+
+    @property
+    def image_url(self):
+        """Stand-in for https://images.igdb.com/igdb/image/upload."""
+        return f"{self.url}/igdb/image/upload"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _collect(self, key):
+        items = {}
+        for game in self.games:
+            for item in game.get(key, []):
+                items[item["id"]] = item
+        return [items[item_id] for item_id in sorted(items)]
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls = []
+            self.token_requests = 0
+
+    def call_counts(self):
+        """{path: number of calls} for IGDB endpoints, multiquery included."""
+
+        counts = {}
+        for _, path, _ in self.igdb_calls():
+            counts[path] = counts.get(path, 0) + 1
+        return counts
+
+    def _throttled(self):
+        """Count this request against the per-second limit; True if over it."""
+
+        if not self.rate_limit:
+            return False
+        second = int(time.monotonic())
+        with self._lock:
+            start, count = self._window
+            if start != second:
+                start, count = second, 0
+            self._window = (start, count + 1)
+        return count + 1 > self.rate_limit
+
+    def igdb_calls(self, path=None):
+        """Recorded IGDB (non-token) calls, optionally filtered by path prefix."""
+
+        with self._lock:
+            return [call for call in self.calls
+                    if call[1].startswith("/v4/") and (path is None or call[1].startswith(f"/v4/{path}"))]
+
+    def image_calls(self):
+        """Recorded image downloads."""
+
+        with self._lock:
+            return [call for call in self.calls if call[1].startswith("/igdb/image/upload/")]
+
+    def answer_image(self, path):
+        """Return (status, JPEG bytes) for an IGDB image URL, drawn in a colour derived from its id."""
+
+        from PIL import Image
+
+        with self._lock:
+            self.calls.append(("GET", path, ""))
+        match = re.fullmatch(r"/igdb/image/upload/t_\w+/(\w+)\.jpg", path)
+        if not match:
+            return 404, b""
+        if self.latency:
+            time.sleep(self.latency)
+
+        image_id = match.group(1)
+        size = (1280, 720) if image_id.startswith("sc") else (600, 800)
+        image = Image.new("RGB", size, tuple(hashlib.sha1(image_id.encode()).digest()[:3]))
+        out = io.BytesIO()
+        image.save(out, "JPEG")
+        return 200, out.getvalue()
+
+    def answer(self, method, path, query, body):
+        """Return (status, payload) for one request."""
+
+        with self._lock:
+            self.calls.append((method, path, body))
+            if path == "/oauth2/token":
+                self.token_requests += 1
+                return 200, {"access_token": self.valid_token, "expires_in": 5000000, "token_type": "bearer"}
+            scripted = self.scripted_statuses.pop(0) if self.scripted_statuses else None
+
+        if scripted:
+            return scripted, {"message": "scripted failure"}
+
+        if self._throttled():
+            return 429, {"message": "Too Many Requests"}
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self._rng.uniform(0, self.jitter))
+        if self.error_rate and self._rng.random() < self.error_rate:
+            return 500, {"message": "Internal Server Error"}
+
+        resource = path[len("/v4/"):].strip("/")
+        if resource == "multiquery":
+            results = []
+            for endpoint, name, query in re.findall(r'query\s+(\S+)\s+"([^"]+)"\s*\{(.*?)\};', body, re.S):
+                status, payload = self.answer_resource(endpoint, query)
+                if status != 200:
+                    return status, payload
+                results.append({"name": name, **({"count": payload} if endpoint.endswith("/count") else {"result": payload})})
+            return 200, results
+
+        return self.answer_resource(resource, body)
+
+    def answer_resource(self, resource, body):
+        """Answer one IGDB endpoint (also used for multiquery sub-queries)."""
+
+        if resource.startswith("games/") and resource != "games/count":
+            game = self.games_by_id.get(int(resource.split("/")[1]))
+            return 200, [game] if game else []
+
+        if resource in ("games", "games/count"):
+            parsed = parse_query(body)
+            if parsed["ids"] is not None:
+                matches = [self.games_by_id[i] for i in parsed["ids"] if i in self.games_by_id]
+            else:
+                matches = self.games_by_hype if parsed["sort_hypes"] else self.games
+                if parsed["platform"]:
+                    matches = [g for g in matches if any(p["id"] == parsed["platform"] for p in g.get("platforms", []))]
+                if parsed["genre"]:
+                    matches = [g for g in matches if any(p["id"] == parsed["genre"] for p in g.get("genres", []))]
+            if resource == "games/count":
+                return 200, len(matches)
+            return 200, matches[parsed["offset"]:parsed["offset"] + parsed["limit"]]
+
+        if resource in ("platforms", "genres"):
+            return 200, [{"id": item["id"], "name": item["name"]} for item in getattr(self, resource)]
+
+        if resource == "release_dates":
+            game_id = re.search(r"where\s+game\s*=\s*(\d+)", body)
+            game = self.games_by_id.get(int(game_id.group(1))) if game_id else None
+            if not game:
+                return 200, []
+            return 200, [{"id": game["id"], "human": "2024-Jan-01", "platform": platform}
+                         for platform in game["platforms"]]
+
+        if resource == "search":
+            return 200, []
+
+        return 404, {"message": f"unknown endpoint {resource}"}
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self):
+                parsed = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode() if length else ""
+
+                if parsed.path.startswith("/igdb/image/upload/"):
+                    status, data = fake.answer_image(parsed.path)
+                    self.send_response(status)
+                    self.send_header("Content-Type", "image/jpeg")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return
+
+                if parsed.path.startswith("/v4/") and \
+                        self.headers.get("Authorization") != f"Bearer {fake.valid_token}":
+                    with fake._lock:
+                        fake.calls.append((self.command, parsed.path, body))
+                    status, payload = 401, {"message": "Authorization Failure"}
+                else:
+                    status, payload = fake.answer(self.command, parsed.path, parse_qs(parsed.query), body)
+
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = _respond
+            do_POST = _respond
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake IGDB/Twitch server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--games", type=int, default=5000, help="number of generated games")
+    parser.add_argument("--fixture", help="JSON file of games to serve instead of generated ones")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every IGDB answer")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of IGDB answers that fail with 500")
+    parser.add_argument("--rate-limit", type=int, default=4, help="requests per second before 429 (0 = off)")
+    args = parser.parse_args()
+
+    games = load_games(args.fixture) if args.fixture else make_games(args.games, args.seed)
+    server = FakeIGDBServer(games, host=args.host, port=args.port, latency=args.latency, jitter=args.jitter,
+                            error_rate=args.error_rate, rate_limit=args.rate_limit or None, seed=args.seed)
+    print(f"Fake IGDB serving {len(games)} games")
+    print(f"  IGDB_BASE_URL={server.base_url}")
+    print(f"  TWITCH_TOKEN_URL={server.token_url}")
+    print(f"  IGDB_IMAGE_URL={server.image_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+import api_utils
+from api_utils import TwitchTokenProvider, IGDBClient, IGDBError, TokenBucket, CircuitBreaker, CircuitOpenError
+from game_cache import GameCache
+from tests.fake_igdb import FakeIGDBServer, make_game
+
+
+def fake_token_response(token, expires_in=3600):
+    resp = mock.Mock(status_code=200)
+    resp.json.return_value = {"access_token": token, "expires_in": expires_in}
+    return resp
+
+
+class TestTwitchTokenProvider(unittest.TestCase):
+    """Test the cached Twitch token provider."""
+
+    def test_token_is_reused_until_expiry(self):
+        """Only one token fetch for many calls."""
+        provider = TwitchTokenProvider("http://twitch.test/token", "id", "secret")
+        with mock.patch("api_utils.requests.post", return_value=fake_token_response("abc")) as post:
+            tokens = [provider.get_token() for _ in range(5)]
+
+        self.assertEqual(tokens, ["abc"] * 5)
+        self.assertEqual(post.call_count, 1)
+
+    def test_expired_token_is_refreshed(self):
+        """A token inside the leeway window is fetched again."""
+        provider = TwitchTokenProvider("http://twitch.test/token", "id", "secret", leeway=60)
+        responses = [fake_token_response("old", expires_in=30), fake_token_response("new")]
+        with mock.patch("api_utils.requests.post", side_effect=responses):
+            self.assertEqual(provider.get_token(), "old")
+            self.assertEqual(provider.get_token(), "new")
+
+    def test_concurrent_callers_share_one_refresh(self):
+        """Threads racing on an empty cache trigger a single fetch."""
+        provider = TwitchTokenProvider("http://twitch.test/token", "id", "secret")
+        barrier = threading.Barrier(8)
+
+        def slow_post(*args, **kwargs):
+            return fake_token_response("shared")
+
+        def worker(results):
+            barrier.wait()
+            results.append(provider.get_token())
+
+        results = []
+        with mock.patch("api_utils.requests.post", side_effect=slow_post) as post:
+            threads = [threading.Thread(target=worker, args=(results,)) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        self.assertEqual(results, ["shared"] * 8)
+        self.assertEqual(post.call_count, 1)
+
+
+class TestIGDBClient(unittest.TestCase):
+    """Test the shared IGDB client against the local fake server."""
+
+    def setUp(self):
+        self.server = FakeIGDBServer().start()
+        self.addCleanup(self.server.stop)
+        provider = TwitchTokenProvider(self.server.token_url, "id", "secret")
+        self.client = IGDBClient(self.server.base_url, "id", provider, backoff=0)
+        provider.session = self.client.session
+
+    def test_token_fetched_once_for_many_requests(self):
+        """Repeated calls reuse both the token and the session."""
+        for _ in range(3):
+            self.assertEqual(self.client.post("games", data="fields name; limit 2;").status_code, 200)
+
+        self.assertEqual(self.server.token_requests, 1)
+        self.assertEqual(len(self.server.igdb_calls("games")), 3)
+
+    def test_retries_once_on_401(self):
+        """A 401 drops the cached token and retries with a new one."""
+        self.client.token_provider.get_token()
+        self.server.valid_token = "rotated-token"
+
+        response = self.client.post("games", data="fields name;")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.token_requests, 2)
+
+    def test_retries_on_429_and_5xx(self):
+        """Throttled and failed answers are retried with backoff."""
+        self.server.scripted_statuses = [429, 503]
+
+        response = self.client.post("games", data="fields name; limit 1;")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.igdb_calls("games")), 3)
+
+    def test_gives_up_after_max_retries(self):
+        """Persistent failures raise IGDBError."""
+        self.server.scripted_statuses = [500] * 10
+        self.client.max_retries = 2
+
+        with self.assertRaises(IGDBError):
+            self.client.post("games", data="fields name;")
+        self.assertEqual(len(self.server.igdb_calls("games")), 3)
+
+    def test_server_side_rate_limit_is_retried(self):
+        """IGDB's per-second limit answers 429, which the client waits out."""
+        self.server.rate_limit = 2
+        self.client.backoff = 0.3
+
+        statuses = [self.client.post("games", data="fields name; limit 1;").status_code for _ in range(3)]
+
+        self.assertEqual(statuses, [200, 200, 200])
+        self.assertGreater(len(self.server.igdb_calls("games")), 3)
+
+    def test_rate_limiter_spaces_requests(self):
+        """The token bucket holds callers to the configured rate."""
+        bucket = TokenBucket(rate=20, capacity=1)
+        start = time.monotonic()
+        for _ in range(5):
+            bucket.acquire()
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.18)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test the IGDB circuit breaker."""
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("api_utils.time.monotonic", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+        for ok in (False, False, True, False, False):
+            breaker.allow()
+            breaker.record(ok)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+        breaker.record(False)
+
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+        self.assertEqual(breaker.stats()["rejected"], 1)
+
+    def test_slow_successes_count_as_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, latency_budget=1)
+        breaker.record(True, 0.5)
+        breaker.record(True, 2)
+        breaker.record(True, 3)
+
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_half_open_probe_closes_or_reopens(self):
+        """After the reset timeout one probe goes through; its result decides."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        breaker.record(False)
+        self.now += 30
+
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record(False)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(breaker.retry_after(), 30)
+
+        self.now += 30
+        self.assertTrue(breaker.allow())
+        breaker.record(True)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.stats()["times_opened"], 2)
+
+
+class TestIGDBClientBreaker(unittest.TestCase):
+    """Test the IGDB client failing fast while IGDB is down."""
+
+    def setUp(self):
+        self.server = FakeIGDBServer().start()
+        self.addCleanup(self.server.stop)
+        provider = TwitchTokenProvider(self.server.token_url, "id", "secret")
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        self.client = IGDBClient(self.server.base_url, "id", provider, backoff=0, max_retries=1, breaker=self.breaker)
+        provider.session = self.client.session
+
+    def test_open_breaker_skips_igdb(self):
+        self.server.error_rate = 1.0
+        for _ in range(2):
+            with self.assertRaises(IGDBError):
+                self.client.post("games", data="fields name;")
+        calls = len(self.server.igdb_calls("games"))
+
+        with self.assertRaises(CircuitOpenError):
+            self.client.post("games", data="fields name;")
+        self.assertEqual(len(self.server.igdb_calls("games")), calls)
+
+    def test_rate_limiter_queueing_is_not_upstream_latency(self):
+        """Waiting on our own token bucket doesn't count against the latency budget."""
+        self.breaker.latency_budget = 0.1
+        self.client.rate_limiter = TokenBucket(rate=5, capacity=1)
+
+        for _ in range(4):
+            self.client.post("games", data="fields name; limit 1;")
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(self.breaker.stats()["consecutive_failures"], 0)
+
+    def test_slow_upstream_opens_breaker(self):
+        self.breaker.latency_budget = 0.1
+        self.server.latency = 0.15
+
+        for _ in range(2):
+            self.client.post("games", data="fields name; limit 1;")
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+    def test_twitch_outage_counts_as_failure(self):
+        self.client.token_provider.url = self.server.url + "/nowhere"
+
+        with self.assertRaises(IGDBError):
+            self.client.post("games", data="fields name;")
+        self.assertEqual(self.breaker.stats()["consecutive_failures"], 1)
+
+
+class TestGetGamesByIds(unittest.TestCase):
+    """Test batched game lookups."""
+
+    def setUp(self):
+        self.server = FakeIGDBServer(games=[make_game(i) for i in range(1, 1201)]).start()
+        self.addCleanup(self.server.stop)
+        provider = TwitchTokenProvider(self.server.token_url, "id", "secret")
+        for name, value in (("igdb", IGDBClient(self.server.base_url, "id", provider)),
+                            ("game_cache", GameCache(ttl=60, maxsize=5000))):
+            patcher = mock.patch.object(api_utils, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_returns_games_in_input_order(self):
+        """Results follow the requested order and skip unknown ids."""
+        games = api_utils.get_games_by_ids(["7", 3, 99999, 5])
+
+        self.assertEqual([game["id"] for game in games], [7, 3, 5])
+        self.assertEqual(len(self.server.igdb_calls("games")), 1)
+
+    def test_chunks_large_requests(self):
+        """Ids are fetched IGDB_MAX_LIMIT at a time."""
+        games = api_utils.get_games_by_ids(range(1, 1201))
+
+        self.assertEqual(len(games), 1200)
+        self.assertEqual(len(self.server.igdb_calls("games")), 3)
+
+    def test_unknown_single_game_is_none(self):
+        """An id IGDB doesn't know comes back as None, not an IndexError."""
+        self.assertIsNone(api_utils.get_single_game_info(99999))
+        self.assertEqual([game["id"] for game in api_utils.get_games_by_ids([99999, 1])], [1])
+
+    def test_cached_games_skip_igdb(self):
+        """Games seen before are served from the cache."""
+        api_utils.get_games_by_ids([1, 2])
+        api_utils.get_single_game_info(2)
+        games = api_utils.get_games_by_ids([2, 1, 3])
+
+        self.assertEqual([game["id"] for game in games], [2, 1, 3])
+        self.assertEqual(len(self.server.igdb_calls("games")), 2)
+
+
+class TestRunParallel(unittest.TestCase):
+    """Test the bounded fan-out helper."""
+
+    def test_keeps_input_order(self):
+        """Results line up with the calls, not with completion order."""
+        def call(i):
+            return lambda: (time.sleep(0.05 * (3 - i)), i)[1]
+
+        self.assertEqual(api_utils.run_parallel([call(i) for i in range(4)]), [0, 1, 2, 3])
+
+    def test_runs_concurrently(self):
+        """Total time is close to the slowest call, not the sum."""
+        start = time.monotonic()
+        api_utils.run_parallel([lambda: time.sleep(0.2)] * 4)
+
+        self.assertLess(time.monotonic() - start, 0.6)
+
+    def test_propagates_errors(self):
+        """An exception in any call reaches the caller."""
+        def fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            api_utils.run_parallel([lambda: 1, fail])
+
+    def test_times_out(self):
+        """Calls that overrun the timeout raise IGDBError."""
+        with self.assertRaises(IGDBError):
+            api_utils.run_parallel([lambda: time.sleep(0.5), lambda: 1], timeout=0.05)
+
+
+class TestMultiQuery(unittest.TestCase):
+    """Test combining IGDB lookups into one /multiquery call."""
+
+    def setUp(self):
+        self.server = FakeIGDBServer().start()
+        self.addCleanup(self.server.stop)
+        provider = TwitchTokenProvider(self.server.token_url, "id", "secret")
+        for name, value in (("igdb", IGDBClient(self.server.base_url, "id", provider)),
+                            ("game_cache", GameCache(ttl=60, maxsize=100))):
+            patcher = mock.patch.object(api_utils, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_results_split_by_name(self):
+        """Each named sub-query gets its own result; counts come back as ints."""
+        results = (api_utils.MultiQuery()
+                   .add("games", "games", "fields name; limit 3;")
+                   .add("count", "games/count", "")
+                   .add("genres", "genres", api_utils.GENRES_QUERY)
+                   .execute())
+
+        self.assertEqual(len(results["games"]), 3)
+        self.assertEqual(results["count"], 100)
+        self.assertEqual(results["genres"][0]["name"], "Genre 1")
+        self.assertEqual(len(self.server.igdb_calls()), 1)
+
+    def test_rejects_too_many_queries(self):
+        """IGDB caps multiquery at 10 sub-queries."""
+        query = api_utils.MultiQuery()
+        for i in range(10):
+            query.add(f"q{i}", "games", "fields name;")
+        with self.assertRaises(ValueError):
+            query.add("q10", "games", "fields name;")
+
+    def test_game_details_in_one_call(self):
+        """The detail page's game and release dates share one round trip."""
+        game = api_utils.get_game_details(7)
+
+        self.assertEqual(game["name"], "Game 7")
+        self.assertTrue(game["release_dates"])
+        self.assertEqual(api_utils.get_single_game_info(7)["name"], "Game 7")
+        self.assertEqual(len(self.server.igdb_calls()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
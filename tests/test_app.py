@@ -1,6 +1,16 @@
+import io
+import threading
+import time
 import unittest
+from unittest import mock
+import app as app_module
 from app import app
-from models import db, User, List  # Import the db instance, User, and List classes
+from models import db, User, List, ListItem, Rating, GameRatingStats, GameSimilarity, LeaderboardEntry, user_cache  # Import the db instance and models
+from recommendations import rebuild_similarities, update_similarities
+from leaderboard import facets_to_add, record_rating, rebuild_leaderboards
+from api_utils import CircuitBreaker, CircuitOpenError, IGDBError
+from game_cache import GameCache, SQLCacheBacking
+import metrics
 
 # Set the database URI for testing
 app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///test_capstone1'
@@ -31,6 +41,279 @@ class TestModels(unittest.TestCase):
             retrieved_user = User.query.filter_by(username='testuser').first()
             self.assertEqual(retrieved_user.username, 'testuser')
 
+    def test_rehash_on_login_is_best_effort(self):
+        """A busy hashing pool keeps the old hash instead of failing the login."""
+        from flask_bcrypt import Bcrypt
+        from models import password_hasher
+        from password_hashing import HashingBusy
+
+        with app.app_context():
+            old_hash = Bcrypt().generate_password_hash('password', 4).decode()
+            db.session.add(User(username='oldcost', password=old_hash, profile_image_url=''))
+            db.session.commit()
+
+            with mock.patch.object(password_hasher, 'hash', side_effect=HashingBusy()):
+                user = User.authenticate('oldcost', 'password')
+
+            self.assertEqual(user.username, 'oldcost')
+            self.assertEqual(User.query.filter_by(username='oldcost').one().password, old_hash)
+
+    def test_user_cache(self):
+        """Test the current-user identity cache and its invalidation."""
+        with app.app_context():
+            user = User.signup(username='cacheuser', password='password', profile_image_url='')
+            db.session.commit()
+            user_id = user.id
+            user_cache.clear()
+
+            self.assertEqual(user_cache.get(user_id).username, 'cacheuser')
+            db.session.remove()
+
+        with app.app_context():
+            cached = user_cache.get(user_id)
+            self.assertEqual(cached.username, 'cacheuser')
+            cached.username = 'renamed'
+            db.session.commit()
+
+        with app.app_context():
+            self.assertEqual(user_cache.get(user_id).username, 'renamed')
+
+    def test_rating_upsert(self):
+        """Test Rating.upsert writes the rating and the aggregate together."""
+        with app.app_context():
+            user = User.signup(username='upsertuser', password='password', profile_image_url='')
+            db.session.commit()
+
+            self.assertIsNone(Rating.upsert(user.id, 77, 5))
+            self.assertEqual(Rating.upsert(user.id, 77, 3), 5)
+            db.session.commit()
+
+            stats = GameRatingStats.query.get(77)
+            self.assertEqual((stats.rating_sum, stats.rating_count, stats.avg_rating), (3, 1, 3.0))
+            self.assertEqual(Rating.query.get((user.id, 77)).rating, 3)
+
+    def test_concurrent_rating_writes(self):
+        """Test racing re-ratings and first ratings keep game_rating_stats exact."""
+        with app.app_context():
+            first, second = (User.signup(username=f'race{i}', password='password', profile_image_url='') for i in range(2))
+            db.session.commit()
+            first_id, second_id = first.id, second.id
+            Rating.upsert(first_id, 78, 3)
+            db.session.commit()
+
+        def rate_in_background(user_id, game_id, rating):
+            def run():
+                with app.app_context():
+                    Rating.upsert(user_id, game_id, rating)
+                    db.session.commit()
+            thread = threading.Thread(target=run)
+            thread.start()
+            return thread
+
+        for game_id, user_id in ((78, first_id), (79, second_id)):
+            with app.app_context():
+                # This transaction writes 5 first; the other one (4) has to wait for it and then apply 4 - 5
+                Rating.upsert(user_id, game_id, 5)
+                racer = rate_in_background(user_id, game_id, 4)
+                time.sleep(0.3)
+                db.session.commit()
+            racer.join()
+
+        with app.app_context():
+            self.assertEqual(Rating.query.get((first_id, 78)).rating, 4)
+            for game_id in (78, 79):
+                stats = GameRatingStats.query.get(game_id)
+                self.assertEqual((stats.rating_sum, stats.rating_count), (4, 1))
+
+            # Keep these games out of the other tests' leaderboard rebuilds
+            Rating.query.filter(Rating.game_id.in_([78, 79])).delete()
+            GameRatingStats.query.filter(GameRatingStats.game_id.in_([78, 79])).delete()
+            db.session.commit()
+
+    def test_similar_games(self):
+        """Test the batch similarity build and the incremental update agree."""
+        with app.app_context():
+            users = [User.signup(username=f'similar{i}', password='password', profile_image_url='') for i in range(3)]
+            db.session.commit()
+            for user, ratings in zip(users, [{901: 5, 902: 4, 903: 5}, {901: 4, 902: 5}, {901: 2, 903: 2}]):
+                for game_id, rating in ratings.items():
+                    Rating.upsert(user.id, game_id, rating)
+            rebuild_similarities()
+            db.session.commit()
+            self.assertEqual(GameSimilarity.similar_to(901), [902, 903])
+
+            # The second user now rates 903 exactly like 901
+            Rating.upsert(users[1].id, 903, 4)
+            update_similarities([903])
+            db.session.commit()
+            self.assertEqual(GameSimilarity.similar_to(901), [903, 902])
+
+            def stored():
+                return {(row.game_id, row.similar_game_id): round(row.score, 5) for row in GameSimilarity.query.all()}
+
+            incremental = stored()
+            rebuild_similarities()
+            db.session.commit()
+            self.assertEqual(incremental, stored())
+
+    def test_leaderboard(self):
+        """Test Bayesian leaderboards follow rating writes and match a rebuild."""
+        games = [{'id': 801, 'platforms': [{'id': 6}], 'genres': [{'id': 12}]},
+                 {'id': 802, 'platforms': [{'id': 6}], 'genres': []}]
+        lookup = lambda ids: [game for game in games if game['id'] in list(ids)]
+        with app.app_context(), mock.patch('leaderboard.get_games_by_ids', side_effect=lookup):
+            users = [User.signup(username=f'board{i}', password='password', profile_image_url='') for i in range(4)]
+            db.session.commit()
+
+            # One 5 against four 4s: the prior (3.0, weight 5) favours the well-rated game
+            def rate(user, game_id, rating):
+                facets = facets_to_add(game_id)
+                Rating.upsert(user.id, game_id, rating)
+                record_rating(game_id, facets)
+
+            rate(users[0], 801, 5)
+            for user in users:
+                rate(user, 802, 4)
+            db.session.commit()
+
+            self.assertEqual([e.game_id for e in LeaderboardEntry.page('all', 10)], [802, 801])
+            self.assertEqual([e.game_id for e in LeaderboardEntry.page('genre:12', 10)], [801])
+            first, = LeaderboardEntry.page('platform:6', 1)
+            self.assertEqual([e.game_id for e in LeaderboardEntry.page('platform:6', 1, after=(first.score, first.game_id))], [801])
+            self.assertAlmostEqual(first.score, (16 + 15) / 9)
+
+            def stored():
+                return sorted((e.facet, e.game_id, round(e.score, 6), e.rating_count) for e in LeaderboardEntry.query.all())
+
+            # A racing first rating that also adds the game just rescores its rows
+            LeaderboardEntry.add(801, ['all', 'genre:12'])
+            db.session.commit()
+
+            incremental = stored()
+            rebuild_leaderboards()
+            db.session.commit()
+            self.assertEqual(incremental, stored())
+
+    def test_rating_csv_round_trip(self):
+        """Test COPY-based rating import and export."""
+        with app.app_context():
+            user = User.signup(username='csvuser', password='password', profile_image_url='')
+            db.session.commit()
+
+            csv_in = io.StringIO(f"user_id,game_id,rating\n{user.id},501,4\n{user.id},502,2\n{user.id},501,5\n")
+            self.assertEqual(Rating.copy_from_csv(csv_in), 2)
+            db.session.commit()
+
+            csv_out = io.StringIO()
+            Rating.copy_to_csv(csv_out)
+            self.assertIn(f"{user.id},501,5", csv_out.getvalue())
+            self.assertIn(f"{user.id},502,2", csv_out.getvalue())
+
+    def test_list_items(self):
+        """Test List.set_games diffing and the reverse lookups."""
+        with app.app_context():
+            user = User.signup(username='listuser', password='password', profile_image_url='')
+            db.session.commit()
+
+            game_list = List(user_id=user.id, title='Favorites')
+            db.session.add(game_list)
+            game_list.set_games(['3', '1', '2'])
+            db.session.commit()
+            self.assertEqual(game_list.games, [3, 1, 2])
+
+            game_list.set_games([2, 4, 3])
+            db.session.commit()
+            self.assertEqual(game_list.games, [2, 4, 3])
+
+            self.assertEqual([l.id for l in ListItem.lists_containing(4)], [game_list.id])
+            self.assertIn((2, 1), ListItem.most_listed())
+
+    def test_lists_before_backfill(self):
+        """Lists keep working on a database that still has the NOT NULL lists.games column."""
+        with app.app_context():
+            db.session.execute(db.text("ALTER TABLE lists ALTER COLUMN games SET NOT NULL"))
+            db.session.commit()
+            try:
+                user = User.signup(username='legacyuser', password='password', profile_image_url='')
+                db.session.commit()
+
+                old_list = List(user_id=user.id, title='Old', legacy_games=[7, 8, 7])
+                new_list = List(user_id=user.id, title='New')
+                db.session.add_all([old_list, new_list])
+                new_list.set_games([5])
+                db.session.commit()
+                self.assertEqual((old_list.games, new_list.games), ([7, 8], [5]))
+
+                old_list.set_games([8, 9])
+                db.session.commit()
+                self.assertEqual((old_list.games, old_list.legacy_games), ([8, 9], []))
+
+                old_list.set_games([])
+                db.session.commit()
+                self.assertEqual((old_list.games, old_list.legacy_games), ([], []))
+                self.assertEqual(List.backfill_items(), 0)
+            finally:
+                db.session.rollback()
+                db.session.execute(db.text("ALTER TABLE lists ALTER COLUMN games DROP NOT NULL"))
+                db.session.commit()
+
+    def test_rating_stats(self):
+        """Test GameRatingStats stays in step with rating writes."""
+        with app.app_context():
+            user = User.signup(username='statsuser', password='password', profile_image_url='')
+            db.session.commit()
+
+            other = User.signup(username='statsother', password='password', profile_image_url='')
+            db.session.commit()
+
+            # Plain ORM writes go through the trigger too
+            db.session.add_all([Rating(user_id=user.id, game_id=42, rating=4), Rating(user_id=other.id, game_id=42, rating=5)])
+            db.session.commit()
+            Rating.query.get((user.id, 42)).rating = 2
+            db.session.commit()
+            self.assertEqual(GameRatingStats.averages_for([42, 43]), {42: 3.5})
+
+            # Deleting a user cascades to their ratings and out of the totals
+            db.session.execute(db.delete(User).where(User.id == other.id))
+            db.session.commit()
+            self.assertEqual(GameRatingStats.averages_for([42]), {42: 2.0})
+
+            GameRatingStats.rebuild()
+            db.session.commit()
+            stats = GameRatingStats.query.get(42)
+            self.assertEqual((stats.rating_sum, stats.rating_count), (2, 1))
+
+
+    def test_rebuild_rating_stats_upgrades_old_databases(self):
+        """rebuild-rating-stats creates a missing stats table and fills it from existing ratings."""
+        with app.app_context():
+            user = User.signup(username='upgradeuser', password='password', profile_image_url='')
+            db.session.commit()
+            Rating.upsert(user.id, 61, 4)
+            db.session.commit()
+            GameRatingStats.__table__.drop(db.engine)
+
+        result = app.test_cli_runner().invoke(args=['rebuild-rating-stats'])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        with app.app_context():
+            self.assertEqual(GameRatingStats.averages_for([61]), {61: 4.0})
+
+    def test_sql_cache_backing_batches(self):
+        """The durable cache backing reads and upserts many keys at once."""
+        backing = SQLCacheBacking(app)
+        backing.store_many({"test:1": {"id": 1}, "test:2": {"id": 2}}, 1000.0)
+        backing.store_many({"test:2": {"id": 22}, "test:3": {"id": 3}}, 2000.0)
+
+        loaded = backing.load_many(["test:1", "test:2", "test:3", "test:4"])
+        self.assertEqual(loaded, {"test:1": ({"id": 1}, 1000.0), "test:2": ({"id": 22}, 2000.0),
+                                  "test:3": ({"id": 3}, 2000.0)})
+        self.assertEqual(backing.load("test:4"), None)
+
+        cache = GameCache(ttl=10 ** 10, maxsize=10, backing=backing)
+        self.assertEqual(cache.get_many_or_fetch(["test:1", "test:5"], lambda keys: {"test:5": {"id": 5}}),
+                         {"test:1": {"id": 1}, "test:5": {"id": 5}})
+        self.assertEqual(backing.load("test:5")[0], {"id": 5})
 
 
 class TestRoutes(unittest.TestCase):
@@ -76,6 +359,249 @@ class TestRoutes(unittest.TestCase):
         response = self.app.get('/new_list')
         self.assertEqual(response.status_code, 302)  # Redirects to login page
 
+    def test_api_games_rejects_bad_params(self):
+        """Test /api/games validates cursor and fields."""
+        response = self.app.get('/api/games?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+        response = self.app.get('/api/games?fields=name,password')
+        self.assertEqual(response.status_code, 400)
+
+    def test_api_top_pages_with_cursor(self):
+        """Test /api/top returns pages linked by X-Next-Cursor."""
+        with app.app_context():
+            for game_id, score in [(701, 4.5), (702, 4.0), (703, 3.5)]:
+                db.session.add(LeaderboardEntry(facet='all', game_id=game_id, score=score, rating_count=3))
+            db.session.commit()
+
+        with mock.patch('app.get_games_by_ids', return_value=[]):
+            first = self.app.get('/api/top?limit=2')
+            second = self.app.get(f"/api/top?limit=2&cursor={first.headers['X-Next-Cursor']}")
+
+        self.assertEqual([game['id'] for game in first.get_json()], [701, 702])
+        self.assertEqual([game['id'] for game in second.get_json()], [703])
+        self.assertNotIn('X-Next-Cursor', second.headers)
+        self.assertEqual(self.app.get('/api/top?cursor=bogus').status_code, 400)
+        self.assertEqual(self.app.get('/api/top?platform=6&genre=12').status_code, 400)
+
+    def test_game_card_follows_rating_changes(self):
+        """Test cached game cards render again when the average rating changes."""
+        from app import fragment_cache, game_card
+
+        game = {'id': 801, 'name': 'Card Game', 'genres': [{'id': 1, 'name': 'Puzzle'}], 'platforms': ['PC']}
+        fragment_cache.clear()
+        with app.test_request_context('/'):
+            unrated = game_card(game, None)
+            self.assertIs(game_card(game, None), unrated)
+            rated = game_card(game, 4.5)
+
+        self.assertIn('Puzzle', unrated)
+        self.assertIn('Not yet available', unrated)
+        self.assertIn('4.5', rated)
+
+    def test_stale_data_banner_while_igdb_is_down(self):
+        """Test pages built from stale cache entries say so while the IGDB breaker is open."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        breaker.record(False)
+
+        def stale_page(**kwargs):
+            metrics.record_cache_lookup("stale")
+            return {'games': [], 'count': 0}
+
+        with mock.patch('app.igdb.breaker', breaker), mock.patch('app.get_games_page', side_effect=stale_page):
+            response = self.app.get('/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers.get('X-Data-Stale'), '1')
+        self.assertIn(b"may be out of date", response.data)
+
+    def test_igdb_outage_without_cached_data_is_503(self):
+        """Test a page with nothing cached fails fast with 503 and Retry-After."""
+        with mock.patch('app.get_games_page', side_effect=CircuitOpenError("open")):
+            response = self.app.get('/')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+
+    def test_edit_list_validates_submitted_games(self):
+        """Test edits save the submitted games and reject ids outside the index."""
+        from search_index import GameNameIndex
+
+        index = GameNameIndex()
+        index.add_games([{'id': 11, 'name': 'Eleven'}, {'id': 12, 'name': 'Twelve'}, {'id': 13, 'name': 'Thirteen'}])
+        with app.app_context():
+            user = User.signup(username='editor', password='password', profile_image_url='')
+            db.session.commit()
+            game_list = List(user_id=user.id, title='Before')
+            db.session.add(game_list)
+            db.session.flush()
+            game_list.set_games([11, 12])
+            db.session.commit()
+            user_id, list_id = user.id, game_list.id
+
+        client = app.test_client()  # its own client, so the login doesn't leak into the other route tests
+        with client.session_transaction() as session:
+            session['curr_user'] = user_id
+        with mock.patch('app.get_game_index', return_value=index), mock.patch('app.get_games_by_ids', return_value=[]):
+            rejected = client.post(f'/list/{list_id}/edit', data={'name': 'Bogus', 'game_select': ['99999999']})
+            client.post(f'/list/{list_id}/edit', data={'name': 'After', 'game_select': ['13', '11']})
+
+        self.assertEqual(rejected.status_code, 200)  # form shown again with the error
+        with app.app_context():
+            game_list = List.query.get(list_id)
+            self.assertEqual(game_list.title, 'After')
+            self.assertEqual(sorted(game_list.games), [11, 13])
+
+            db.session.delete(game_list)
+            db.session.delete(User.query.get(user_id))
+            db.session.commit()
+
+    def test_api_games_against_fake_igdb(self):
+        """Test /api/games paging, projection, streaming and averages against the fake IGDB."""
+        import json
+        import api_utils
+        from api_utils import IGDBClient, TwitchTokenProvider
+        from tests.fake_igdb import FakeIGDBServer
+
+        server = FakeIGDBServer().start()  # games 1-100, most hyped first is id order
+        self.addCleanup(server.stop)
+        provider = TwitchTokenProvider(server.token_url, "id", "secret")
+        for target, name, value in ((api_utils, "igdb", IGDBClient(server.base_url, "id", provider)),
+                                    (api_utils, "game_cache", GameCache(ttl=60, maxsize=100)),
+                                    (app_module, "API_GAMES_PAGE_SIZE", 4)):
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        with app.app_context():
+            db.session.add(GameRatingStats(game_id=3, rating_sum=9, rating_count=2, avg_rating=4.5))
+            db.session.commit()
+
+        try:
+            response = self.app.get('/api/games?limit=10&fields=id,name,avg_rating')
+            games = json.loads(response.get_data(as_text=True))
+            self.assertEqual([game['id'] for game in games], list(range(1, 11)))
+            self.assertEqual(set(games[0]), {'id', 'name', 'avg_rating'})
+            self.assertEqual((games[0]['avg_rating'], games[2]['avg_rating']), (None, 4.5))
+            # Ten games streamed from pages of four: three upstream calls, and not cacheable
+            self.assertEqual(len(server.igdb_calls("games")), 3)
+            self.assertIn('no-store', response.headers['Cache-Control'])
+
+            cursor = response.headers['X-Next-Cursor']
+            response = self.app.get(f'/api/games?limit=3&fields=id&cursor={cursor}')
+            self.assertEqual(json.loads(response.get_data(as_text=True)), [{'id': 11}, {'id': 12}, {'id': 13}])
+            self.assertIn('public', response.headers['Cache-Control'])
+
+            # A page failing mid-stream still ends the array, and nothing is cached
+            get_game_info = app_module.get_game_info
+
+            def failing_second_page(limit, offset, filters):
+                if offset >= 24:
+                    raise IGDBError("IGDB down")
+                return get_game_info(limit=limit, offset=offset, filters=filters)
+
+            with mock.patch.object(app_module, 'get_game_info', side_effect=failing_second_page):
+                response = self.app.get('/api/games?limit=10&offset=20&fields=id')
+                body = response.get_data(as_text=True)  # the stream runs as it is read
+            self.assertEqual(json.loads(body), [{'id': i} for i in range(21, 25)])
+            self.assertIn('no-store', response.headers['Cache-Control'])
+
+            response = self.app.get('/api/games?limit=5&offset=98&fields=id')
+            self.assertEqual(json.loads(response.get_data(as_text=True)), [{'id': 99}, {'id': 100}])
+
+            self.assertEqual(self.app.get('/api/games?fields=id,secret').status_code, 400)
+            self.assertEqual(self.app.get('/api/games?cursor=%%%').status_code, 400)
+        finally:
+            with app.app_context():
+                db.session.execute(db.delete(GameRatingStats).where(GameRatingStats.game_id == 3))
+                db.session.commit()
+
+    def test_game_details_in_one_igdb_call(self):
+        """A cold game page gets the game, its release dates and its similar games in one IGDB call."""
+        import api_utils
+        from api_utils import IGDBClient, TwitchTokenProvider
+        from tests.fake_igdb import FakeIGDBServer
+
+        server = FakeIGDBServer().start()
+        self.addCleanup(server.stop)
+        provider = TwitchTokenProvider(server.token_url, "id", "secret")
+        for name, value in (("igdb", IGDBClient(server.base_url, "id", provider)),
+                            ("game_cache", GameCache(ttl=60, maxsize=100))):
+            patcher = mock.patch.object(api_utils, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        with mock.patch('app.GameSimilarity.similar_to', return_value=[2, 3]):
+            response = self.app.get('/games/1')
+            self.assertEqual(len(server.igdb_calls()), 1)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'Game 3', response.data)
+
+            self.app.get('/games/1')
+            self.assertEqual(len(server.igdb_calls()), 1)
+
+    def test_warm_cache_requires_durable_cache(self):
+        """warm-cache refuses to fill a cache no web worker would read."""
+        with mock.patch.object(app_module.game_cache, 'backing', None), \
+                mock.patch.object(app_module.cache_warmer, 'warm') as warm:
+            result = app.test_cli_runner().invoke(args=['warm-cache'])
+
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn('GAME_CACHE_DURABLE=1', result.output)
+        warm.assert_not_called()
+
+    def test_profile_route(self):
+        """Test profile paging, and that its query and IGDB call counts don't grow with the ratings."""
+        import api_utils
+        from api_utils import IGDBClient, TwitchTokenProvider
+        from tests.fake_igdb import FakeIGDBServer
+
+        server = FakeIGDBServer().start()
+        self.addCleanup(server.stop)
+        provider = TwitchTokenProvider(server.token_url, "id", "secret")
+        patcher = mock.patch.object(api_utils, "igdb", IGDBClient(server.base_url, "id", provider))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        with app.app_context():
+            user = User.signup(username='profileuser', password='password', profile_image_url='')
+            db.session.commit()
+            user_id = user.id
+
+        def rate(game_ids):
+            with app.app_context():
+                for game_id in game_ids:
+                    Rating.upsert(user_id, game_id, 3)
+                db.session.commit()
+
+        def profile(page=1):
+            """(response, SQL queries, IGDB calls) for one cold-cache profile request."""
+            with mock.patch.object(metrics.sql_queries_per_request, 'observe') as sql, \
+                    mock.patch.object(metrics.igdb_calls_per_request, 'observe') as igdb, \
+                    mock.patch.object(api_utils, 'game_cache', GameCache(ttl=60, maxsize=100)):
+                response = self.app.get(f'/users/profile/{user_id}?page={page}')
+            return response, sql.call_args.args[0], igdb.call_args.args[0]
+
+        try:
+            rate(range(1, 4))
+            few, few_queries, few_calls = profile()
+            rate(range(4, 34))
+            first, many_queries, many_calls = profile()
+            second, _, _ = profile(page=2)
+
+            self.assertEqual(few.status_code, 200)
+            self.assertEqual((many_queries, many_calls), (few_queries, few_calls))
+            self.assertEqual(few_calls, 1)
+            # Ratings tie at 3, so they page in game id order, 20 at a time
+            self.assertIn(b'Game 20', first.data)
+            self.assertNotIn(b'Game 21', first.data)
+            self.assertIn(b'Game 21', second.data)
+            self.assertIn(b'2 / 2', second.data)
+
+            self.assertEqual(self.app.get('/users/profile/999999').status_code, 404)
+        finally:
+            with app.app_context():
+                db.session.execute(db.delete(User).where(User.id == user_id))
+                db.session.commit()
+
     def test_list_route(self):
         """Test list route."""
         response = self.app.get('/list/1')
@@ -0,0 +1,73 @@
+import threading
+import unittest
+from unittest import mock
+
+from cache_warmer import CacheWarmer
+
+
+def page(offset):
+    games = [
+        {"id": offset + 1, "platforms": ["PC (Microsoft Windows)", "PlayStation 4"], "genres": ["Shooter"]},
+        {"id": offset + 2, "platforms": ["PC (Microsoft Windows)"], "genres": ["Role-playing (RPG)", "Shooter"]},
+    ]
+    return {"games": games, "count": 100}
+
+
+class TestCacheWarmer(unittest.TestCase):
+    """Test the hot-page and popular-game prefetch."""
+
+    def setUp(self):
+        catalog = mock.Mock()
+        catalog.platform_names.return_value = {6: "PC (Microsoft Windows)", 48: "PlayStation 4"}
+        catalog.genre_names.return_value = {5: "Shooter", 12: "Role-playing (RPG)"}
+        patchers = [
+            mock.patch("cache_warmer.get_games_page", side_effect=lambda limit, offset, min_fresh: page(offset)),
+            mock.patch("cache_warmer.get_game_info", return_value=[]),
+            mock.patch("cache_warmer.get_game_details", return_value={}),
+            mock.patch("cache_warmer.catalog", catalog),
+            mock.patch("cache_warmer.GameRatingStats.most_rated", return_value=[(7, 30), (8, 12)]),
+            mock.patch("cache_warmer.ListItem.most_listed", return_value=[(8, 4), (9, 2)]),
+        ]
+        self.games_page, self.game_info, self.game_details = [p.start() for p in patchers][:3]
+        for p in patchers:
+            self.addCleanup(p.stop)
+
+    def test_warms_pages_filters_and_popular_games(self):
+        """Overall pages, pages per popular platform/genre, then popular game details."""
+        warmed = CacheWarmer(app=None, pages=2, filters=1, games=2).warm()
+
+        self.assertEqual([c.kwargs["offset"] for c in self.games_page.call_args_list], [0, 20])
+        filtered = sorted((c.kwargs["filters"], c.kwargs["offset"]) for c in self.game_info.call_args_list)
+        self.assertEqual(filtered, [("genres=5;", 0), ("genres=5;", 20), ("platforms=6;", 0), ("platforms=6;", 20)])
+        self.assertEqual(sorted(c.args[0] for c in self.game_details.call_args_list), [7, 8, 9])
+        self.assertEqual(warmed, {"pages": 6, "games": 3, "failed": 0})
+
+    def test_min_fresh_is_passed_through(self):
+        """The scheduler's refresh-ahead window reaches every cached getter."""
+        CacheWarmer(app=None, pages=1, filters=1, games=1).warm(min_fresh=600)
+
+        for getter in (self.games_page, self.game_info, self.game_details):
+            self.assertTrue(all(c.kwargs["min_fresh"] == 600 for c in getter.call_args_list))
+
+    def test_runs_on_its_own_threads(self):
+        """Warm-up fetches don't occupy the fan-out pool live requests use."""
+        threads = set()
+        self.game_details.side_effect = lambda game_id, min_fresh: threads.add(threading.current_thread().name)
+
+        CacheWarmer(app=None, pages=1, filters=1, games=2, concurrency=2).warm()
+
+        self.assertTrue(threads)
+        self.assertTrue(all(name.startswith("cache-warmer") for name in threads))
+
+    def test_failures_are_counted_not_raised(self):
+        """One failing fetch doesn't stop the rest."""
+        self.game_details.side_effect = [RuntimeError("IGDB down"), {}, {}]
+
+        warmed = CacheWarmer(app=None, pages=1, filters=1, games=2).warm()
+
+        self.assertEqual(warmed["games"], 2)
+        self.assertEqual(warmed["failed"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from unittest import mock
+
+from catalog import Catalog
+from game_cache import GameCache
+
+
+PLATFORMS = [{"id": 6, "name": "PC (Microsoft Windows)"}, {"id": 48, "name": "PlayStation 4"}]
+GENRES = [{"id": 12, "name": "Role-playing (RPG)"}]
+
+
+class DictBacking:
+    """In-memory stand-in for the games_cache table, shared like the real one."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def load(self, key):
+        return self.rows.get(key)
+
+    def load_many(self, keys):
+        return {key: self.rows[key] for key in keys if key in self.rows}
+
+    def store_many(self, values, fetched_at):
+        self.rows.update((key, (value, fetched_at)) for key, value in values.items())
+
+
+class TestCatalog(unittest.TestCase):
+    """Test the in-memory platform/genre catalog."""
+
+    def setUp(self):
+        patchers = [
+            mock.patch("catalog.get_catalog_info", return_value={"platforms": PLATFORMS, "genres": GENRES}),
+            mock.patch("catalog.game_cache", GameCache(ttl=60, maxsize=10)),
+        ]
+        self.catalog_info, _ = [p.start() for p in patchers]
+        for p in patchers:
+            self.addCleanup(p.stop)
+
+    def test_loads_once_and_maps_names(self):
+        """IGDB is asked once; id->name maps come from the snapshot."""
+        catalog = Catalog(max_age=60)
+
+        self.assertEqual(catalog.platform_names(), {6: "PC (Microsoft Windows)", 48: "PlayStation 4"})
+        self.assertEqual(catalog.genre_names(), {12: "Role-playing (RPG)"})
+        catalog.section("platforms")
+        self.assertEqual(self.catalog_info.call_count, 1)
+
+    def test_etag_changes_with_content(self):
+        """A refresh with new data produces a new ETag."""
+        catalog = Catalog(max_age=60)
+        etag = catalog.section("genres").etag
+
+        self.catalog_info.return_value = {"platforms": PLATFORMS, "genres": GENRES + [{"id": 5, "name": "Shooter"}]}
+        catalog.refresh()
+
+        self.assertNotEqual(catalog.section("genres").etag, etag)
+
+    def test_age_reload_takes_the_shared_snapshot(self):
+        """A snapshot stored by another process (refresh-catalog) is used instead of IGDB."""
+        backing = DictBacking()
+        worker_cache = GameCache(ttl=60, maxsize=10, backing=backing)
+        with mock.patch("catalog.game_cache", worker_cache):
+            worker = Catalog(max_age=60)
+            worker.section("genres")
+        with mock.patch("catalog.game_cache", GameCache(ttl=60, maxsize=10, backing=backing)):
+            self.catalog_info.return_value = {"platforms": PLATFORMS, "genres": GENRES + [{"id": 5, "name": "Shooter"}]}
+            Catalog(max_age=60).refresh()
+        self.assertEqual(self.catalog_info.call_count, 2)
+
+        worker._loaded_at -= 61  # the worker's snapshot is now past max_age
+        with mock.patch("catalog.game_cache", worker_cache):  # still holding the old snapshot in memory
+            self.assertIn(5, worker.genre_names())
+        self.assertEqual(self.catalog_info.call_count, 2)
+
+    def test_route_answers_304_for_matching_etag(self):
+        """/api/platforms honours If-None-Match."""
+        from app import app
+
+        with mock.patch("app.catalog", Catalog(max_age=60)):
+            client = app.test_client()
+            first = client.get("/api/platforms")
+            second = client.get("/api/platforms", headers={"If-None-Match": first.headers["ETag"]})
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json, PLATFORMS)
+        self.assertIn("max-age", first.headers["Cache-Control"])
+        self.assertEqual(second.status_code, 304)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from unittest import mock
+
+from markupsafe import Markup
+
+from fragment_cache import FragmentCache
+
+
+class TestFragmentCache(unittest.TestCase):
+    """Test the rendered fragment cache."""
+
+    def test_renders_once_per_version(self):
+        """A fragment is reused until its version changes."""
+        cache = FragmentCache(maxsize=10)
+        render = mock.Mock(side_effect=["<p>v1</p>", "<p>v2</p>"])
+
+        self.assertEqual(cache.get_or_render("card", 1, ("v1",), render), "<p>v1</p>")
+        self.assertEqual(cache.get_or_render("card", 1, ("v1",), render), "<p>v1</p>")
+        self.assertEqual(cache.get_or_render("card", 1, ("v2",), render), "<p>v2</p>")
+        self.assertEqual(render.call_count, 2)
+
+    def test_fragments_are_markup(self):
+        """Cached HTML is included in pages without escaping."""
+        cache = FragmentCache(maxsize=10)
+
+        self.assertIsInstance(cache.get_or_render("card", 1, (), lambda: "<b>x</b>"), Markup)
+
+    def test_invalidate_drops_every_template_for_the_game(self):
+        cache = FragmentCache(maxsize=10)
+        cache.get_or_render("card", 1, (), lambda: "a")
+        cache.get_or_render("row", 1, (), lambda: "b")
+        cache.get_or_render("card", 2, (), lambda: "c")
+
+        cache.invalidate(1)
+
+        self.assertEqual(len(cache), 1)
+        render = mock.Mock(return_value="a2")
+        cache.get_or_render("card", 1, (), render)
+        render.assert_called_once()
+
+    def test_evicts_least_recently_used(self):
+        """The cache never holds more than `maxsize` fragments."""
+        cache = FragmentCache(maxsize=2)
+        cache.get_or_render("card", 1, (), lambda: "a")
+        cache.get_or_render("card", 2, (), lambda: "b")
+        cache.get_or_render("card", 1, (), lambda: "unused")
+        cache.get_or_render("card", 3, (), lambda: "c")
+
+        render = mock.Mock(return_value="b2")
+        cache.get_or_render("card", 2, (), render)
+        render.assert_called_once()
+        self.assertEqual(len(cache), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from game_cache import GameCache
+
+
+class TestGameCache(unittest.TestCase):
+    """Test the TTL/LRU game metadata cache."""
+
+    def test_fetches_once_while_fresh(self):
+        """A fresh entry is served without calling fetch again."""
+        cache = GameCache(ttl=60, maxsize=10)
+        fetch = mock.Mock(return_value={"id": 1})
+
+        self.assertEqual(cache.get_or_fetch("game:1", fetch), {"id": 1})
+        self.assertEqual(cache.get_or_fetch("game:1", fetch), {"id": 1})
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_evicts_least_recently_used(self):
+        """The cache never holds more than `maxsize` entries."""
+        cache = GameCache(ttl=60, maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), (1, True))
+
+    def test_stale_entry_served_while_one_refresh_runs(self):
+        """Past the TTL the old value is returned and refreshed once in the background."""
+        cache = GameCache(ttl=60, maxsize=10, stale_ttl=600)
+        cache.set("game:1", "old")
+        refreshed = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            refreshed.wait(1)
+            return "new"
+
+        with mock.patch("game_cache.time.time", return_value=time.time() + 120):
+            results = [cache.get_or_fetch("game:1", fetch) for _ in range(5)]
+            refreshed.set()
+
+        self.assertEqual(results, ["old"] * 5)
+        for _ in range(100):
+            if cache.get("game:1")[0] == "new":
+                break
+            time.sleep(0.01)
+        self.assertEqual(cache.get("game:1"), ("new", True))
+        self.assertEqual(len(calls), 1)
+
+    def test_expired_entry_is_refetched(self):
+        """Past the stale window the entry counts as a miss."""
+        cache = GameCache(ttl=60, maxsize=10, stale_ttl=60)
+        cache.set("game:1", "old")
+
+        with mock.patch("game_cache.time.time", return_value=time.time() + 1000):
+            self.assertEqual(cache.get_or_fetch("game:1", lambda: "new"), "new")
+
+    def test_min_fresh_refetches_ahead_of_expiry(self):
+        """Entries going stale within `min_fresh` seconds are refetched right away."""
+        cache = GameCache(ttl=60, maxsize=10, stale_ttl=60)
+        cache.set("game:1", "old")
+
+        self.assertEqual(cache.get_or_fetch("game:1", lambda: "new", min_fresh=10), "old")
+        with mock.patch("game_cache.time.time", return_value=time.time() + 55):
+            self.assertEqual(cache.get_or_fetch("game:1", lambda: "new", min_fresh=10), "new")
+        self.assertEqual(cache.get("game:1"), ("new", True))
+
+
+    def test_expired_entry_served_when_fetch_fails(self):
+        """Past the stale window, a failing fetch falls back to the copy still held."""
+        cache = GameCache(ttl=60, maxsize=10, stale_ttl=60)
+        cache.set("game:1", "old")
+
+        def fail():
+            raise RuntimeError("IGDB down")
+
+        with mock.patch("game_cache.time.time", return_value=time.time() + 1000):
+            self.assertEqual(cache.get_or_fetch("game:1", fail), "old")
+            self.assertEqual(cache.get_many_or_fetch(["game:1"], lambda keys: fail()), {"game:1": "old"})
+            with self.assertRaises(RuntimeError):
+                cache.get_or_fetch("game:1", fail, min_fresh=10)
+            with self.assertRaises(RuntimeError):
+                cache.get_many_or_fetch(["game:1", "game:2"], lambda keys: fail())
+    def test_get_many_batches_backing_reads_and_writes(self):
+        """Keys not in memory are loaded in one backing call; fetched values are stored in one."""
+        backing = mock.Mock()
+        backing.load_many.return_value = {"game:1": ("durable", time.time())}
+        cache = GameCache(ttl=60, maxsize=10, backing=backing)
+        cache.set("game:2", "memory")
+        backing.reset_mock()
+
+        found = cache.get_many_or_fetch(["game:1", "game:2", "game:3", "game:4"],
+                                        lambda keys: {key: f"fetched {key}" for key in keys})
+
+        self.assertEqual(found, {"game:1": "durable", "game:2": "memory",
+                                 "game:3": "fetched game:3", "game:4": "fetched game:4"})
+        backing.load_many.assert_called_once_with(["game:1", "game:3", "game:4"])
+        backing.store_many.assert_called_once()
+        self.assertEqual(backing.store_many.call_args[0][0], {"game:3": "fetched game:3", "game:4": "fetched game:4"})
+
+
+if __name__ == '__main__':
+    unittest.main()
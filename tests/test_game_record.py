@@ -0,0 +1,75 @@
+import unittest
+
+from api_utils import decode_cache_entry, encode_cache_entry
+from game_record import GameRecord, GENRES
+from tests.fake_igdb import make_game, make_games
+
+
+class TestGameRecord(unittest.TestCase):
+    """Test the compact cached form of IGDB games."""
+
+    def test_round_trips_the_igdb_shape(self):
+        """`to_igdb()` gives back the fields IGDB sent (sub-object ids aside)."""
+        game = make_game(7)
+        record = GameRecord.from_igdb(game)
+
+        self.assertEqual(record.to_igdb(), dict(
+            game,
+            cover={"url": game["cover"]["url"]},
+            screenshots=[{"url": game["screenshots"][0]["url"]}],
+        ))
+
+    def test_summary_shape(self):
+        summary = GameRecord.from_igdb(make_game(7)).to_summary()
+
+        self.assertEqual(summary["genres"], ["Genre 3"])
+        self.assertEqual(summary["platforms"], ["Platform 2"])
+        self.assertEqual(summary["cover_url"], make_game(7)["cover"]["url"])
+        self.assertEqual(set(summary), {"id", "name", "summary", "aggregated_rating", "aggregated_rating_count",
+                                        "cover_url", "genres", "platforms", "hypes"})
+
+    def test_missing_fields_are_left_out(self):
+        """Like IGDB, `to_igdb()` omits fields the game doesn't have."""
+        self.assertEqual(GameRecord.from_igdb({"id": 3, "name": "Bare"}).to_igdb(), {"id": 3, "name": "Bare"})
+
+    def test_summaries_rebuild_to_the_same_record(self):
+        """A summary (the old cached list shape) converts back by name."""
+        game = make_game(9)
+        del game["screenshots"]  # not part of the summary
+        record = GameRecord.from_igdb(game)
+
+        self.assertEqual(GameRecord.from_igdb(record.to_summary()), record)
+
+    def test_unknown_bare_names_get_stand_in_ids(self):
+        record = GameRecord.from_igdb({"id": 1, "genres": ["Genre Nobody Has Seen"]})
+
+        self.assertLess(record.genre_ids[0], 0)
+        self.assertEqual(record.to_summary()["genres"], ["Genre Nobody Has Seen"])
+        GENRES.add(777, "Genre Nobody Has Seen")
+        self.assertEqual(GameRecord.from_igdb({"id": 2, "genres": ["Genre Nobody Has Seen"]}).genre_ids, (777,))
+
+    def test_names_and_id_tuples_are_shared(self):
+        """Games with the same genres share one tuple and one name string."""
+        first, second = (GameRecord.from_igdb(make_game(game_id)) for game_id in (5, 10))
+
+        self.assertIs(first.genre_ids, second.genre_ids)
+        self.assertIs(first.to_summary()["genres"][0], second.to_summary()["genres"][0])
+
+    def test_durable_cache_payloads_round_trip(self):
+        records = tuple(GameRecord.from_igdb(game) for game in make_games(3))
+        entries = {
+            "game:1": records[0],
+            "games:fields name;": records,
+            "page:fields name;": {"games": records, "count": 3},
+            "details:1": {"game": records[0], "release_dates": [{"human": "2024"}]},
+            "details:99": None,
+            "catalog:platforms+genres": {"platforms": [], "genres": []},
+        }
+
+        for key, value in entries.items():
+            with self.subTest(key=key):
+                self.assertEqual(decode_cache_entry(key, encode_cache_entry(key, value)), value)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+from flask import Flask
+
+from http_cache import init_http_cache, cache_policy
+
+
+def make_app():
+    app = Flask(__name__, static_folder="../static")
+
+    @app.route("/public")
+    @cache_policy(max_age=300, public=True, etag=True, vary=("Accept-Encoding",))
+    def public():
+        return {"games": [1, 2, 3]}
+
+    @app.route("/private")
+    def private():
+        return "hello user"
+
+    @app.route("/static-url")
+    def static_url():
+        from flask import url_for
+        return url_for("static", filename="css/style.css")
+
+    init_http_cache(app)
+    return app
+
+
+class TestHttpCache(unittest.TestCase):
+    """Test per-route HTTP caching policies."""
+
+    def setUp(self):
+        self.client = make_app().test_client()
+
+    def test_public_route_gets_max_age_etag_and_vary(self):
+        """Decorated routes are cacheable and revalidate with 304."""
+        response = self.client.get("/public")
+
+        self.assertEqual(response.cache_control.max_age, 300)
+        self.assertTrue(response.cache_control.public)
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+
+        again = self.client.get("/public", headers={"If-None-Match": response.headers["ETag"]})
+        self.assertEqual(again.status_code, 304)
+
+    def test_undecorated_route_is_private_no_store(self):
+        """Routes without a policy are treated as personalized."""
+        response = self.client.get("/private")
+
+        self.assertTrue(response.cache_control.no_store)
+        self.assertTrue(response.cache_control.private)
+
+    def test_versioned_static_is_immutable(self):
+        """url_for('static') adds a content hash, served as immutable for a year."""
+        url = self.client.get("/static-url").get_data(as_text=True)
+        self.assertIn("v=", url)
+
+        response = self.client.get(url)
+        self.assertTrue(response.cache_control.immutable)
+        self.assertEqual(response.cache_control.max_age, 365 * 24 * 60 * 60)
+        response.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import concurrent.futures
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from PIL import Image
+
+from image_cache import ImageCache, ImageFetchError, image_id_from_url
+from tests.fake_igdb import FakeIGDBServer, make_game
+
+
+class TestImageCache(unittest.TestCase):
+    """Test the resized image cache against the fake IGDB image server."""
+
+    def setUp(self):
+        self.server = FakeIGDBServer().start()
+        self.addCleanup(self.server.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = ImageCache(directory.name, self.server.image_url)
+
+    def test_downloads_once_and_resizes_per_size(self):
+        """Each size is made from one download of the original."""
+        card = self.cache.path_for("co1", "card")
+        thumb = self.cache.path_for("co1", "thumb")
+        self.cache.path_for("co1", "card")
+
+        self.assertEqual(len(self.server.image_calls()), 1)
+        self.assertEqual(Image.open(card).size, (264, 352))
+        self.assertEqual(Image.open(thumb).size, (90, 120))
+
+    def test_files_are_content_addressed(self):
+        """Identical variants share one file, named by its hash."""
+        path = self.cache.path_for("co1", "card")
+        again = ImageCache(self.cache.directory, self.server.image_url).path_for("co1", "card")
+
+        self.assertEqual(path, again)
+        with open(path, "rb") as f:
+            self.assertEqual(os.path.basename(path), hashlib.sha256(f.read()).hexdigest() + ".jpg")
+
+    def test_concurrent_requests_share_one_fetch(self):
+        """Threads asking for the same image at once trigger a single download."""
+        self.server.latency = 0.2
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as pool:
+            paths = list(pool.map(lambda _: self.cache.path_for("co2", "card"), range(8)))
+
+        self.assertEqual(len(set(paths)), 1)
+        self.assertEqual(len(self.server.image_calls()), 1)
+
+    def test_writers_never_share_a_temp_file(self):
+        """Writes from one thread id (as in forked workers) still use separate temp files."""
+        path = os.path.join(self.cache.directory, "files", "ab", "abc.jpg")
+        with mock.patch("image_cache.os.replace") as replace:
+            ImageCache._write(path, b"one")
+            ImageCache._write(path, b"two")
+
+        temps = [call.args[0] for call in replace.call_args_list]
+        self.assertNotEqual(temps[0], temps[1])
+        for temp in temps:
+            os.unlink(temp)
+
+    def test_rejects_unknown_sizes_and_ids(self):
+        with self.assertRaises(ValueError):
+            self.cache.path_for("co1", "huge")
+        with self.assertRaises(ValueError):
+            self.cache.path_for("../etc/passwd", "card")
+
+    def test_missing_image_raises(self):
+        self.cache.source_url = self.server.url + "/nowhere"
+        with self.assertRaises(ImageFetchError):
+            self.cache.path_for("co1", "card")
+
+    def test_image_id_from_url(self):
+        self.assertEqual(image_id_from_url("//images.igdb.com/igdb/image/upload/t_thumb/co1abc.jpg"), "co1abc")
+        self.assertIsNone(image_id_from_url(None))
+
+
+class TestImageRoutes(unittest.TestCase):
+    """Test the /img routes."""
+
+    def setUp(self):
+        from app import app
+
+        self.server = FakeIGDBServer().start()
+        self.addCleanup(self.server.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        for name, value in (("image_cache", ImageCache(directory.name, self.server.image_url)),
+                            ("get_single_game_info", lambda game_id: make_game(game_id) if game_id <= 100 else None)):
+            patcher = mock.patch(f"app.{name}", value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = app.test_client()
+
+    def test_cover_is_served_immutable(self):
+        response = self.client.get("/img/1/card?v=co1")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "image/jpeg")
+        self.assertIn("immutable", response.headers["Cache-Control"])
+        self.assertNotIn("no-cache", response.headers["Cache-Control"])
+        self.assertEqual(Image.open(io.BytesIO(response.data)).size, (264, 352))
+
+    def test_unknown_size_is_404(self):
+        self.assertEqual(self.client.get("/img/1/enormous?v=co1").status_code, 404)
+
+    def test_unversioned_url_redirects(self):
+        """Without v the route can't be cached for a year; it points at the versioned URL."""
+        response = self.client.get("/img/1/card")
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.location.endswith("/img/1/card?v=co1"))
+        self.assertIn("no-store", response.headers["Cache-Control"])
+        self.assertEqual(self.server.image_calls(), [])
+
+    def test_version_must_match_the_game(self):
+        """A v the game doesn't use is redirected, not fetched and cached under this URL."""
+        response = self.client.get("/img/1/card?v=co2")
+        screenshot = self.client.get("/img/3/screenshots/0/thumb?v=co1")
+
+        self.assertTrue(response.location.endswith("/img/1/card?v=co1"))
+        self.assertTrue(screenshot.location.endswith("/img/3/screenshots/0/thumb?v=sc3"))
+        self.assertEqual(self.server.image_calls(), [])
+        self.assertEqual(self.client.get("/img/3/screenshots/0/thumb?v=sc3").status_code, 200)
+
+    def test_unknown_game_is_404(self):
+        self.assertEqual(self.client.get("/img/999999/card").status_code, 404)
+        self.assertEqual(self.client.get("/img/999999/screenshots/0/thumb?v=sc1").status_code, 404)
+
+    def test_missing_screenshot_is_404(self):
+        self.assertEqual(self.client.get("/img/1/screenshots/5/thumb?v=sc1").status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
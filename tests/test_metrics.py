@@ -0,0 +1,86 @@
+import unittest
+
+from flask import Flask, render_template_string
+from sqlalchemy import create_engine, text
+
+import metrics
+from api_utils import run_parallel
+from metrics import Counter, Histogram, Registry, init_metrics
+
+
+def make_app(slow_threshold=0):
+    app = Flask(__name__)
+
+    @app.route("/page")
+    def page():
+        metrics.record_igdb_call("games", 0.02, 200)
+        run_parallel([lambda: metrics.record_igdb_call("multiquery", 0.01, 200)] * 2)
+        return render_template_string("{{ name }}", name="hello")
+
+    @app.route("/sql")
+    def sql():
+        with create_engine("sqlite://").connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return "ok"
+
+    init_metrics(app, slow_threshold=slow_threshold)
+    return app
+
+
+class TestMetricTypes(unittest.TestCase):
+    """Test the counter/histogram exposition format."""
+
+    def test_counter_and_histogram_render(self):
+        registry = Registry()
+        counter = registry.register(Counter("things_total", "Things.", ["kind"]))
+        histogram = registry.register(Histogram("wait_seconds", "Waits.", buckets=(0.1, 1)))
+        counter.inc(kind="a")
+        counter.inc(2, kind="a")
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+
+        body = registry.render()
+
+        self.assertIn("# TYPE things_total counter", body)
+        self.assertIn('things_total{kind="a"} 3', body)
+        self.assertIn('wait_seconds_bucket{le="0.1"} 1', body)
+        self.assertIn('wait_seconds_bucket{le="1"} 2', body)
+        self.assertIn('wait_seconds_bucket{le="+Inf"} 2', body)
+        self.assertIn("wait_seconds_count 2", body)
+
+
+class TestRequestInstrumentation(unittest.TestCase):
+    """Test the per-request hooks and the /metrics endpoint."""
+
+    def test_request_phases_are_recorded(self):
+        client = make_app().test_client()
+        igdb_before = metrics.igdb_calls_per_request.count(endpoint="page")
+        renders_before = metrics.template_render_duration.count(template=None)
+
+        self.assertEqual(client.get("/page").status_code, 200)
+
+        self.assertEqual(metrics.igdb_calls_per_request.count(endpoint="page"), igdb_before + 1)
+        self.assertEqual(metrics.template_render_duration.count(template=None), renders_before + 1)
+        body = client.get("/metrics").get_data(as_text=True)
+        self.assertIn('http_requests_total{endpoint="page",method="GET",status="200"}', body)
+        # One direct call plus two from fan-out threads, all charged to the request
+        self.assertIn('http_request_igdb_calls_bucket{endpoint="page",le="2"} 0', body)
+        self.assertIn('http_request_igdb_calls_bucket{endpoint="page",le="5"} 1', body)
+
+    def test_sql_statements_are_timed(self):
+        client = make_app().test_client()
+        before = metrics.sql_query_duration.count(operation="SELECT")
+
+        client.get("/sql")
+
+        self.assertGreater(metrics.sql_query_duration.count(operation="SELECT"), before)
+
+    def test_slow_requests_are_logged_by_phase(self):
+        app = make_app(slow_threshold=1e-9)
+
+        with self.assertLogs(app.logger, "WARNING") as logs:
+            app.test_client().get("/page")
+
+        self.assertIn("Slow request GET /page", logs.output[0])
+        self.assertIn("igdb", logs.output[0])
+        self.assertIn("in 3 calls", logs.output[0])
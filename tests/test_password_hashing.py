@@ -0,0 +1,73 @@
+import threading
+import unittest
+
+from flask_bcrypt import Bcrypt
+
+from password_hashing import PasswordHasher, HashingBusy
+
+
+class BlockingBcrypt:
+    """Stand-in bcrypt whose hashes wait until released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def generate_password_hash(self, password, rounds):
+        self.release.wait(5)
+        return b"$2b$04$blocked"
+
+
+class TestPasswordHasher(unittest.TestCase):
+    """Test the bounded bcrypt pool."""
+
+    def test_hash_and_check(self):
+        """Hashes use the configured cost and verify."""
+        hasher = PasswordHasher(Bcrypt(), rounds=4, max_workers=1, max_queue=1, timeout=5)
+        pw_hash = hasher.hash("password")
+
+        self.assertTrue(pw_hash.startswith("$2b$04$"))
+        self.assertTrue(hasher.check(pw_hash, "password"))
+        self.assertFalse(hasher.check(pw_hash, "wrong"))
+        self.assertEqual(hasher.stats()["completed"], 3)
+
+    def test_needs_rehash_on_cost_change(self):
+        """Hashes at another cost are flagged for upgrade."""
+        hasher = PasswordHasher(Bcrypt(), rounds=5, max_workers=1, max_queue=1, timeout=5)
+        old_hash = Bcrypt().generate_password_hash("password", 4).decode()
+
+        self.assertTrue(hasher.needs_rehash(old_hash))
+        self.assertFalse(hasher.needs_rehash(hasher.hash("password")))
+
+    def test_rejects_when_saturated(self):
+        """Work beyond workers + queue raises HashingBusy straight away."""
+        bcrypt = BlockingBcrypt()
+        hasher = PasswordHasher(bcrypt, rounds=4, max_workers=1, max_queue=1, timeout=5)
+        threads = [threading.Thread(target=hasher.hash, args=("pw",)) for _ in range(2)]
+        for t in threads:
+            t.start()
+        while hasher.stats()["in_flight"] < 2:
+            pass
+
+        with self.assertRaises(HashingBusy):
+            hasher.hash("pw")
+        self.assertEqual(hasher.stats()["queue_depth"], 1)
+
+        bcrypt.release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(hasher.stats()["rejected"], 1)
+
+    def test_timeout_raises_hashing_busy(self):
+        """A hash that outlasts `timeout` is reported as busy, not as a TimeoutError."""
+        bcrypt = BlockingBcrypt()
+        hasher = PasswordHasher(bcrypt, rounds=4, max_workers=1, max_queue=1, timeout=0.05)
+
+        with self.assertRaises(HashingBusy):
+            hasher.hash("pw")
+        self.assertEqual(hasher.stats()["timed_out"], 1)
+
+        bcrypt.release.set()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+
+import numpy as np
+
+from recommendations import ratings_matrix, column_norms, cosine_scores, top_k
+
+
+class TestSimilarityMath(unittest.TestCase):
+    """Test the sparse cosine scoring behind similar games."""
+
+    def setUp(self):
+        rows = [(1, 10, 5), (1, 20, 4), (1, 30, 1),
+                (2, 10, 4), (2, 20, 5), (2, 30, 2),
+                (3, 10, 2), (3, 40, 5)]
+        self.matrix, self.game_ids = ratings_matrix(rows)
+
+    def test_matrix_shape_and_columns(self):
+        self.assertEqual(self.matrix.shape, (3, 4))
+        self.assertEqual(list(self.game_ids), [10, 20, 30, 40])
+
+    def test_cosine_scores(self):
+        """Scores match a dense cosine; self-pairs and thin support score 0."""
+        scores = cosine_scores(self.matrix, np.array([0]), column_norms(self.matrix), min_support=2)
+
+        dense = self.matrix.toarray()
+        expected = dense[:, 0] @ dense[:, 1] / (np.linalg.norm(dense[:, 0]) * np.linalg.norm(dense[:, 1]))
+        self.assertAlmostEqual(scores[0, 1], expected)
+        self.assertEqual(scores[0, 0], 0)
+        self.assertEqual(scores[0, 3], 0)  # only user 3 rated both
+
+    def test_top_k_orders_and_drops_zeros(self):
+        scores = np.array([[0.0, 0.9, 0.5, 0.0], [0.2, 0.0, 0.0, 0.7]])
+
+        self.assertEqual(top_k(scores, 3), [[(1, 0.9), (2, 0.5)], [(3, 0.7), (0, 0.2)]])
+        self.assertEqual(top_k(scores, 1), [[(1, 0.9)], [(3, 0.7)]])
+
+
+if __name__ == '__main__':
+    unittest.main()
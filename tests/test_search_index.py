@@ -0,0 +1,94 @@
+import threading
+import time
+import unittest
+
+from search_index import GameNameIndex, normalize
+
+GAMES = [
+    {"id": 1, "name": "The Legend of Zelda: Breath of the Wild"},
+    {"id": 2, "name": "Zelda II: The Adventure of Link"},
+    {"id": 3, "name": "Pokémon Legends: Arceus"},
+    {"id": 4, "name": "Hollow Knight"},
+    {"id": 5, "name": "Hollow Knight: Silksong"},
+]
+
+
+class TestGameNameIndex(unittest.TestCase):
+    """Test the typeahead name index."""
+
+    def setUp(self):
+        self.index = GameNameIndex()
+        self.index.rebuild(GAMES)
+
+    def test_normalize(self):
+        """Accents and punctuation are folded away."""
+        self.assertEqual(normalize("Pokémon Legends: Arceus"), "pokemon legends arceus")
+
+    def test_prefix_matches_ranked(self):
+        """Exact and name-prefix matches outrank word-prefix matches."""
+        self.assertEqual([g["id"] for g in self.index.search("hollow knight")], [4, 5])
+        self.assertEqual([g["id"] for g in self.index.search("zel")], [2, 1])
+
+    def test_word_prefix_and_accents(self):
+        """Queries can start at any word and ignore accents."""
+        self.assertEqual(self.index.search("pokemon")[0]["id"], 3)
+        self.assertEqual(self.index.search("breath")[0]["id"], 1)
+
+    def test_trigram_fallback_tolerates_typos(self):
+        """A misspelled query still finds the game."""
+        self.assertEqual(self.index.search("silksogn")[0]["id"], 5)
+
+    def test_membership_and_choices(self):
+        """Selected ids are validated against the index."""
+        self.assertIn("4", self.index)
+        self.assertNotIn(99, self.index)
+        self.assertEqual(self.index.choices()[0], (4, "Hollow Knight"))
+
+    def test_search_is_fast(self):
+        """A typeahead lookup over thousands of names stays under a millisecond."""
+        index = GameNameIndex()
+        index.rebuild({"id": i, "name": f"Game Title {i} Edition"} for i in range(5000))
+
+        start = time.perf_counter()
+        for _ in range(100):
+            index.search("game title 42")
+        self.assertLess((time.perf_counter() - start) / 100, 0.001)
+
+    def test_add_keeps_rebuilt_games(self):
+        """Games added one at a time join the index without dropping the rest."""
+        self.index.add(6, "Celeste")
+        self.index.add(4, "Renamed")
+
+        self.assertEqual(self.index.search("celeste")[0]["id"], 6)
+        self.assertEqual(self.index.name(4), "Hollow Knight")
+        self.assertEqual(len(self.index), 6)
+
+    def test_search_during_rebuild(self):
+        """Searches running while the index is rebuilt see one whole generation."""
+        older = [{"id": i, "name": f"Older Game {i}"} for i in range(500)]
+        newer = [{"id": 1000 + i, "name": f"Newer Game {i}"} for i in range(500)]
+        errors = []
+        done = threading.Event()
+
+        def search():
+            while not done.is_set():
+                try:
+                    self.index.search("game")
+                except Exception as error:
+                    errors.append(error)
+                    return
+
+        readers = [threading.Thread(target=search) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        for generation in range(20):
+            self.index.rebuild(older if generation % 2 else newer)
+        done.set()
+        for reader in readers:
+            reader.join()
+
+        self.assertEqual(errors, [])
+
+
+if __name__ == '__main__':
+    unittest.main()